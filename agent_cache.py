@@ -0,0 +1,278 @@
+import hashlib
+import json
+import threading
+import time
+from uuid import uuid4
+
+from agno.run.agent import RunCompletedEvent, RunContentEvent, RunOutput
+from agno.run.base import RunStatus
+
+from config import DB_FILE, REPO_DIR
+from repo_index import find_checkout, head_sha
+from storage import connect
+
+
+# -----------------------------
+# Request / instruction fingerprints
+# -----------------------------
+def normalize_request(input):
+    """Reduce a run input to the text of the request it carries."""
+    if isinstance(input, list):
+        # Team members receive their history followed by the delegated task
+        user_messages = [m for m in input if getattr(m, "role", None) == "user"]
+        input = user_messages[-1] if user_messages else (input[-1] if input else "")
+    if hasattr(input, "content"):
+        input = input.content
+    if not isinstance(input, str):
+        input = json.dumps(input, sort_keys=True, default=str)
+    return " ".join(input.lower().split())
+
+
+def instructions_hash(agent):
+    payload = json.dumps(
+        [agent.description, agent.instructions],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+# -----------------------------
+# Persistent cache
+# -----------------------------
+class AgentResultCache:
+    """Agent outputs keyed by (commit SHA, agent id, request, instructions), stored in SQLite."""
+
+    def __init__(self, db_file=DB_FILE, max_entries=5000):
+        self.db_file = str(db_file)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_cache (
+                    key TEXT PRIMARY KEY,
+                    sha TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    instructions_hash TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cache_agent ON agent_cache (agent_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cache_used ON agent_cache (last_used_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cache_sha ON agent_cache (sha, agent_id)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    @staticmethod
+    def make_key(sha, agent_id, request, instructions_digest):
+        payload = json.dumps([sha, agent_id, request, instructions_digest])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT content FROM agent_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE agent_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            return row[0]
+
+    def put(self, key, sha, agent_id, digest, request, content):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_cache "
+                "(key, sha, agent_id, instructions_hash, request, content, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, sha, agent_id, digest, request, content, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Least recently used entries go first once the cache is over its bound
+        conn.execute(
+            "DELETE FROM agent_cache WHERE key IN ("
+            "SELECT key FROM agent_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def purge_stale(self, agent_id, digest):
+        """Drop entries of `agent_id` that were produced by other instructions."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM agent_cache WHERE agent_id = ? AND instructions_hash != ?",
+                (agent_id, digest),
+            )
+
+    def carry_forward(self, old_sha, new_sha, agent_ids):
+        """Make answers given at `old_sha` valid at `new_sha` for agents unaffected by the change."""
+        agent_ids = list(agent_ids)
+        if not agent_ids:
+            return 0
+        placeholders = ",".join("?" * len(agent_ids))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT agent_id, instructions_hash, request, content FROM agent_cache "
+                f"WHERE sha = ? AND agent_id IN ({placeholders})",
+                (old_sha, *agent_ids),
+            ).fetchall()
+            conn.executemany(
+                "INSERT OR IGNORE INTO agent_cache "
+                "(key, sha, agent_id, instructions_hash, request, content, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.make_key(new_sha, agent_id, request, digest), new_sha, agent_id, digest, request, content, now, now)
+                    for agent_id, digest, request, content in rows
+                ],
+            )
+            self._evict(conn)
+        return len(rows)
+
+    def latest(self, sha, agent_ids, limit=3):
+        """Newest answers per agent at `sha`, as {agent_id: [(created_at, request, content), ...]}."""
+        found = {}
+        with self._lock, self._connect() as conn:
+            for agent_id in agent_ids:
+                rows = conn.execute(
+                    "SELECT created_at, request, content FROM agent_cache WHERE sha = ? AND agent_id = ? "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (sha, agent_id, limit),
+                ).fetchall()
+                if rows:
+                    found[agent_id] = rows
+        return found
+
+    def clear(self, agent_id=None):
+        with self._lock, self._connect() as conn:
+            if agent_id is None:
+                conn.execute("DELETE FROM agent_cache")
+            else:
+                conn.execute("DELETE FROM agent_cache WHERE agent_id = ?", (agent_id,))
+
+
+# -----------------------------
+# Agent wiring
+# -----------------------------
+def _cached_output(agent, content, session_id):
+    return RunOutput(
+        run_id=str(uuid4()),
+        agent_id=agent.id,
+        agent_name=agent.name,
+        session_id=session_id,
+        content=content,
+        status=RunStatus.completed,
+        metadata={"cache_hit": True},
+    )
+
+
+def _replay(run_output, yield_run_output):
+    event_fields = dict(
+        agent_id=run_output.agent_id,
+        agent_name=run_output.agent_name,
+        run_id=run_output.run_id,
+        session_id=run_output.session_id,
+    )
+    yield RunContentEvent(content=run_output.content, **event_fields)
+    yield RunCompletedEvent(content=run_output.content, **event_fields)
+    if yield_run_output:
+        yield run_output
+
+
+def _completed_content(run_output):
+    if run_output is None or run_output.status != RunStatus.completed:
+        return None
+    if isinstance(run_output.content, str) and run_output.content.strip():
+        return run_output.content
+    return None
+
+
+def enable_result_cache(agent, cache, repo_dir=REPO_DIR):
+    """Serve repeated requests for `agent` from `cache` while the checkout's HEAD is unchanged."""
+    digest = instructions_hash(agent)
+    cache.purge_stale(agent.id, digest)
+    original_run = agent.run
+    original_arun = agent.arun
+
+    def lookup(input):
+        checkout = find_checkout(repo_dir)
+        sha = head_sha(checkout) if checkout else None
+        if sha is None:
+            return None, None, None
+        request = normalize_request(input)
+        key = cache.make_key(sha, agent.id, request, digest)
+        return key, (sha, request), cache.get(key)
+
+    def store(key, context, content):
+        if key is not None and content is not None:
+            sha, request = context
+            cache.put(key, sha, agent.id, digest, request, content)
+
+    def record_stream(stream, key, context):
+        run_output = None
+        for event in stream:
+            if isinstance(event, RunOutput):
+                run_output = event
+            elif isinstance(event, RunCompletedEvent) and isinstance(event.content, str):
+                run_output = run_output or RunOutput(content=event.content, status=RunStatus.completed)
+            yield event
+        store(key, context, _completed_content(run_output))
+
+    async def arecord_stream(stream, key, context):
+        run_output = None
+        async for event in stream:
+            if isinstance(event, RunOutput):
+                run_output = event
+            elif isinstance(event, RunCompletedEvent) and isinstance(event.content, str):
+                run_output = run_output or RunOutput(content=event.content, status=RunStatus.completed)
+            yield event
+        store(key, context, _completed_content(run_output))
+
+    def run(input, *args, stream=None, **kwargs):
+        key, context, content = lookup(input)
+        if content is not None:
+            run_output = _cached_output(agent, content, kwargs.get("session_id"))
+            if stream:
+                return _replay(run_output, kwargs.get("yield_run_output", False))
+            return run_output
+        if stream:
+            return record_stream(original_run(input, *args, stream=True, **kwargs), key, context)
+        run_output = original_run(input, *args, stream=stream, **kwargs)
+        store(key, context, _completed_content(run_output))
+        return run_output
+
+    async def _arun_cached(run_output):
+        return run_output
+
+    async def _areplay(run_output, yield_run_output):
+        for event in _replay(run_output, yield_run_output):
+            yield event
+
+    async def _arun_and_store(input, args, kwargs, key, context):
+        run_output = await original_arun(input, *args, stream=False, **kwargs)
+        store(key, context, _completed_content(run_output))
+        return run_output
+
+    def arun(input, *args, stream=None, **kwargs):
+        key, context, content = lookup(input)
+        if content is not None:
+            run_output = _cached_output(agent, content, kwargs.get("session_id"))
+            if stream:
+                return _areplay(run_output, kwargs.get("yield_run_output", False))
+            return _arun_cached(run_output)
+        if stream:
+            return arecord_stream(original_arun(input, *args, stream=True, **kwargs), key, context)
+        return _arun_and_store(input, args, kwargs, key, context)
+
+    agent.run = run
+    agent.arun = arun
+    return agent
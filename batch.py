@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+
+from config import BASE_DIR
+from flow_runner import DEFAULT_CONCURRENCY, FLOW_STAGES, run_flow
+from instrumentation import percentile
+from readme_sections import strip_status
+from repo_loader import clone_repository, repo_name
+from workspaces import WorkspaceManager
+
+
+DEFAULT_OUTPUT_DIR = BASE_DIR / "batch_output"
+DEFAULT_WORKERS = 4
+
+# Written last for every repository, so its presence means the repository is done
+REPORT_FILE = "report.json"
+
+
+@dataclass
+class RepoResult:
+    repo: str
+    slug: str
+    status: str = "ok"
+    sha: str | None = None
+    seconds: float = 0.0
+    clone_seconds: float = 0.0
+    agent_seconds: float = 0.0
+    errors: dict = field(default_factory=dict)
+    finished_at: float = 0.0
+
+
+def read_repo_list(path):
+    """One repository URL or local path per line; blank lines and # comments are ignored."""
+    entries = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line and line not in entries:
+            entries.append(line)
+    return entries
+
+
+def repo_slug(repo):
+    # Services in different groups often share a name, so the slug carries a hash of the entry
+    digest = hashlib.sha1(repo.encode()).hexdigest()[:8]
+    return f"{repo_name(repo)}-{digest}"
+
+
+def clone_url(repo):
+    """Local paths are cloned like remote repositories, so the original stays untouched."""
+    if "://" in repo or repo.startswith("git@"):
+        return repo
+    return Path(repo).expanduser().resolve().as_uri()
+
+
+def _write(path, text):
+    # Atomic, so an interrupted run never leaves half an artifact behind
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _analysis_markdown(report):
+    lines = [f"# Analysis of {report.repo}", ""]
+    for stage in report.stages:
+        lines += [f"## {stage.name.capitalize()}", ""]
+        for r in stage.results:
+            lines += [f"### {r.agent_name}", "", r.content if r.error is None else f"Error: {r.error}", ""]
+    return "\n".join(lines)
+
+
+def load_result(output_dir, repo):
+    path = Path(output_dir) / repo_slug(repo) / REPORT_FILE
+    if not path.exists():
+        return None
+    return RepoResult(**json.loads(path.read_text()))
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def document_repository(repo, output_dir, workspace_root, max_concurrency=DEFAULT_CONCURRENCY, stub_model=False, keep_workspace=False):
+    """Clone, analyze and preview the README of one repository. Runs in a worker process."""
+    import main_latest1
+
+    if stub_model:
+        from stub_model import StubModel
+
+        main_latest1.model = StubModel()
+
+    slug = repo_slug(repo)
+    artifacts = Path(output_dir) / slug
+    artifacts.mkdir(parents=True, exist_ok=True)
+    result = RepoResult(repo=repo, slug=slug)
+    # No eviction here: other workers' workspaces are in use, and each one is
+    # released as soon as its repository is done
+    workspaces = WorkspaceManager(root=workspace_root)
+    workspace = workspaces.touch(slug)
+    started = time.perf_counter()
+    try:
+        # A checkout left behind by an interrupted run is replaced
+        clone = clone_repository(clone_url(repo), dest_dir=workspace, replace=True)
+        workspaces.check_quota(slug)
+        result.sha = clone.sha
+        result.clone_seconds = clone.seconds
+
+        team = main_latest1.make_repo_chatbot_team(workspace, use_router=False)
+        report = asyncio.run(run_flow(team, Path(clone.path).name, FLOW_STAGES, max_concurrency))
+        result.agent_seconds = round(report.agent_seconds, 3)
+        result.errors = {r.agent_id: r.error for stage in report.stages for r in stage.results if r.error}
+
+        readme = report.result("readme_preview_agent")
+        if readme is not None and readme.error is None and readme.content:
+            _write(artifacts / "README.md", strip_status(readme.content))
+        else:
+            result.status = "failed"
+        _write(artifacts / "analysis.md", _analysis_markdown(report))
+    except Exception as e:
+        result.status = "failed"
+        result.errors["batch"] = str(e)
+    finally:
+        if not keep_workspace:
+            workspaces.release(slug)
+    result.seconds = round(time.perf_counter() - started, 3)
+    result.finished_at = time.time()
+    _write(artifacts / REPORT_FILE, json.dumps(asdict(result), indent=2))
+    return result
+
+
+# -----------------------------
+# Batch
+# -----------------------------
+def run_batch(
+    repos,
+    output_dir=DEFAULT_OUTPUT_DIR,
+    workers=DEFAULT_WORKERS,
+    max_concurrency=DEFAULT_CONCURRENCY,
+    retry_failed=False,
+    stub_model=False,
+    keep_workspaces=False,
+):
+    """Document `repos` with a pool of worker processes; repositories with a report are skipped."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workspace_root = output_dir / ".workspaces"
+
+    done, pending = [], []
+    for repo in repos:
+        previous = load_result(output_dir, repo)
+        if previous is not None and (previous.status == "ok" or not retry_failed):
+            done.append(previous)
+        else:
+            pending.append(repo)
+    print(f"{len(repos)} repositories: {len(done)} already documented, {len(pending)} to go")
+
+    results = []
+    started = time.perf_counter()
+    # Spawned workers start from a clean interpreter instead of a copy of this one
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    try:
+        futures = {
+            pool.submit(
+                document_repository, repo, output_dir, workspace_root, max_concurrency, stub_model, keep_workspaces
+            ): repo
+            for repo in pending
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                repo = futures[future]
+                result = RepoResult(repo=repo, slug=repo_slug(repo), status="failed", errors={"batch": str(e)})
+            results.append(result)
+            print(f"[{len(results)}/{len(pending)}] {result.status:<6} {result.seconds:7.1f}s  {result.repo}")
+    except KeyboardInterrupt:
+        print("Interrupted; finished repositories are kept, run the same command again to resume.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return summarize(results, time.perf_counter() - started, skipped=len(done), workers=workers)
+
+
+def summarize(results, wall_seconds, skipped=0, workers=DEFAULT_WORKERS):
+    seconds = [r.seconds for r in results]
+    ok = [r for r in results if r.status == "ok"]
+    return {
+        "processed": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "skipped": skipped,
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 1),
+        "repos_per_hour": round(3600 * len(results) / wall_seconds, 1) if wall_seconds and results else 0.0,
+        "p50_seconds": percentile(seconds, 0.5),
+        "p95_seconds": percentile(seconds, 0.95),
+        "clone_seconds": round(sum(r.clone_seconds for r in results), 1),
+        "agent_seconds": round(sum(r.agent_seconds for r in results), 1),
+        "failures": {r.repo: r.errors for r in results if r.status != "ok"},
+    }
+
+
+def print_summary(summary):
+    print(
+        f"\n{summary['processed']} processed ({summary['ok']} ok, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped) in {summary['wall_seconds']}s with {summary['workers']} workers"
+    )
+    if summary["processed"]:
+        print(
+            f"Throughput: {summary['repos_per_hour']} repositories/hour, "
+            f"p50 {summary['p50_seconds']:.1f}s, p95 {summary['p95_seconds']:.1f}s per repository"
+        )
+        print(f"Time spent cloning {summary['clone_seconds']}s, in agents {summary['agent_seconds']}s")
+    for repo, errors in summary["failures"].items():
+        print(f"  failed: {repo}")
+        for agent_id, error in errors.items():
+            print(f"    {agent_id}: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Document many repositories: clone, analyze and preview a README for each.")
+    parser.add_argument("repos", nargs="*", help="Repository URLs or local paths")
+    parser.add_argument("--from-file", type=Path, help="File with one repository URL or path per line")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR, help="Directory for README.md, analysis.md and report.json per repository")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Repositories processed in parallel")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Agents run in parallel per repository")
+    parser.add_argument("--retry-failed", action="store_true", help="Also rerun repositories whose last run failed")
+    parser.add_argument("--keep-workspaces", action="store_true", help="Keep the clones after documenting them")
+    parser.add_argument("--stub-model", action="store_true", help="Use the offline stub model, e.g. to try a batch setup")
+    args = parser.parse_args()
+
+    repos = list(args.repos)
+    if args.from_file:
+        repos += [r for r in read_repo_list(args.from_file) if r not in repos]
+    if not repos:
+        parser.error("no repositories given")
+
+    summary = run_batch(
+        repos,
+        output_dir=args.output,
+        workers=args.workers,
+        max_concurrency=args.concurrency,
+        retry_failed=args.retry_failed,
+        stub_model=args.stub_model,
+        keep_workspaces=args.keep_workspaces,
+    )
+    _write(args.output / "summary.json", json.dumps(summary, indent=2))
+    print_summary(summary)
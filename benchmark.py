@@ -0,0 +1,582 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from config import BASE_DIR, CACHE_DIR
+
+
+FIXTURE_DIR = CACHE_DIR / "fixtures"
+RESULTS_DIR = CACHE_DIR / "benchmarks"
+
+# Bump when the generated fixtures change so stale copies are rebuilt
+FIXTURE_VERSION = 1
+
+# Number of Python modules per fixture; medium and large also get a JS frontend
+FIXTURE_SIZES = {"small": 6, "medium": 60, "large": 400}
+
+# Fixed identity and dates keep fixture commit SHAs identical across machines
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "RepoScribe Bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_AUTHOR_DATE": "2024-01-01T00:00:00+00:00",
+    "GIT_COMMITTER_NAME": "RepoScribe Bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_DATE": "2024-01-01T00:00:00+00:00",
+}
+
+README_TURNS = [
+    "The repository '{repo}' is already cloned. Analyze the repository files and structure.",
+    "Explain the code: entry points, routes and configuration.",
+    "Generate the README preview.",
+    "Fix the Installation section of the README preview: mention the Makefile targets.",
+]
+
+QA_TURNS = [
+    "The repository '{repo}' is already cloned. Give me an overview of the file structure.",
+    "Which dependencies does the project declare?",
+    "Help me understand the code: what are the entry points?",
+    "What license applies, and is the project compliant?",
+]
+
+# Labelled questions for the intent router; None means the orchestrator should decide
+ROUTING_CASES = [
+    ("What is the folder structure of this project?", "file_analyzer_agent"),
+    ("Which programming languages are used?", "file_analyzer_agent"),
+    ("Show me the directory layout", "file_analyzer_agent"),
+    ("Which dependencies does the project declare?", "dependency_analysis_agent"),
+    ("What libraries does it rely on?", "dependency_analysis_agent"),
+    ("Are any packages outdated?", "dependency_analysis_agent"),
+    ("What is the purpose of this repository?", "code_understanding_agent"),
+    ("What does the project do?", "code_understanding_agent"),
+    ("Explain the architecture and the entry points", "code_understanding_agent"),
+    ("How do I set up the project locally?", "onboarding_agent"),
+    ("How to run the app?", "onboarding_agent"),
+    ("Which environment variables do I need to get started?", "onboarding_agent"),
+    ("What errors can the API return?", "error_documentation_agent"),
+    ("Which exceptions are raised when the config is missing?", "error_documentation_agent"),
+    ("How maintainable is the code?", "code_quality_agent"),
+    ("Is there technical debt worth refactoring?", "code_quality_agent"),
+    ("What license does the project use?", "compliance_agent"),
+    ("Is it compliant with the GPL?", "compliance_agent"),
+    ("Where can I learn FastAPI? Any tutorials?", "learning_resource_agent"),
+    ("Give me documentation links for the main libraries", "learning_resource_agent"),
+    ("Write unit tests for the service module", "test_generator_agent"),
+    ("Which test cases would improve coverage?", "test_generator_agent"),
+    ("Analyze https://github.com/example/project", None),
+    ("Generate the README", None),
+    ("Why do the tests fail with an error?", None),
+    ("Hello!", None),
+    ("What should I look at first?", None),
+]
+
+
+# -----------------------------
+# Fixture repositories
+# -----------------------------
+MODULE_TEMPLATE = '''import os
+
+from fastapi import APIRouter
+
+router = APIRouter()
+
+TIMEOUT = int(os.environ.get("{env}_TIMEOUT", "30"))
+
+
+class {cls}:
+    """Keeps the {name} records in memory."""
+
+    def __init__(self, limit=100):
+        self.limit = limit
+        self.items = []
+
+    def add(self, item):
+        if len(self.items) >= self.limit:
+            raise ValueError("{name} store is full")
+        self.items.append(item)
+        return len(self.items)
+
+    def find(self, key):
+        for item in self.items:
+            if isinstance(item, dict) and item.get("key") == key:
+                return item
+        return None
+
+
+def normalize_{name}(value, strict=False):
+    if value is None:
+        return "" if not strict else None
+    if isinstance(value, (list, tuple)):
+        return [normalize_{name}(v, strict) for v in value]
+    text = str(value).strip()
+    while "  " in text:
+        text = text.replace("  ", " ")
+    return text.lower()
+
+
+@router.get("/{name}/{{key}}")
+def get_{name}(key: str):
+    store = {cls}()
+    return store.find(normalize_{name}(key)) or {{"key": key, "found": False}}
+'''
+
+TEST_TEMPLATE = '''from {package}.{name} import {cls}, normalize_{name}
+
+
+def test_add_and_find():
+    store = {cls}(limit=2)
+    store.add({{"key": "a"}})
+    assert store.find("a") == {{"key": "a"}}
+
+
+def test_normalize():
+    assert normalize_{name}("  A  B ") == "a b"
+'''
+
+JS_TEMPLATE = '''const express = require("express");
+
+const router = express.Router();
+const apiUrl = process.env.API_URL || "http://localhost:8000";
+
+export function fetch{cls}(key) {{
+  return fetch(`${{apiUrl}}/{name}/${{key}}`).then((response) => response.json());
+}}
+
+router.get("/ui/{name}", (req, res) => {{
+  res.json({{ name: "{name}" }});
+}});
+
+module.exports = router;
+'''
+
+MAIN_TEMPLATE = '''import argparse
+
+from fastapi import FastAPI
+
+{imports}
+
+app = FastAPI()
+{routers}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bench fixture service")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+'''
+
+MIT_LICENSE = """MIT License
+
+Copyright (c) 2024 RepoScribe Bench
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+"""
+
+
+def _fixture_files(size):
+    modules = FIXTURE_SIZES[size]
+    package = f"bench_{size}"
+    files = {
+        "LICENSE": MIT_LICENSE,
+        "README.md": f"# {package}\n\nSynthetic fixture service used by the RepoScribe benchmark.\n",
+        "requirements.txt": "fastapi>=0.110\nuvicorn[standard]>=0.29\npydantic>=2.6\n",
+        "pyproject.toml": (
+            f'[project]\nname = "{package}"\nversion = "1.0.0"\nrequires-python = ">=3.10"\n'
+            'dependencies = ["fastapi>=0.110", "pydantic>=2.6"]\n\n'
+            '[project.optional-dependencies]\ntest = ["pytest>=8"]\n'
+        ),
+        ".env.example": "API_URL=http://localhost:8000\n",
+        f"{package}/__init__.py": "",
+    }
+    names = [f"module_{i:03d}" for i in range(modules)]
+    for i, name in enumerate(names):
+        # Spread modules over sub-packages so the tree has some depth
+        subpackage = f"part_{i // 20:02d}"
+        files[f"{package}/{subpackage}/__init__.py"] = ""
+        cls = "".join(word.title() for word in name.split("_"))
+        files[f"{package}/{subpackage}/{name}.py"] = MODULE_TEMPLATE.format(
+            name=name, cls=cls, env=name.upper()
+        )
+        if i % 3 == 0:
+            files[f"tests/test_{name}.py"] = TEST_TEMPLATE.format(
+                package=f"{package}.{subpackage}", name=name, cls=cls
+            )
+    shown = names[:10]
+    files[f"{package}/main.py"] = MAIN_TEMPLATE.format(
+        imports="\n".join(f"from {package}.part_00.{name} import router as {name}_router" for name in shown),
+        routers="\n".join(f"app.include_router({name}_router)" for name in shown),
+    )
+    if size != "small":
+        files["Dockerfile"] = f'FROM python:3.12-slim\nCOPY . /app\nCMD ["python", "-m", "{package}.main"]\n'
+        files["web/package.json"] = json.dumps(
+            {"name": f"{package}-web", "version": "1.0.0", "dependencies": {"express": "^4.19.0"},
+             "devDependencies": {"jest": "^29.7.0"}},
+            indent=2,
+        )
+        for name in names[: modules // 4]:
+            cls = "".join(word.title() for word in name.split("_"))
+            files[f"web/src/{name}.js"] = JS_TEMPLATE.format(name=name, cls=cls)
+    return files
+
+
+def build_fixture(size):
+    """Create (once) the git repository of fixture `size` and return its path."""
+    path = FIXTURE_DIR / f"{size}-v{FIXTURE_VERSION}"
+    if (path / ".git").exists():
+        return path
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    # Built next to its final location and renamed, so a half-written fixture is never reused
+    staging = Path(tempfile.mkdtemp(prefix=f".{size}-", dir=FIXTURE_DIR))
+    for relative, content in _fixture_files(size).items():
+        target = staging / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+    env = {**os.environ, **GIT_ENV}
+    for args in (["init", "-q", "-b", "main"], ["add", "-A"], ["commit", "-q", "-m", f"Fixture {size}"]):
+        subprocess.run(["git", *args], cwd=staging, env=env, check=True, capture_output=True)
+    staging.rename(path)
+    return path
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def _full_analysis(workspace, repo):
+    from flow_runner import run_flow
+    from main_latest1 import make_repo_chatbot_team
+
+    team = make_repo_chatbot_team(workspace)
+    report = asyncio.run(run_flow(team, repo))
+    return [r.error for stage in report.stages for r in stage.results if r.error]
+
+
+def _team_turns(team, turns, repo):
+    errors = []
+    for turn in turns:
+        output = team.run(turn.format(repo=repo), session_id="benchmark")
+        if getattr(output, "status", None) is not None and output.status.value == "ERROR":
+            errors.append(str(output.content))
+    return errors
+
+
+def _readme_preview(workspace, repo):
+    from main_original import make_readme_generation_team
+
+    return _team_turns(make_readme_generation_team(workspace), README_TURNS, repo)
+
+
+def _qa(workspace, repo):
+    from main_latest1 import make_repo_chatbot_team
+
+    return _team_turns(make_repo_chatbot_team(workspace), QA_TURNS, repo)
+
+
+def _qa_orchestrated(workspace, repo):
+    # The same turns with every question going through the orchestrator model
+    from main_latest1 import make_repo_chatbot_team
+
+    return _team_turns(make_repo_chatbot_team(workspace, use_router=False), QA_TURNS, repo)
+
+
+SCENARIOS = {
+    "full_analysis": _full_analysis,
+    "readme_preview": _readme_preview,
+    "qa": _qa,
+    "qa_orchestrated": _qa_orchestrated,
+}
+
+
+def measure_startup(workdir, delay=0.0):
+    """Cold start of the Streamlit UI, in a fresh process: first render, a rerun, and the first answers."""
+    os.environ["AGNO_TELEMETRY"] = "false"
+    os.chdir(workdir)
+
+    from streamlit.testing.v1 import AppTest
+    from workspaces import WorkspaceManager
+
+    app = AppTest.from_file(str(BASE_DIR / "ui.py"), default_timeout=120)
+    session_id = None
+    timings = {}
+
+    def timed(name, step):
+        started = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - started, 3)
+
+    try:
+        timed("first_render_seconds", app.run)
+        session_id = app.session_state.session_id
+        agno_loaded = "agno.agent" in sys.modules
+        timed("rerun_seconds", app.run)
+
+        def load_agents():
+            import main_original
+            from stub_model import StubModel
+
+            main_original.model = StubModel(delay=delay)
+
+        timed("agents_import_seconds", load_agents)
+
+        def wait_for_jobs():
+            from jobs import FINISHED, JobStore
+
+            store = JobStore()
+            while any(job["status"] not in FINISHED for job in store.jobs(session_id)):
+                time.sleep(0.01)
+
+        def ask(question):
+            def step():
+                # Submitting returns at once; the answer is read on the rerun after the job finished
+                app.chat_input[0].set_value(question).run()
+                wait_for_jobs()
+                app.run()
+
+            return step
+
+        # The first question builds the session's team, later ones reuse it
+        timed("first_answer_seconds", ask(README_TURNS[1]))
+        timed("next_answer_seconds", ask(README_TURNS[1]))
+        # How long the page is blocked when a question is asked
+        timed("submit_seconds", app.chat_input[0].set_value(README_TURNS[1]).run)
+        wait_for_jobs()
+    finally:
+        os.chdir(BASE_DIR)
+        if session_id is not None:
+            WorkspaceManager().release(session_id)
+    return {**timings, "agno_loaded_on_first_render": agno_loaded}
+
+
+def evaluate_router(cases=ROUTING_CASES):
+    """Accuracy of the intent router on the labelled questions, and its cost per question."""
+    from intent_router import make_router
+
+    router = make_router()
+    routed = correct = wrong = 0
+    started = time.perf_counter()
+    decisions = [(router.classify(text), expected) for text, expected in cases]
+    seconds = time.perf_counter() - started
+    for route, expected in decisions:
+        if route.member_id is None:
+            continue
+        routed += 1
+        if route.member_id == expected:
+            correct += 1
+        else:
+            wrong += 1
+    return {
+        "cases": len(cases),
+        "routed": routed,
+        # Share of routed questions that went to the labelled member
+        "accuracy": round(correct / routed, 3) if routed else None,
+        # Share of questions that skipped the orchestrator
+        "coverage": round(routed / len(cases), 3),
+        "wrong": wrong,
+        "model": router.model is not None,
+        "microseconds_per_question": round(1e6 * seconds / len(cases), 1),
+    }
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 if sys.platform != "darwin" else peak / 1024**2
+
+
+def in_fresh_process(function, *args):
+    """Call `function(workdir, *args)` in a new interpreter with its own working directory and memory.db.
+
+    A fresh interpreter per run keeps peak RSS and module state independent.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="reposcribe-bench-"))
+    previous = os.environ.get("REPOSCRIBE_DB")
+    # Read by config.py when the new interpreter imports it
+    os.environ["REPOSCRIBE_DB"] = str(workdir / "memory.db")
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            return pool.submit(function, workdir, *args).result()
+    finally:
+        if previous is None:
+            os.environ.pop("REPOSCRIBE_DB", None)
+        else:
+            os.environ["REPOSCRIBE_DB"] = previous
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_scenario(workdir, size, scenario, delay=0.0, warm=False):
+    """Run one scenario on one fixture. Meant to run in a fresh process, so peak RSS is its own."""
+    os.environ["AGNO_TELEMETRY"] = "false"
+    fixture = build_fixture(size)
+    os.chdir(workdir)
+
+    import main_latest1
+    import main_original
+    from code_metrics import MetricsCache
+    from repo_index import index_path
+    from repo_loader import clone_repository
+    from search_index import index_paths
+    from stub_model import STATS, StubModel, reset_stats
+    from symbol_index import symbol_path
+
+    # The agent factories read the module-level model when they build a team
+    main_latest1.model = main_original.model = StubModel(delay=delay)
+    for module in (main_latest1, main_original):
+        module.get_metrics_store().prometheus_file = workdir / "metrics.prom"
+        # Opening the database is part of startup (see measure_startup), not of the scenario
+        module.get_db()
+
+    try:
+        workspace = workdir / "repo"
+        clone = clone_repository(f"file://{fixture}", dest_dir=workspace)
+        if not warm:
+            # Through the modules' own helpers, so the runs stay cold when the file names change
+            for path in (index_path(clone.sha), symbol_path(clone.sha), *index_paths(clone.sha)):
+                path.unlink(missing_ok=True)
+            MetricsCache().clear()
+
+        reset_stats()
+        rss_before = _peak_rss_mb()
+        started = time.perf_counter()
+        errors = SCENARIOS[scenario](workspace, Path(clone.path).name)
+        seconds = time.perf_counter() - started
+        agents = main_latest1.get_metrics_store().summary()["agents"]
+    finally:
+        os.chdir(BASE_DIR)
+    return {
+        "fixture": size,
+        "scenario": scenario,
+        "wall_seconds": round(seconds, 3),
+        "model_calls": STATS["model_calls"],
+        "tool_calls": STATS["tool_calls"],
+        "prompt_tokens": STATS["input_tokens"],
+        "completion_tokens": STATS["output_tokens"],
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "import_rss_mb": round(rss_before, 1),
+        "errors": errors,
+        # Per-agent breakdown from the instrumentation records of this run
+        "agents": agents,
+    }
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def _revision():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def compare(previous, current):
+    """Print the change of every metric between two result files."""
+    before = {(r["fixture"], r["scenario"]): r for r in previous["results"]}
+    for r in current["results"]:
+        old = before.get((r["fixture"], r["scenario"]))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("wall_seconds", "model_calls", "tool_calls", "prompt_tokens", "completion_tokens", "peak_rss_mb"):
+            if old[metric]:
+                changes.append(f"{metric} {100 * (r[metric] - old[metric]) / old[metric]:+.1f}%")
+        print(f"{r['fixture']:<7} {r['scenario']:<15} " + ", ".join(changes))
+
+
+def routing_savings(results):
+    """Difference between the routed and the orchestrated Q&A runs, per fixture."""
+    savings = {}
+    for r in results:
+        if r["scenario"] != "qa":
+            continue
+        baseline = next((b for b in results if b["fixture"] == r["fixture"] and b["scenario"] == "qa_orchestrated"), None)
+        if baseline is not None:
+            savings[r["fixture"]] = {
+                "wall_seconds": round(baseline["wall_seconds"] - r["wall_seconds"], 3),
+                "model_calls": baseline["model_calls"] - r["model_calls"],
+                "prompt_tokens": baseline["prompt_tokens"] - r["prompt_tokens"],
+            }
+    return savings
+
+
+def print_results(results):
+    print(f"{'fixture':<7} {'scenario':<15} {'wall s':>8} {'model':>6} {'tools':>6} {'prompt':>9} {'compl':>8} {'rss MB':>8}")
+    for r in results:
+        print(
+            f"{r['fixture']:<7} {r['scenario']:<15} {r['wall_seconds']:>8.2f} {r['model_calls']:>6} "
+            f"{r['tool_calls']:>6} {r['prompt_tokens']:>9} {r['completion_tokens']:>8} {r['peak_rss_mb']:>8.1f}"
+        )
+        for error in r["errors"]:
+            print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RepoScribe flows offline on fixture repositories.")
+    parser.add_argument("--fixtures", nargs="+", choices=list(FIXTURE_SIZES), default=list(FIXTURE_SIZES))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated model latency per call, in seconds")
+    parser.add_argument("--warm", action="store_true", help="Keep the repository, symbol and search indexes and code metrics from earlier runs")
+    parser.add_argument("--output", type=Path, help="Result file (default: .reposcribe/benchmarks/<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.fixtures:
+        build_fixture(size)
+        for scenario in args.scenarios:
+            for _ in range(args.repeat):
+                results.append(in_fresh_process(run_scenario, size, scenario, args.delay, args.warm))
+
+    startup = in_fresh_process(measure_startup, args.delay)
+
+    run = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "delay": args.delay,
+        "warm": args.warm,
+        "results": results,
+        "routing": evaluate_router(),
+        "routing_savings": routing_savings(results),
+        "startup": startup,
+    }
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run, indent=2))
+
+    print_results(results)
+    routing = run["routing"]
+    print(
+        f"Intent router: {routing['routed']}/{routing['cases']} routed, accuracy {routing['accuracy']}, "
+        f"{routing['microseconds_per_question']} us per question"
+    )
+    for size, saved in run["routing_savings"].items():
+        print(f"    {size}: routing saved {saved['wall_seconds']:.2f}s, {saved['model_calls']} model calls, "
+              f"{saved['prompt_tokens']} prompt tokens")
+    print(
+        "UI startup: first render {first_render_seconds:.2f}s, rerun {rerun_seconds:.2f}s, "
+        "agents import {agents_import_seconds:.2f}s, first answer {first_answer_seconds:.2f}s, "
+        "next answer {next_answer_seconds:.2f}s, submit {submit_seconds:.2f}s".format(**startup)
+    )
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), run)
@@ -0,0 +1,580 @@
+import ast
+import bisect
+import json
+import re
+import subprocess
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from agno.tools import Toolkit
+
+from config import DB_FILE, REPO_DIR
+from repo_index import LANGUAGES, find_checkout, load_index
+from storage import connect
+
+
+# Bump when a metric is computed differently, so cached numbers are recomputed
+METRICS_VERSION = 1
+
+MAX_FILE_BYTES = 512 * 1024
+
+# Below this many uncached files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 200
+
+PYTHON_SUFFIXES = {".py", ".pyi"}
+BRACE_SUFFIXES = {
+    ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".java", ".kt", ".kts", ".scala", ".go", ".rs",
+    ".php", ".cs", ".swift", ".c", ".h", ".cc", ".cpp", ".hpp", ".cxx", ".dart", ".m",
+}
+# Not code, or not line-oriented enough for shingles
+NO_METRICS_SUFFIXES = {".ipynb", ".html", ".css", ".scss", ".sql"}
+
+# Usual thresholds (McCabe's 10, ...); the report counts functions above them
+THRESHOLDS = {"complexity": (10, 20), "length": (60, 120), "nesting": (4, 6)}
+
+# Duplicates: shingles of SHINGLE_LINES normalized lines; winnowing keeps one fingerprint per
+# WINNOW_WINDOW shingles, which still finds every copy of SHINGLE_LINES + WINNOW_WINDOW - 1 lines
+SHINGLE_LINES = 6
+WINNOW_WINDOW = 4
+HASH_BASE = 1_000_003
+HASH_MOD = (1 << 61) - 1
+# Boilerplate repeated in many files says nothing about copy-paste
+MAX_DUPLICATE_LOCATIONS = 8
+
+TRIVIAL_LINE = re.compile(r"^(?:[#/*]|--|import\b|from\b|using\b|package\b|require\b|include\b|@)")
+
+
+# -----------------------------
+# Python (ast)
+# -----------------------------
+# Keyed by node type: dict lookups are much cheaper than isinstance over a tuple per node
+BRANCH_NODES = dict.fromkeys(
+    (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.match_case), 1
+)
+NESTING_NODES = {ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith, ast.Match}
+if hasattr(ast, "TryStar"):
+    NESTING_NODES.add(ast.TryStar)
+FUNCTION_NODES = {ast.FunctionDef, ast.AsyncFunctionDef}
+# Nothing below these can branch, so they are not walked into
+LEAF_NODES = {
+    ast.Name, ast.Constant, ast.Load, ast.Store, ast.Del, ast.alias, ast.Pass, ast.Break,
+    ast.Continue, ast.Global, ast.Nonlocal, ast.Import, ast.ImportFrom,
+}
+_child_fields = {}
+
+
+def _children(node):
+    fields = _child_fields.get(type(node))
+    if fields is None:
+        fields = _child_fields[type(node)] = tuple(f for f in node._fields if f != "ctx")
+    children = []
+    for name in fields:
+        value = getattr(node, name, None)
+        if type(value) is list:
+            # Lists can hold None (the keys of {**spread}) and plain names (match class attributes)
+            children += [item for item in value if type(item) not in LEAF_NODES and isinstance(item, ast.AST)]
+        elif value is not None and type(value) not in LEAF_NODES and isinstance(value, ast.AST):
+            children.append(value)
+    return children
+
+
+def _branches(node):
+    kind = type(node)
+    if kind in BRANCH_NODES:
+        return 1
+    if kind is ast.BoolOp:
+        return len(node.values) - 1
+    if kind is ast.comprehension:
+        return 1 + len(node.ifs)
+    return 0
+
+
+def python_functions(tree):
+    """[(name, line, length, complexity, nesting)] and the decisions outside any function.
+    Nested functions are measured on their own."""
+    functions = []
+
+    def visit(node, scope, depth, stats):
+        # `elif` is an `if` alone in the else branch; it does not nest deeper
+        elif_node = node.orelse[0] if type(node) is ast.If and len(node.orelse) == 1 else None
+        for child in _children(node):
+            kind = type(child)
+            if kind in FUNCTION_NODES:
+                name = f"{scope}.{child.name}" if scope else child.name
+                inner = [1, 0]
+                visit(child, name, 0, inner)
+                functions.append((name, child.lineno, child.end_lineno - child.lineno + 1, inner[0], inner[1]))
+            elif kind is ast.ClassDef:
+                visit(child, f"{scope}.{child.name}" if scope else child.name, depth, [1, 0])
+            else:
+                stats[0] += _branches(child)
+                nested = depth + 1 if kind in NESTING_NODES and child is not elif_node else depth
+                if nested > stats[1]:
+                    stats[1] = nested
+                visit(child, scope, nested, stats)
+
+    module = [1, 0]
+    visit(tree, "", 0, module)
+    return sorted(functions, key=lambda f: f[1]), module[0] - 1
+
+
+# -----------------------------
+# Brace languages (lightweight tokenizer)
+# -----------------------------
+# Comments and string contents are blanked so braces and keywords in them do not count.
+# Quotes end at the line end (except backticks), and Rust lifetimes such as 'a are left alone.
+CODE_NOISE = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'[A-Za-z_]\w*(?![\w'])|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`",
+    re.DOTALL,
+)
+FUNCTION_HEAD = re.compile(
+    r"(?:\bfunction\b\s*\*?\s*(?P<js>[A-Za-z_$][\w$]*)?\s*\([^()]*\)"
+    r"|\bfunc\s+(?:\([^()]*\)\s*)?(?P<go>\w+)\s*(?:\[[^\]]*\])?\s*\([^()]*\)"
+    r"|\bfn\s+(?P<rs>\w+)\s*(?:<[^{;]*?>)?\s*\([^()]*\)"
+    r"|(?P<arrow>[A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=;{}]*)?=>"
+    r"|(?<![.\w$])(?P<c>[A-Za-z_$][\w$]*)\s*\([^()]*\))"
+    # Return types, `throws`, Go's (result, error), ...
+    r"[^;{}()=]*(?:\([^()]*\)[^;{}()=]*)?(?:=>\s*)?\{"
+)
+NOT_FUNCTIONS = {
+    "if", "for", "while", "switch", "catch", "return", "sizeof", "typeof", "foreach", "using", "lock",
+    "synchronized", "with", "match", "loop", "select", "else", "do", "try", "new", "await", "throw", "defer", "async",
+}
+DECISIONS = re.compile(r"\b(?:if|for|while|case|catch|foreach|elif|except)\b|&&|\|\||\s\?\s")
+CONTROL_BLOCK = re.compile(
+    r"\s*\}?\s*(?:else|if|for|while|switch|match|loop|select|do|try|catch|finally|foreach|unless)\b"
+)
+
+
+def _blank(match):
+    text = match.group()
+    if text.startswith("'") and not text.endswith("'"):
+        return text
+    return re.sub(r"[^\n]", " ", text)
+
+
+def brace_functions(text):
+    """[(name, line, length, complexity, nesting)] found by function headers followed by a body,
+    and the decisions outside any function."""
+    code = CODE_NOISE.sub(_blank, text)
+    line_starts = [0] + [m.end() for m in re.finditer("\n", code)]
+
+    # One pass over the braces: the matching close brace and the control-block depth of every {
+    close_of, opens, stack = {}, [], []
+    for match in re.finditer(r"[{}]", code):
+        pos = match.start()
+        if code[pos] == "{":
+            line_start = code.rfind("\n", 0, pos) + 1
+            control = bool(CONTROL_BLOCK.match(code, line_start, pos))
+            depth = (stack[-1][1] if stack else 0) + control
+            stack.append((pos, depth))
+            opens.append((pos, depth))
+        elif stack:
+            close_of[stack.pop()[0]] = pos
+    open_positions = [pos for pos, _ in opens]
+
+    found = []
+    for match in FUNCTION_HEAD.finditer(code):
+        name = next((g for g in match.group("js", "go", "rs", "arrow", "c") if g), "<anonymous>")
+        brace = match.end() - 1
+        if name in NOT_FUNCTIONS or brace not in close_of:
+            continue
+        close = close_of[brace]
+        first = bisect.bisect_right(line_starts, match.start())
+        last = bisect.bisect_right(line_starts, close)
+        i, j = bisect.bisect_left(open_positions, brace), bisect.bisect_left(open_positions, close)
+        base = opens[i][1]
+        nesting = max((depth - base for _, depth in opens[i + 1:j]), default=0)
+        decisions = len(DECISIONS.findall(code, brace, close))
+        found.append([name, first, last - first + 1, decisions, nesting, brace, close])
+
+    # Decisions inside a nested function (a callback, a closure) belong to it, not to its parent
+    found.sort(key=lambda f: f[5])
+    parents = []
+    for function in found:
+        while parents and parents[-1][6] < function[5]:
+            parents.pop()
+        if parents:
+            parents[-1][3] -= function[3]
+        parents.append(function)
+    functions = [(name, line, length, decisions + 1, nesting) for name, line, length, decisions, nesting, _, _ in found]
+    return functions, len(DECISIONS.findall(code)) - sum(f[3] - 1 for f in functions)
+
+
+# -----------------------------
+# Duplicate shingles
+# -----------------------------
+def shingles(lines):
+    """Winnowed fingerprints [hash, first_line, last_line] of SHINGLE_LINES consecutive normalized lines."""
+    normalized = []
+    for number, line in enumerate(lines, 1):
+        line = " ".join(line.split())
+        if len(line) > 3 and not TRIVIAL_LINE.match(line):
+            normalized.append((zlib.crc32(line.encode()), number))
+    if len(normalized) < SHINGLE_LINES:
+        return []
+
+    # Rabin-Karp over line hashes: each window's hash is derived from the previous one
+    top = pow(HASH_BASE, SHINGLE_LINES - 1, HASH_MOD)
+    window_hash = 0
+    for line_hash, _ in normalized[:SHINGLE_LINES]:
+        window_hash = (window_hash * HASH_BASE + line_hash) % HASH_MOD
+    hashes = [window_hash]
+    for i in range(SHINGLE_LINES, len(normalized)):
+        window_hash = ((window_hash - normalized[i - SHINGLE_LINES][0] * top) * HASH_BASE + normalized[i][0]) % HASH_MOD
+        hashes.append(window_hash)
+
+    selected, last = [], -1
+    for start in range(max(1, len(hashes) - WINNOW_WINDOW + 1)):
+        window = hashes[start:start + WINNOW_WINDOW]
+        # Rightmost minimum, so a run of equal hashes keeps one fingerprint
+        pick = start + len(window) - 1 - window[::-1].index(min(window))
+        if pick != last:
+            selected.append([hashes[pick], normalized[pick][1], normalized[pick + SHINGLE_LINES - 1][1]])
+            last = pick
+    return selected
+
+
+# -----------------------------
+# Per-file metrics
+# -----------------------------
+def measure_file(item):
+    """Metrics of one file's content; no path in them, so they can be cached by content hash."""
+    checkout, path = item
+    suffix = Path(path).suffix.lower()
+    try:
+        text = (Path(checkout) / path).read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    lines = text.splitlines()
+    blank = sum(1 for line in lines if not line.strip())
+    comment_prefixes = ("#",) if suffix in PYTHON_SUFFIXES else ("//", "/*", "*", "#")
+    comments = sum(1 for line in lines if line.lstrip().startswith(comment_prefixes))
+
+    functions, top_level = [], 0
+    if suffix in PYTHON_SUFFIXES:
+        try:
+            functions, top_level = python_functions(ast.parse(text))
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    elif suffix in BRACE_SUFFIXES:
+        functions, top_level = brace_functions(text)
+    return {
+        "lines": len(lines),
+        "code": len(lines) - blank - comments,
+        "comments": comments,
+        "complexity": top_level + sum(f[3] for f in functions),
+        "functions": [list(f) for f in functions],
+        "shingles": shingles(lines),
+    }
+
+
+def _measurable(index):
+    return [
+        path for path, size in index["files"]
+        if Path(path).suffix.lower() in LANGUAGES
+        and Path(path).suffix.lower() not in NO_METRICS_SUFFIXES
+        and size <= MAX_FILE_BYTES
+    ]
+
+
+def content_hashes(checkout, paths):
+    """{path: git blob id}. Blob ids of tracked, unmodified files come from the git index
+    without reading them; only new and modified files are hashed."""
+    checkout = Path(checkout)
+    hashes = {}
+    listed = subprocess.run(["git", "-C", str(checkout), "ls-files", "-s", "-z"], capture_output=True)
+    dirty = subprocess.run(
+        ["git", "-C", str(checkout), "ls-files", "-z", "--modified", "--others", "--exclude-standard"],
+        capture_output=True,
+    )
+    if listed.returncode == 0 and dirty.returncode == 0:
+        modified = set(dirty.stdout.decode("utf-8", errors="replace").split("\0"))
+        for entry in listed.stdout.decode("utf-8", errors="replace").split("\0"):
+            meta, _, path = entry.partition("\t")
+            if path and path not in modified:
+                hashes[path] = meta.split(" ")[1]
+    missing = [p for p in paths if p not in hashes]
+    if missing:
+        output = subprocess.run(
+            ["git", "hash-object", "--no-filters", "--stdin-paths"],
+            input="\n".join(str(checkout / p) for p in missing).encode(), capture_output=True,
+        )
+        hashes.update(zip(missing, output.stdout.decode().split()))
+    return {path: hashes[path] for path in paths if path in hashes}
+
+
+# -----------------------------
+# Metrics cache
+# -----------------------------
+class MetricsCache:
+    """Per-file metrics keyed by content hash, stored in SQLite. Unchanged files are never re-measured,
+    whatever the commit or path."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS code_metrics (
+                    hash TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    metrics TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (hash, version)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_code_metrics_created ON code_metrics (created_at)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def get_many(self, hashes):
+        hashes = list(hashes)
+        found = {}
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT hash, metrics FROM code_metrics WHERE version = ? AND hash IN ({placeholders})",
+                    [METRICS_VERSION, *batch],
+                )
+                found.update((digest, json.loads(metrics)) for digest, metrics in rows)
+        return found
+
+    def put_many(self, metrics):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO code_metrics (hash, version, metrics, created_at) VALUES (?, ?, ?, ?)",
+                [(digest, METRICS_VERSION, json.dumps(m, separators=(",", ":")), now) for digest, m in metrics.items()],
+            )
+
+    def clear(self):
+        """Forget every measurement, so the next run measures all files again."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM code_metrics")
+
+
+def measure_files(checkout, files, max_workers=None):
+    items = [(str(checkout), path) for path in files]
+    if len(items) < PARALLEL_THRESHOLD:
+        results = map(measure_file, items)
+        return {path: m for (_, path), m in zip(items, results) if m is not None}
+    # Fresh interpreters; forking the multithreaded server can deadlock the workers
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        results = pool.map(measure_file, items, chunksize=32)
+        return {path: m for (_, path), m in zip(items, results) if m is not None}
+
+
+# In-process copies of the last few commits, so the agent's follow-up calls do not re-read the cache
+MAX_LOADED_COMMITS = 4
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def load_file_metrics(checkout, cache=None):
+    """{path: metrics} for every measurable file of `checkout`; only files whose content was
+    never measured before are read."""
+    index = load_index(checkout)
+    sha = index["sha"]
+    with _loaded_lock:
+        if sha and sha in _loaded:
+            _loaded.move_to_end(sha)
+            return _loaded[sha]
+    cache = cache or MetricsCache()
+    files = _measurable(index)
+    hashes = content_hashes(checkout, files)
+    cached = cache.get_many(set(hashes.values()))
+    metrics = {path: cached[hashes[path]] for path in files if hashes.get(path) in cached}
+    fresh = measure_files(checkout, [path for path in files if path not in metrics])
+    cache.put_many({hashes[path]: m for path, m in fresh.items() if path in hashes})
+    metrics.update(fresh)
+    if sha:
+        with _loaded_lock:
+            _loaded[sha] = metrics
+            _loaded.move_to_end(sha)
+            while len(_loaded) > MAX_LOADED_COMMITS:
+                _loaded.popitem(last=False)
+    return metrics
+
+
+# -----------------------------
+# Aggregation
+# -----------------------------
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    # Nearest rank
+    return {f"p{p}": values[min(len(values) - 1, p * len(values) // 100)] for p in (50, 90, 95, 99)} | {"max": values[-1]}
+
+
+def duplicate_blocks(metrics, min_lines=SHINGLE_LINES):
+    """Copied blocks as (lines, path_a, first_a, last_a, path_b, first_b, last_b), largest first."""
+    locations = {}
+    for path, m in metrics.items():
+        for digest, first, last in m["shingles"]:
+            locations.setdefault(digest, []).append((path, first, last))
+
+    pairs = {}
+    for places in locations.values():
+        if not 1 < len(places) <= MAX_DUPLICATE_LOCATIONS:
+            continue
+        places.sort()
+        for i, (path_a, first_a, last_a) in enumerate(places):
+            for path_b, first_b, last_b in places[i + 1:]:
+                if path_a == path_b and first_b <= last_a:
+                    continue
+                pairs.setdefault((path_a, path_b), []).append((first_a, last_a, first_b, last_b))
+
+    # Fingerprints of one copied block follow each other on both sides; merge them into one range
+    blocks = []
+    for (path_a, path_b), matches in pairs.items():
+        matches.sort()
+        current = None
+        for first_a, last_a, first_b, last_b in matches:
+            if current and first_a <= current[1] + SHINGLE_LINES and current[2] <= first_b <= current[3] + SHINGLE_LINES:
+                current = [current[0], max(current[1], last_a), current[2], max(current[3], last_b)]
+                continue
+            if current:
+                blocks.append((current[1] - current[0] + 1, path_a, current[0], current[1], path_b, current[2], current[3]))
+            current = [first_a, last_a, first_b, last_b]
+        blocks.append((current[1] - current[0] + 1, path_a, current[0], current[1], path_b, current[2], current[3]))
+    return sorted((b for b in blocks if b[0] >= min_lines), reverse=True)
+
+
+def _duplicated_lines(blocks):
+    covered = {}
+    for _, path_a, first_a, last_a, path_b, first_b, last_b in blocks:
+        covered.setdefault(path_a, set()).update(range(first_a, last_a + 1))
+        covered.setdefault(path_b, set()).update(range(first_b, last_b + 1))
+    return sum(len(lines) for lines in covered.values())
+
+
+def metrics_report(metrics, prefix=None, top=10):
+    """Percentiles, counts above the usual thresholds and the worst offenders, for the agent to interpret."""
+    metrics = {p: m for p, m in metrics.items() if not prefix or p.startswith(prefix)}
+    functions = [(path, *f) for path, m in metrics.items() for f in m["functions"]]
+    code_lines = sum(m["code"] for m in metrics.values())
+    blocks = duplicate_blocks(metrics)
+    duplicated = _duplicated_lines(blocks)
+
+    def function_entries(key):
+        ranked = sorted(functions, key=key, reverse=True)[:top]
+        return [
+            {"function": f"{path}:{line} {name}", "complexity": complexity, "length": length, "nesting": nesting}
+            for path, name, line, length, complexity, nesting in ranked
+        ]
+
+    languages = Counter()
+    for path, m in metrics.items():
+        languages[LANGUAGES.get(Path(path).suffix.lower(), "Other")] += m["code"]
+
+    return {
+        "files": len(metrics),
+        "functions": len(functions),
+        "lines": {"total": sum(m["lines"] for m in metrics.values()), "code": code_lines,
+                  "comments": sum(m["comments"] for m in metrics.values())},
+        "code_lines_by_language": dict(languages.most_common()),
+        "percentiles": {
+            "function_complexity": percentiles([f[4] for f in functions]),
+            "function_length": percentiles([f[3] for f in functions]),
+            "function_nesting": percentiles([f[5] for f in functions]),
+            "file_code_lines": percentiles([m["code"] for m in metrics.values()]),
+        },
+        "functions_over_threshold": {
+            f"{metric} > {limit}": sum(1 for f in functions if f[column] > limit)
+            for metric, column in (("complexity", 4), ("length", 3), ("nesting", 5))
+            for limit in THRESHOLDS[metric]
+        },
+        "hotspots": {
+            "most_complex_functions": function_entries(lambda f: (f[4], f[3])),
+            "longest_functions": function_entries(lambda f: (f[3], f[4])),
+            "deepest_nesting": function_entries(lambda f: (f[5], f[4])),
+            "most_complex_files": [
+                {"file": path, "complexity": m["complexity"], "code_lines": m["code"], "functions": len(m["functions"])}
+                for path, m in sorted(metrics.items(), key=lambda kv: kv[1]["complexity"], reverse=True)[:top]
+            ],
+        },
+        "duplication": {
+            "duplicated_lines": duplicated,
+            "share_of_code": round(duplicated / code_lines, 3) if code_lines else 0.0,
+            "largest_blocks": [
+                {"lines": lines, "copies": [f"{path_a}:{first_a}-{last_a}", f"{path_b}:{first_b}-{last_b}"]}
+                for lines, path_a, first_a, last_a, path_b, first_b, last_b in blocks[:top]
+            ],
+        },
+    }
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class CodeMetricsTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, cache=None, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        self.cache = cache
+        super().__init__(
+            name="code_metrics_tools",
+            tools=[self.code_metrics, self.file_metrics],
+            **kwargs,
+        )
+
+    def _metrics(self):
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return None
+        return load_file_metrics(checkout, cache=self.cache)
+
+    def code_metrics(self, path: str | None = None, top: int = 10) -> str:
+        """Measured code-quality metrics for the whole repository: lines of code, per-function
+        cyclomatic complexity, length and nesting depth as percentiles, counts above the usual
+        thresholds, the worst functions and files, and copy-pasted blocks.
+
+        Args:
+            path (str | None): Only files under this directory, e.g. "src/api/".
+            top (int): Number of entries in each hotspot list.
+
+        Returns:
+            str: JSON report.
+        """
+        metrics = self._metrics()
+        if metrics is None:
+            return "No cloned repository found."
+        return json.dumps(metrics_report(metrics, prefix=path, top=top), indent=2)
+
+    def file_metrics(self, path: str) -> str:
+        """Metrics of one file and each of its functions.
+
+        Args:
+            path (str): File path relative to the repository root.
+
+        Returns:
+            str: JSON with line counts and, per function, line, length, complexity and nesting.
+        """
+        metrics = self._metrics()
+        if metrics is None:
+            return "No cloned repository found."
+        m = metrics.get(path.removeprefix("./"))
+        if m is None:
+            return f"No metrics for {path}: not a source file of the repository."
+        return json.dumps({
+            "file": path,
+            "lines": m["lines"],
+            "code": m["code"],
+            "comments": m["comments"],
+            "complexity": m["complexity"],
+            "functions": [
+                {"name": name, "line": line, "length": length, "complexity": complexity, "nesting": nesting}
+                for name, line, length, complexity, nesting in m["functions"]
+            ],
+        }, indent=2)
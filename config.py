@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+
+# Base directories shared by the agents, the UI and the helper modules
+BASE_DIR = Path(__file__).parent
+REPO_DIR = BASE_DIR / "repo"
+
+# Local state produced by RepoScribe itself (indexes, caches, ...)
+CACHE_DIR = BASE_DIR / ".reposcribe"
+
+# SQLite file shared by agent sessions and RepoScribe's own caches. Absolute, so
+# every process uses the same file wherever it starts; REPOSCRIBE_DB overrides it.
+DB_FILE = Path(os.environ.get("REPOSCRIBE_DB") or BASE_DIR / "memory.db")
+
+# Set REPOSCRIBE_OFFLINE=1 for air-gapped deployments: nothing is looked up on the web
+OFFLINE = os.environ.get("REPOSCRIBE_OFFLINE", "") not in ("", "0")
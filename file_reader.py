@@ -0,0 +1,213 @@
+import bisect
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+# Upper bounds for one answer; whatever is cut is replaced with an explicit marker
+MAX_READ_BYTES = 64 * 1024
+MAX_READ_LINES = 400
+MAX_LINE_CHARS = 2000
+MAX_MATCHES = 50
+MAX_CONTEXT_LINES = 5
+
+# Newlines are counted in windows; the count at each window boundary is remembered
+# per file, so reading deep into a big file twice does not scan it from the top twice
+COUNT_WINDOW = 1024 * 1024
+MAX_CHECKPOINTED_FILES = 32
+
+_checkpoints = OrderedDict()
+_checkpoints_lock = threading.Lock()
+
+
+@contextmanager
+def mapped(path):
+    """The file as a read-only buffer; pages are only loaded as they are touched."""
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            # Empty files cannot be mapped
+            yield b"", stat
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm, stat
+
+
+def _decode(raw):
+    text = raw.decode("utf-8", errors="replace").rstrip("\r")
+    if len(text) > MAX_LINE_CHARS:
+        return f"{text[:MAX_LINE_CHARS]} [... line truncated, {len(text) - MAX_LINE_CHARS} more characters]"
+    return text
+
+
+def _line_end(buf, start):
+    end = buf.find(b"\n", start)
+    return len(buf) if end == -1 else end
+
+
+def _line_start(buf, pos):
+    return buf.rfind(b"\n", 0, pos) + 1
+
+
+def count_newlines(buf, start, end):
+    # In windows, so counting never copies more than COUNT_WINDOW bytes at once
+    return sum(buf[i:min(i + COUNT_WINDOW, end)].count(b"\n") for i in range(start, end, COUNT_WINDOW))
+
+
+def _seek_line(buf, stat, path, line):
+    """Byte offset where 1-based `line` starts, or None past the end of the file."""
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _checkpoints_lock:
+        # (newlines before offset, offset) at every COUNT_WINDOW boundary scanned so far
+        checkpoints = _checkpoints.pop(key, [(0, 0)])
+        _checkpoints[key] = checkpoints
+        while len(_checkpoints) > MAX_CHECKPOINTED_FILES:
+            _checkpoints.popitem(last=False)
+
+    wanted = line - 1
+    newlines, pos = checkpoints[bisect.bisect_right(checkpoints, (wanted, len(buf))) - 1]
+    # Whole windows are counted in C; only the last one is walked line by line
+    while True:
+        window_end = min(pos + COUNT_WINDOW, len(buf))
+        count = buf[pos:window_end].count(b"\n")
+        if newlines + count >= wanted or window_end == len(buf):
+            break
+        newlines, pos = newlines + count, window_end
+        if pos % COUNT_WINDOW == 0 and (newlines, pos) > checkpoints[-1]:
+            checkpoints.append((newlines, pos))
+    while newlines < wanted:
+        newline = buf.find(b"\n", pos)
+        if newline == -1:
+            return None
+        newlines, pos = newlines + 1, newline + 1
+    return pos if pos < len(buf) or line == 1 else None
+
+
+def format_lines(lines, numbered=True):
+    return "\n".join(f"{n}: {text}" if numbered else text for n, text in lines)
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def read_lines(path, start_line=1, end_line=None, max_lines=MAX_READ_LINES, max_bytes=MAX_READ_BYTES, numbered=True, line_base=1):
+    """Lines `start_line`..`end_line` (1-based, inclusive) of `path`, with a marker when cut short.
+
+    `line_base` only changes how the marker numbers the next line, for callers that count from 0.
+    """
+    start_line = max(1, start_line)
+    last_line = start_line + max_lines - 1 if end_line is None else min(end_line, start_line + max_lines - 1)
+    with mapped(path) as (buf, stat):
+        pos = _seek_line(buf, stat, path, start_line)
+        if pos is None:
+            return f"[start_line {start_line} is past the end of the file]"
+        lines, used, line = [], 0, start_line
+        while line <= last_line and pos < len(buf) and used < max_bytes:
+            end = _line_end(buf, pos)
+            lines.append((line, _decode(buf[pos:min(end, pos + 4 * MAX_LINE_CHARS)])))
+            used += min(end - pos, 4 * MAX_LINE_CHARS) + 1
+            pos, line = end + 1, line + 1
+        text = format_lines(lines, numbered)
+        if pos < len(buf) and (end_line is None or line <= end_line):
+            text += (
+                f"\n[... truncated after line {line - 2 + line_base}; {len(buf) - pos} more bytes. "
+                f"Continue from line {line - 1 + line_base}]"
+            )
+        return text
+
+
+def read_tail(path, lines=50, max_bytes=MAX_READ_BYTES, numbered=True):
+    """The last `lines` lines of `path`, numbered, with a marker for what comes before."""
+    lines = max(1, min(lines, MAX_READ_LINES))
+    with mapped(path) as (buf, _):
+        end = len(buf)
+        if buf[end - 1:end] == b"\n":
+            end -= 1
+        start = _line_start(buf, end)
+        for _ in range(lines - 1):
+            if start == 0 or end - start >= max_bytes:
+                break
+            start = _line_start(buf, start - 1)
+        # A single huge last line (minified code, a dump) is cut, not read whole
+        start = max(start, end - max_bytes)
+        first_line = count_newlines(buf, 0, start) + 1
+        selected = buf[start:end].split(b"\n") if end > start else []
+        text = format_lines(((first_line + i, _decode(raw)) for i, raw in enumerate(selected)), numbered)
+        if start > 0:
+            text = f"[... {first_line - 1} earlier lines ({start} bytes) not shown]\n" + text
+        return text
+
+
+def read_bytes(path, offset=0, length=4096, max_bytes=MAX_READ_BYTES):
+    """Bytes `offset`..`offset + length` of `path`, decoded as UTF-8; a negative offset counts from the end."""
+    with mapped(path) as (buf, _):
+        size = len(buf)
+        start = max(0, size + offset) if offset < 0 else min(offset, size)
+        end = min(size, start + max(0, min(length, max_bytes)))
+        text = buf[start:end].decode("utf-8", errors="replace")
+        header = f"[bytes {start}-{end} of {size}]"
+        if end - start < length and end < size:
+            return f"{header}\n{text}\n[... truncated at {max_bytes} bytes per read; continue from offset {end}]"
+        return f"{header}\n{text}"
+
+
+def grep(path, pattern, ignore_case=False, context=0, max_matches=MAX_MATCHES, max_bytes=MAX_READ_BYTES):
+    """Lines of `path` matching the regular expression `pattern`, numbered, with `context` lines around them."""
+    if not pattern:
+        return "Error: the pattern is empty."
+    flags = re.IGNORECASE if ignore_case else 0
+    try:
+        regex = re.compile(pattern.encode(), flags)
+    except re.error:
+        # Models often pass code fragments such as "foo(" that are not valid expressions
+        regex = re.compile(re.escape(pattern.encode()), flags)
+    context = max(0, min(context, MAX_CONTEXT_LINES))
+
+    with mapped(path) as (buf, _):
+        blocks, used, matches = [], 0, 0
+        counted_pos, counted_line = 0, 1
+        shown_until = -1
+        truncated = False
+        for match in regex.finditer(buf):
+            line_start = _line_start(buf, match.start())
+            if line_start <= shown_until:
+                # Another match on a line that is already shown
+                continue
+            if matches == max_matches or used >= max_bytes:
+                truncated = True
+                break
+            counted_line += count_newlines(buf, counted_pos, line_start)
+            counted_pos = line_start
+            matches += 1
+
+            start = line_start
+            for _ in range(context):
+                # Context lines already shown with the previous match are not repeated
+                if start <= shown_until + 1:
+                    break
+                start = _line_start(buf, start - 1)
+            start = max(start, shown_until + 1)
+            first = counted_line - count_newlines(buf, start, line_start)
+            end = _line_end(buf, match.end())
+            for _ in range(context):
+                if end + 1 >= len(buf):
+                    break
+                end = _line_end(buf, end + 1)
+            block, pos = [], start
+            while pos <= end:
+                line_end = _line_end(buf, pos)
+                # Huge lines are cut before decoding, so a minified file is never copied whole
+                block.append((first + len(block), _decode(buf[pos:min(line_end, pos + 4 * MAX_LINE_CHARS)])))
+                pos = line_end + 1
+            used += sum(len(text) for _, text in block)
+            shown_until = end
+            blocks.append(format_lines(block))
+        if not blocks:
+            return f"No line matches {pattern!r}."
+        text = "\n--\n".join(blocks)
+        if truncated:
+            text += f"\n[... stopped after {matches} matches; narrow the pattern to see more]"
+        return text
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import REPO_DIR
+from repo_index import find_checkout
+from repo_loader import CloneError, clone_repository, repo_name
+
+
+# Stages from flow.md; agents inside a stage do not depend on one another and
+# only see the joined output of the stages before them.
+FLOW_STAGES = [
+    ("analysis", [
+        "repo_metadata_agent",
+        "file_analyzer_agent",
+        "dependency_analysis_agent",
+        "code_quality_agent",
+        "error_documentation_agent",
+    ]),
+    ("understanding", ["code_understanding_agent"]),
+    ("onboarding", ["onboarding_agent", "compliance_agent"]),
+    ("readme", ["readme_preview_agent"]),
+    ("extras", ["learning_resource_agent", "test_generator_agent"]),
+]
+
+DEFAULT_CONCURRENCY = 5
+
+
+@dataclass
+class AgentResult:
+    agent_id: str
+    agent_name: str
+    content: str = ""
+    seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    results: list = field(default_factory=list)
+    seconds: float = 0.0
+
+
+@dataclass
+class FlowReport:
+    repo: str
+    stages: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def agent_seconds(self):
+        # What the same run costs when every agent runs one after another
+        return sum(r.seconds for stage in self.stages for r in stage.results)
+
+    def result(self, agent_id):
+        for stage in self.stages:
+            for r in stage.results:
+                if r.agent_id == agent_id:
+                    return r
+        return None
+
+
+def _context_block(stages):
+    sections = []
+    for stage in stages:
+        for r in stage.results:
+            if r.error is None and r.content:
+                sections.append(f"### {r.agent_name}\n{r.content}")
+    if not sections:
+        return ""
+    return "Analysis already completed by other agents:\n\n" + "\n\n".join(sections)
+
+
+def _stage_task(repo, stage_name, previous):
+    task = (
+        f"The repository '{repo}' is already cloned. Perform your {stage_name} step for it. "
+        "The analysis runs non-interactively: do not wait for confirmation, report your findings directly."
+    )
+    context = _context_block(previous)
+    return f"{task}\n\n{context}" if context else task
+
+
+async def _run_agent(agent, task, semaphore):
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            output = await agent.arun(task, stream=False)
+            content = output.content if isinstance(output.content, str) else str(output.content)
+            return AgentResult(agent.id, agent.name, content, time.perf_counter() - started)
+        except Exception as e:
+            return AgentResult(agent.id, agent.name, seconds=time.perf_counter() - started, error=str(e))
+
+
+async def run_stage(name, agents, task, max_concurrency=DEFAULT_CONCURRENCY):
+    """Run the independent `agents` of one stage concurrently and join their results."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_run_agent(agent, task, semaphore) for agent in agents))
+    return StageResult(name, list(results), time.perf_counter() - started)
+
+
+async def run_flow(team, repo, stages=FLOW_STAGES, max_concurrency=DEFAULT_CONCURRENCY):
+    members = {member.id: member for member in team.members}
+    report = FlowReport(repo=repo)
+    started = time.perf_counter()
+    for name, agent_ids in stages:
+        agents = [members[agent_id] for agent_id in agent_ids if agent_id in members]
+        if not agents:
+            continue
+        task = _stage_task(repo, name, report.stages)
+        report.stages.append(await run_stage(name, agents, task, max_concurrency))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def prepare_checkout(repo, repo_dir=REPO_DIR):
+    """Clone `repo` unless it is already present in `repo_dir`; return the checkout name."""
+    repo_dir = Path(repo_dir)
+    if "://" not in repo and not repo.startswith("git@"):
+        checkout = find_checkout(repo_dir)
+        return checkout.name if checkout else repo
+    try:
+        clone_repository(repo, dest_dir=repo_dir)
+    except CloneError:
+        if not (repo_dir / repo_name(repo) / ".git").exists():
+            raise
+    return repo_name(repo)
+
+
+def run_full_analysis(team, repo, stages=FLOW_STAGES, max_concurrency=DEFAULT_CONCURRENCY, repo_dir=REPO_DIR):
+    name = prepare_checkout(repo, repo_dir)
+    return asyncio.run(run_flow(team, name, stages, max_concurrency))
+
+
+def print_report(report):
+    for stage in report.stages:
+        print(f"[{stage.name}] {stage.seconds:.1f}s")
+        for r in stage.results:
+            status = f"error: {r.error}" if r.error else "ok"
+            print(f"  {r.agent_name:<32} {r.seconds:6.1f}s  {status}")
+    print(f"Wall clock: {report.seconds:.1f}s (sequential estimate {report.agent_seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full RepoScribe analysis flow with parallel stages.")
+    parser.add_argument("repo", help="Repository URL, or the name of an already cloned repository")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    from main_latest1 import repo_chatbot_team
+
+    report = run_full_analysis(repo_chatbot_team, args.repo, max_concurrency=args.concurrency)
+    readme = report.result("readme_preview_agent")
+    if readme and readme.content:
+        print(readme.content)
+    print_report(report)
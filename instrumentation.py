@@ -0,0 +1,412 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from config import CACHE_DIR, DB_FILE
+from storage import connect
+
+
+PROMETHEUS_FILE = CACHE_DIR / "metrics.prom"
+
+# Quantiles are computed over this trailing window; counters cover all time
+QUANTILE_WINDOW_SECONDS = 3600
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _size(value):
+    if value is None:
+        return 0
+    if not isinstance(value, (str, bytes)):
+        value = json.dumps(value, default=str)
+    return len(value.encode() if isinstance(value, str) else value)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# -----------------------------
+# Metrics store
+# -----------------------------
+class MetricsStore:
+    """One row per agent run (a delegation, or a direct call) and per tool call, in SQLite."""
+
+    def __init__(self, db_file=DB_FILE, prometheus_file=PROMETHEUS_FILE):
+        self.db_file = str(db_file)
+        # Refreshed after every instrumented team run; None disables the export
+        self.prometheus_file = prometheus_file
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    tool_name TEXT,
+                    session_id TEXT,
+                    run_id TEXT,
+                    started_at REAL NOT NULL,
+                    ended_at REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    model_latency REAL,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    args_bytes INTEGER NOT NULL DEFAULT 0,
+                    output_bytes INTEGER NOT NULL DEFAULT 0,
+                    cache_hit INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_started ON agent_metrics (started_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_session ON agent_metrics (session_id)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def record_many(self, rows):
+        with self._lock, self._connect() as conn:
+            for row in rows:
+                columns = ",".join(row)
+                placeholders = ",".join("?" * len(row))
+                conn.execute(f"INSERT INTO agent_metrics ({columns}) VALUES ({placeholders})", list(row.values()))
+
+    def nested_seconds(self, session_id, started, ended, exclude_agent_id):
+        """Time spent in runs of other agents inside [started, ended], i.e. a team's delegations."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT SUM(duration) FROM agent_metrics WHERE kind = 'run' AND session_id IS ? "
+                "AND started_at >= ? AND ended_at <= ? AND agent_id != ?",
+                (session_id, started, ended, exclude_agent_id),
+            ).fetchone()
+        return row[0] or 0.0
+
+    def rows(self, since=None, session_id=None):
+        query, params = "SELECT * FROM agent_metrics WHERE started_at >= ?", [since or 0]
+        if session_id is not None:
+            query += " AND session_id = ?"
+            params.append(session_id)
+        with self._lock, self._connect() as conn:
+            # On the cursor: the connection is shared with the thread's other stores
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            return [dict(row) for row in cursor.execute(query, params)]
+
+    def summary(self, since=None, session_id=None):
+        """Per-agent and per-tool aggregates, hottest first."""
+        agents, tools = {}, {}
+        for row in self.rows(since, session_id):
+            if row["kind"] == "run":
+                entry = agents.setdefault(row["agent_id"], {"durations": [], "model": [], "input_tokens": 0,
+                                                            "output_tokens": 0, "cache_hits": 0, "errors": 0})
+                entry["durations"].append(row["duration"])
+                if row["model_latency"] is not None:
+                    entry["model"].append(row["model_latency"])
+                entry["input_tokens"] += row["input_tokens"]
+                entry["output_tokens"] += row["output_tokens"]
+                entry["cache_hits"] += row["cache_hit"]
+            else:
+                entry = tools.setdefault((row["agent_id"], row["tool_name"]), {"durations": [], "args_bytes": 0,
+                                                                              "output_bytes": 0, "errors": 0})
+                entry["durations"].append(row["duration"])
+                entry["args_bytes"] += row["args_bytes"]
+                entry["output_bytes"] += row["output_bytes"]
+            entry["errors"] += row["error"] is not None
+
+        agent_rows = [
+            {
+                "agent": agent_id,
+                "runs": len(e["durations"]),
+                "total_s": round(sum(e["durations"]), 3),
+                "p50_s": round(percentile(e["durations"], 0.5), 3),
+                "p95_s": round(percentile(e["durations"], 0.95), 3),
+                "model_s": round(sum(e["model"]), 3),
+                "prompt_tokens": e["input_tokens"],
+                "completion_tokens": e["output_tokens"],
+                "cache_hits": e["cache_hits"],
+                "errors": e["errors"],
+            }
+            for agent_id, e in agents.items()
+        ]
+        tool_rows = [
+            {
+                "agent": agent_id,
+                "tool": tool_name,
+                "calls": len(e["durations"]),
+                "total_s": round(sum(e["durations"]), 3),
+                "p95_s": round(percentile(e["durations"], 0.95), 3),
+                "args_bytes": e["args_bytes"],
+                "output_bytes": e["output_bytes"],
+                "errors": e["errors"],
+            }
+            for (agent_id, tool_name), e in tools.items()
+        ]
+        agent_rows.sort(key=lambda r: r["total_s"], reverse=True)
+        tool_rows.sort(key=lambda r: r["total_s"], reverse=True)
+        return {"agents": agent_rows, "tools": tool_rows}
+
+    def prometheus(self, window_seconds=QUANTILE_WINDOW_SECONDS):
+        """Render the store in the Prometheus text exposition format."""
+        with self._lock, self._connect() as conn:
+            runs = conn.execute(
+                "SELECT agent_id, COUNT(*), SUM(duration), SUM(COALESCE(model_latency, 0)), SUM(input_tokens), "
+                "SUM(output_tokens), SUM(cache_hit), SUM(error IS NOT NULL) "
+                "FROM agent_metrics WHERE kind = 'run' GROUP BY agent_id ORDER BY agent_id"
+            ).fetchall()
+            tools = conn.execute(
+                "SELECT agent_id, tool_name, COUNT(*), SUM(duration), SUM(args_bytes), SUM(output_bytes), "
+                "SUM(error IS NOT NULL) FROM agent_metrics WHERE kind = 'tool' "
+                "GROUP BY agent_id, tool_name ORDER BY agent_id, tool_name"
+            ).fetchall()
+            recent = conn.execute(
+                "SELECT agent_id, duration FROM agent_metrics WHERE kind = 'run' AND started_at >= ?",
+                (time.time() - window_seconds,),
+            ).fetchall()
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        metric("reposcribe_agent_runs_total", "counter", "Agent runs, including cache hits.",
+               [({"agent": r[0]}, r[1]) for r in runs])
+        metric("reposcribe_agent_run_seconds_total", "counter", "Wall-clock time spent in agent runs.",
+               [({"agent": r[0]}, round(r[2], 6)) for r in runs])
+        metric("reposcribe_agent_model_seconds_total", "counter", "Time spent waiting on the model.",
+               [({"agent": r[0]}, round(r[3], 6)) for r in runs])
+        metric("reposcribe_agent_tokens_total", "counter", "Tokens used by agent runs.",
+               [({"agent": r[0], "type": "prompt"}, r[4]) for r in runs]
+               + [({"agent": r[0], "type": "completion"}, r[5]) for r in runs])
+        metric("reposcribe_agent_cache_hits_total", "counter", "Agent runs answered from the result cache.",
+               [({"agent": r[0]}, r[6]) for r in runs])
+        metric("reposcribe_agent_errors_total", "counter", "Agent runs that failed.",
+               [({"agent": r[0]}, r[7]) for r in runs])
+
+        durations = {}
+        for agent_id, duration in recent:
+            durations.setdefault(agent_id, []).append(duration)
+        metric("reposcribe_agent_run_seconds", "gauge",
+               f"Agent run latency quantiles over the last {window_seconds}s.",
+               [({"agent": agent_id, "quantile": str(q)}, round(percentile(values, q), 6))
+                for agent_id, values in sorted(durations.items()) for q in QUANTILES])
+
+        metric("reposcribe_tool_calls_total", "counter", "Tool calls.",
+               [({"agent": r[0], "tool": r[1]}, r[2]) for r in tools])
+        metric("reposcribe_tool_seconds_total", "counter", "Time spent in tool calls.",
+               [({"agent": r[0], "tool": r[1]}, round(r[3], 6)) for r in tools])
+        metric("reposcribe_tool_argument_bytes_total", "counter", "Size of tool call arguments.",
+               [({"agent": r[0], "tool": r[1]}, r[4]) for r in tools])
+        metric("reposcribe_tool_output_bytes_total", "counter", "Size of tool call results.",
+               [({"agent": r[0], "tool": r[1]}, r[5]) for r in tools])
+        metric("reposcribe_tool_errors_total", "counter", "Tool calls that raised.",
+               [({"agent": r[0], "tool": r[1]}, r[6]) for r in tools])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        # Written to a temporary file and renamed, so scrapers never see half a file
+        path = Path(path or self.prometheus_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = self.prometheus()
+        # Concurrent team runs all export; each writer gets its own temp file and
+        # the renames happen one at a time
+        temporary = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+        with self._lock:
+            try:
+                temporary.write_text(text)
+                os.replace(temporary, path)
+            finally:
+                temporary.unlink(missing_ok=True)
+
+
+# -----------------------------
+# Agent wiring
+# -----------------------------
+def _tool_duration(tool):
+    return tool.metrics.duration if tool.metrics is not None and tool.metrics.duration else 0.0
+
+
+def instrument_agent(agent, store, on_complete=None):
+    """Record every run of `agent` (or a team) and the tool calls made during it."""
+    # Imported here so the store (and the UI sidebar using it) does not load agno
+    from agno.run.agent import RunOutput
+    from agno.run.team import TeamRunOutput
+
+    # Applied last, so cached answers are recorded too (as cache hits)
+    original_run = agent.run
+    original_arun = agent.arun
+    final_types = (RunOutput, TeamRunOutput)
+    is_team = hasattr(agent, "members")
+
+    def finish(started, result, session_id, error=None):
+        ended = time.time()
+        metrics = getattr(result, "metrics", None)
+        metadata = getattr(result, "metadata", None) or {}
+        cache_hit = bool(metadata.get("cache_hit"))
+        session_id = getattr(result, "session_id", None) or session_id
+        run_id = getattr(result, "run_id", None)
+        # agno times every tool call and keeps it on the run output. Delegations are
+        # recorded as the member's own run, so the team's delegate tools are skipped.
+        tools = [t for t in getattr(result, "tools", None) or [] if not t.tool_name.startswith("delegate_task")]
+        busy = sum(_tool_duration(t) for t in tools)
+        if is_team and session_id is not None:
+            busy += store.nested_seconds(session_id, started, ended, agent.id)
+        rows = [dict(
+            kind="run",
+            agent_id=agent.id,
+            session_id=session_id,
+            run_id=run_id,
+            started_at=started,
+            ended_at=ended,
+            duration=ended - started,
+            # Whatever the run did outside its tool calls is (almost all) waiting on the model
+            model_latency=None if cache_hit or result is None else max(0.0, ended - started - busy),
+            input_tokens=getattr(metrics, "input_tokens", 0) or 0,
+            output_tokens=getattr(metrics, "output_tokens", 0) or 0,
+            cache_hit=int(cache_hit),
+            error=error,
+        )]
+        for tool in tools:
+            duration = _tool_duration(tool)
+            tool_ended = min(max(float(tool.created_at), started + duration), ended)
+            rows.append(dict(
+                kind="tool",
+                agent_id=agent.id,
+                tool_name=tool.tool_name,
+                session_id=session_id,
+                run_id=run_id,
+                started_at=tool_ended - duration,
+                ended_at=tool_ended,
+                duration=duration,
+                args_bytes=_size(tool.tool_args),
+                output_bytes=_size(tool.result),
+                error=tool.result if tool.tool_call_error else None,
+            ))
+        store.record_many(rows)
+        if on_complete is not None:
+            on_complete()
+
+    def watch_stream(stream, started, session_id, yield_run_output):
+        result, error = None, None
+        try:
+            for event in stream:
+                if isinstance(event, final_types):
+                    result = event
+                    if not yield_run_output:
+                        continue
+                yield event
+        except Exception as e:
+            error = str(e)
+            raise
+        except BaseException:
+            # Closed by the caller (a cancelled job) or dropped before the end: those are
+            # often the slowest runs, so they are recorded too
+            if result is None:
+                error = "cancelled"
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            raise
+        finally:
+            finish(started, result, session_id, error=error)
+
+    async def awatch_stream(stream, started, session_id, yield_run_output):
+        result, error = None, None
+        try:
+            async for event in stream:
+                if isinstance(event, final_types):
+                    result = event
+                    if not yield_run_output:
+                        continue
+                yield event
+        except Exception as e:
+            error = str(e)
+            raise
+        except BaseException:
+            # Closed by the caller (a cancelled job) or dropped before the end: those are
+            # often the slowest runs, so they are recorded too
+            if result is None:
+                error = "cancelled"
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            raise
+        finally:
+            finish(started, result, session_id, error=error)
+
+    def run(input, *args, stream=None, **kwargs):
+        started = time.time()
+        if stream:
+            # The final run output carries the tool executions; only pass it on if the caller asked
+            wanted = kwargs.pop("yield_run_output", False)
+            stream = original_run(input, *args, stream=True, yield_run_output=True, **kwargs)
+            return watch_stream(stream, started, kwargs.get("session_id"), wanted)
+        try:
+            result = original_run(input, *args, stream=stream, **kwargs)
+        except Exception as e:
+            finish(started, None, kwargs.get("session_id"), error=str(e))
+            raise
+        finish(started, result, kwargs.get("session_id"))
+        return result
+
+    async def _arun(input, args, kwargs, started):
+        try:
+            result = await original_arun(input, *args, stream=False, **kwargs)
+        except Exception as e:
+            finish(started, None, kwargs.get("session_id"), error=str(e))
+            raise
+        finish(started, result, kwargs.get("session_id"))
+        return result
+
+    def arun(input, *args, stream=None, **kwargs):
+        started = time.time()
+        if stream:
+            wanted = kwargs.pop("yield_run_output", False)
+            stream = original_arun(input, *args, stream=True, yield_run_output=True, **kwargs)
+            return awatch_stream(stream, started, kwargs.get("session_id"), wanted)
+        return _arun(input, args, kwargs, started)
+
+    agent.run = run
+    agent.arun = arun
+    return agent
+
+
+def instrument_team(team, store):
+    """Instrument a team and its members; the Prometheus file is refreshed after every team run."""
+    for member in team.members:
+        instrument_agent(member, store)
+
+    def export():
+        if store.prometheus_file is None:
+            return
+        try:
+            store.write_prometheus()
+        except OSError:
+            # The export is best effort; the run itself succeeded
+            pass
+
+    return instrument_agent(team, store, on_complete=export)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show recorded agent and tool metrics.")
+    parser.add_argument("--since", type=float, default=24, help="Hours to look back")
+    parser.add_argument("--prometheus", type=Path, help="Write the Prometheus text file to this path")
+    args = parser.parse_args()
+
+    store = MetricsStore()
+    if args.prometheus:
+        store.write_prometheus(args.prometheus)
+    print(json.dumps(store.summary(since=time.time() - args.since * 3600), indent=2))
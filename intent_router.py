@@ -0,0 +1,458 @@
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from agno.models.message import Message
+from agno.run.agent import RunEvent, RunOutput
+from agno.run.team import RunCompletedEvent as TeamRunCompletedEvent
+from agno.run.team import RunContentEvent as TeamRunContentEvent
+from agno.run.team import RunStartedEvent as TeamRunStartedEvent
+from agno.run.team import TeamRunInput, TeamRunOutput
+from agno.utils.team import get_member_id
+
+from config import CACHE_DIR, DB_FILE
+from readme_sections import SECTIONS
+from storage import connect
+
+
+ROUTER_MODEL_FILE = CACHE_DIR / "router_model.json"
+
+# The routing table of the chatbot team's instructions, as patterns per member
+ROUTES = {
+    "file_analyzer_agent": [
+        r"\b(file|folder|directory|project|repo\w*) (structure|layout|tree)\b",
+        r"\bstructure\b",
+        r"\b(programming )?languages?\b",
+        r"\bfolders?\b|\bdirector(y|ies)\b",
+        r"\bwhat tools\b|\btooling\b",
+    ],
+    "dependency_analysis_agent": [
+        r"\bdependenc(y|ies)\b",
+        r"\blibrar(y|ies)\b",
+        r"\bpackages?\b",
+        r"\brequirements(\.txt)?\b|\bpyproject\b|\bpackage\.json\b",
+        r"\boutdated\b|\bvulnerab",
+    ],
+    "code_understanding_agent": [
+        r"\bpurpose\b",
+        r"\bwhat does (it|this|the (project|code|app\w*|repo\w*)) do\b",
+        r"\bhow does .+ work\b",
+        r"\bfunctionality\b|\bfeatures?\b",
+        r"\bunderstand\b|\bexplain\b",
+        r"\bentry ?points?\b|\barchitecture\b",
+    ],
+    "onboarding_agent": [
+        r"\bset ?up\b",
+        r"\binstall(ation|ing)?\b",
+        r"\bhow (do i|to|can i) (run|start|launch|use)\b",
+        r"\bget(ting)? started\b|\bonboard",
+        r"\benvironment variables?\b|\b\.env\b",
+    ],
+    "error_documentation_agent": [
+        r"\berrors?\b",
+        r"\bexceptions?\b|\btraceback\b|\bstack ?trace\b",
+        r"\bfail(s|ed|ure|ing)?\b|\bcrash",
+        r"\bbreaks?\b|\bbroken\b",
+    ],
+    "code_quality_agent": [
+        r"\bcode quality\b|\bquality\b",
+        r"\bmaintainab",
+        r"\brefactor",
+        r"\bcode smells?\b|\btechnical debt\b|\bcomplexity\b",
+        r"\blint(ing|er)?\b|\bbest practices\b",
+    ],
+    "compliance_agent": [
+        r"\blicen[cs]",
+        r"\bcomplian",
+        r"\bcopyright\b|\bspdx\b",
+        r"\b(a|l)?gpl\b|\bapache\b",
+    ],
+    "learning_resource_agent": [
+        r"\blearn(ing)?\b",
+        r"\btutorials?\b|\bcourses?\b",
+        r"\b(documentation|docs) (links?|for)\b|\bofficial docs\b",
+        r"\bresources?\b",
+    ],
+    "test_generator_agent": [
+        r"\btests?\b|\btesting\b",
+        r"\bpytest\b|\bunittest\b|\bjest\b",
+        r"\btest cases?\b|\bcoverage\b",
+    ],
+}
+
+# Requests that name a repository need loading first, and a README combines the other
+# members' analyses: both are left to the orchestrator, as are edits of the README's
+# sections ("Fix the Installation section", "Add ... to the Configuration part")
+ORCHESTRATOR_ONLY = re.compile(
+    r"(?:https?|file)://|\bgithub\.com/|\bclone\b|\breadme\b|\bsections?\b"
+    rf"|\b(?:{'|'.join(re.escape(section.title) for section in SECTIONS)})\s+(?:part|paragraph|heading)\b"
+    r"|^\W*(?:please\s+)?(?:fix|edit|change|rewrite|reword|rephrase|update|add|remove|delete|drop|mention"
+    r"|shorten|expand|rename|replace|insert|move)\b",
+    re.IGNORECASE,
+)
+# Confirmations and short follow-ups only make sense with the conversation, which the
+# orchestrator has and a member answering alone does not
+CONFIRMATION = re.compile(
+    r"^\W*(?:yes|yeah|yep|no|nope|ok(?:ay)?|sure|correct|right|exactly|thanks?|thank you|confirm(?:ed)?"
+    r"|go (?:on|ahead)|(?:please )?continue)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP = re.compile(
+    r"\b(?:that|those|them|above|previous|earlier|again|more detail|elaborate|instead|same)\b", re.IGNORECASE
+)
+FOLLOW_UP_WORDS = 8
+
+# A keyword route needs this many pattern hits for its member; one generic word
+# ("explain", "license", "install") is no evidence on its own
+MIN_KEYWORD_HITS = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_.]+")
+
+
+def _request_text(input):
+    if isinstance(input, Message):
+        input = input.content
+    return input if isinstance(input, str) else None
+
+
+@dataclass
+class Route:
+    member_id: Optional[str]
+    confidence: float
+    # "keywords", "model", or "orchestrator" when nothing was confident enough
+    source: str
+
+
+# -----------------------------
+# Lexical model
+# -----------------------------
+def _features(text):
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LexicalModel:
+    """Multinomial naive Bayes over words and word pairs, trained on labelled requests."""
+
+    def __init__(self, class_counts=None, feature_counts=None):
+        self.class_counts = Counter(class_counts or {})
+        self.feature_counts = {label: Counter(counts) for label, counts in (feature_counts or {}).items()}
+
+    @classmethod
+    def train(cls, examples):
+        """`examples` is an iterable of (text, member_id) pairs."""
+        model = cls()
+        for text, label in examples:
+            model.class_counts[label] += 1
+            model.feature_counts.setdefault(label, Counter()).update(_features(text))
+        return model
+
+    def predict(self, text):
+        """Return (member_id, probability), or (None, 0.0) when the model is empty."""
+        if not self.class_counts:
+            return None, 0.0
+        features = _features(text)
+        vocabulary = len(set().union(*self.feature_counts.values()))
+        total = sum(self.class_counts.values())
+        scores = {}
+        for label, count in self.class_counts.items():
+            counts = self.feature_counts[label]
+            size = sum(counts.values())
+            score = math.log(count / total)
+            for feature in features:
+                score += math.log((counts[feature] + 1) / (size + vocabulary))
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        # Softmax over the log scores
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+    def save(self, path=ROUTER_MODEL_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"class_counts": self.class_counts, "feature_counts": self.feature_counts}))
+
+    @classmethod
+    def load(cls, path=ROUTER_MODEL_FILE):
+        path = Path(path)
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        return cls(data["class_counts"], data["feature_counts"])
+
+
+# -----------------------------
+# Router
+# -----------------------------
+class IntentRouter:
+    """Routes clear-cut requests to one member without asking the orchestrator model."""
+
+    def __init__(self, routes=ROUTES, model=None, keyword_threshold=0.75, model_threshold=0.9):
+        self.routes = {member_id: [re.compile(p, re.IGNORECASE) for p in patterns] for member_id, patterns in routes.items()}
+        self.model = model
+        self.keyword_threshold = keyword_threshold
+        self.model_threshold = model_threshold
+
+    @staticmethod
+    def needs_conversation(text):
+        """Confirmations ("Yes, it is MIT") and short follow-ups ("Explain that in more detail")."""
+        return bool(CONFIRMATION.search(text)) or (
+            len(TOKEN_PATTERN.findall(text.lower())) <= FOLLOW_UP_WORDS and bool(FOLLOW_UP.search(text))
+        )
+
+    def classify(self, text):
+        if not text or not text.strip() or ORCHESTRATOR_ONLY.search(text) or self.needs_conversation(text):
+            return Route(None, 0.0, "orchestrator")
+
+        scores = {
+            member_id: sum(bool(p.search(text)) for p in patterns)
+            for member_id, patterns in self.routes.items()
+        }
+        scores = {member_id: score for member_id, score in scores.items() if score}
+        if scores:
+            best = max(scores, key=scores.get)
+            confidence = scores[best] / sum(scores.values())
+            if scores[best] >= MIN_KEYWORD_HITS and confidence >= self.keyword_threshold:
+                return Route(best, confidence, "keywords")
+
+        if self.model is not None:
+            member_id, probability = self.model.predict(text)
+            # With keyword hits, the model may only choose among the members they point at
+            if member_id is not None and probability >= self.model_threshold and (not scores or member_id in scores):
+                return Route(member_id, probability, "model")
+
+        return Route(None, 0.0, "orchestrator")
+
+
+# -----------------------------
+# Routing log
+# -----------------------------
+class RoutingLog:
+    """Every routing decision, so the lexical model can be trained on what the orchestrator chose."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS routing_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    team_id TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    -- member that answered; for orchestrated runs the only member delegated to, if any
+                    member_id TEXT,
+                    confidence REAL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_routing_log_created ON routing_log (created_at)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def record(self, team_id, request, route, member_id):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO routing_log (team_id, request, source, member_id, confidence, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (team_id, request, route.source, member_id, route.confidence, time.time()),
+            )
+
+    def examples(self, team_id=None):
+        """(request, member_id) pairs decided by the orchestrator, for training."""
+        query = "SELECT request, member_id FROM routing_log WHERE source = 'orchestrator' AND member_id IS NOT NULL"
+        params = ()
+        if team_id is not None:
+            query += " AND team_id = ?"
+            params = (team_id,)
+        with self._lock, self._connect() as conn:
+            return conn.execute(query, params).fetchall()
+
+
+def _delegated_member(team, output):
+    # Member runs are dropped from the output when the session is saved, the tool calls are not
+    url_ids = {get_member_id(member): member.id for member in team.members}
+    members = {
+        url_ids.get((tool.tool_args or {}).get("member_id"))
+        for tool in getattr(output, "tools", None) or []
+        if tool.tool_name == "delegate_task_to_member"
+    }
+    return members.pop() if len(members) == 1 else None
+
+
+def _team_context(team, session_id):
+    """The conversation so far as the team itself would see it, as text for a routed member.
+
+    A memory policy puts it in the team's additional input just before the run;
+    otherwise it is agno's history of the session.
+    """
+    messages = list(team.additional_input or [])
+    if not messages and team.add_history_to_context and session_id:
+        messages = team.get_chat_history(session_id=session_id, last_n_runs=team.num_history_runs or 3)
+    lines = []
+    for message in messages:
+        if isinstance(message, str):
+            lines.append(message)
+        elif isinstance(message, Message) and isinstance(message.content, str):
+            lines.append(f"{message.role}: {message.content}")
+    return "\n\n".join(lines)
+
+
+def apply_router(team, router, log=None):
+    """Answer confidently routed requests with the member alone; everything else goes to the team."""
+    original_run = team.run
+    original_arun = team.arun
+    members = {member.id: member for member in team.members}
+
+    def with_context(kwargs):
+        # Handed over as dependencies, so the request the member sees and remembers stays the user's own
+        context = _team_context(team, kwargs.get("session_id"))
+        if not context:
+            return kwargs
+        dependencies = {**(kwargs.get("dependencies") or {}), "conversation_so_far": context}
+        return {**kwargs, "dependencies": dependencies, "add_dependencies_to_context": True}
+
+    def route(input):
+        request = _request_text(input)
+        decision = router.classify(request) if request is not None else Route(None, 0.0, "orchestrator")
+        member = members.get(decision.member_id)
+        if member is None and decision.source != "orchestrator":
+            decision = Route(None, 0.0, "orchestrator")
+        return request, decision, member
+
+    def record(request, decision, output):
+        if log is None or request is None or output is None:
+            return
+        member_id = decision.member_id if decision.member_id else _delegated_member(team, output)
+        log.record(team.id, request, decision, member_id)
+
+    def as_team_output(input, run_id, output, decision):
+        # The team's callers (UI, CLI, memory, instrumentation) expect a team run
+        return TeamRunOutput(
+            run_id=run_id,
+            team_id=team.id,
+            team_name=team.name,
+            session_id=output.session_id,
+            user_id=output.user_id,
+            input=TeamRunInput(input_content=input),
+            content=output.content,
+            content_type=output.content_type,
+            member_responses=[output],
+            status=output.status,
+            metadata={**(output.metadata or {}), "routed_to": decision.member_id, "route_source": decision.source},
+        )
+
+    def routed_stream(input, args, kwargs, member, decision, request):
+        run_id = str(uuid4())
+        session_id = kwargs.get("session_id")
+        wants_output = kwargs.pop("yield_run_output", False)
+        stream_events = kwargs.get("stream_events")
+        if stream_events:
+            yield TeamRunStartedEvent(team_id=team.id, team_name=team.name, run_id=run_id, session_id=session_id, model="intent-router")
+        output = None
+        for event in member.run(input, *args, stream=True, yield_run_output=True, **with_context(kwargs)):
+            if isinstance(event, RunOutput):
+                output = event
+                continue
+            if stream_events:
+                yield event
+            if getattr(event, "event", None) == RunEvent.run_content.value and event.content:
+                yield TeamRunContentEvent(team_id=team.id, team_name=team.name, run_id=run_id, session_id=session_id, content=event.content)
+        if output is None:
+            return
+        result = as_team_output(input, run_id, output, decision)
+        record(request, decision, result)
+        if stream_events:
+            yield TeamRunCompletedEvent(team_id=team.id, team_name=team.name, run_id=run_id, session_id=result.session_id, content=result.content)
+        if wants_output:
+            yield result
+
+    def orchestrated_stream(stream, request, decision):
+        output = None
+        for event in stream:
+            if isinstance(event, TeamRunOutput):
+                output = event
+            yield event
+        record(request, decision, output)
+
+    async def aorchestrated_stream(stream, request, decision):
+        output = None
+        async for event in stream:
+            if isinstance(event, TeamRunOutput):
+                output = event
+            yield event
+        record(request, decision, output)
+
+    def run(input, *args, stream=None, **kwargs):
+        request, decision, member = route(input)
+        if member is None:
+            if stream:
+                return orchestrated_stream(original_run(input, *args, stream=True, **kwargs), request, decision)
+            output = original_run(input, *args, stream=stream, **kwargs)
+            record(request, decision, output)
+            return output
+        if stream:
+            return routed_stream(input, args, kwargs, member, decision, request)
+        output = as_team_output(input, str(uuid4()), member.run(input, *args, stream=False, **with_context(kwargs)), decision)
+        record(request, decision, output)
+        return output
+
+    async def _arun(input, args, kwargs, request, decision, member):
+        if member is None:
+            output = await original_arun(input, *args, stream=False, **kwargs)
+        else:
+            output = as_team_output(
+                input, str(uuid4()), await member.arun(input, *args, stream=False, **with_context(kwargs)), decision
+            )
+        record(request, decision, output)
+        return output
+
+    def arun(input, *args, stream=None, **kwargs):
+        request, decision, member = route(input)
+        if stream:
+            # Routed async streams are rare (flow_runner does not stream), so they go to the team
+            decision = Route(None, 0.0, "orchestrator")
+            return aorchestrated_stream(original_arun(input, *args, stream=True, **kwargs), request, decision)
+        return _arun(input, args, kwargs, request, decision, member)
+
+    team.run = run
+    team.arun = arun
+    return team
+
+
+def make_router(routes=ROUTES, model_file=ROUTER_MODEL_FILE, **kwargs):
+    """Keyword router, plus the trained lexical model if one has been saved."""
+    return IntentRouter(routes, model=LexicalModel.load(model_file), **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or try the intent router.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="Train the lexical model on logged orchestrator decisions")
+    train.add_argument("--examples", type=Path, help="Extra JSON lines with 'text' and 'member_id'")
+    train.add_argument("--team", help="Only use decisions of this team")
+    classify = commands.add_parser("classify", help="Show the route of a request")
+    classify.add_argument("text")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = RoutingLog().examples(args.team)
+        if args.examples:
+            for line in args.examples.read_text().splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    examples.append((item["text"], item["member_id"]))
+        LexicalModel.train(examples).save()
+        print(f"Trained on {len(examples)} examples, saved to {ROUTER_MODEL_FILE}")
+    else:
+        print(make_router().classify(args.text))
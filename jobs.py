@@ -0,0 +1,325 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from config import DB_FILE
+from storage import connect
+
+
+# Team runs mostly wait on the model, so threads are enough; they also share the
+# process's teams, model clients and caches, which a process pool could not
+MAX_WORKERS = 4
+# Partial answers are written to the store at most this often
+FLUSH_SECONDS = 0.5
+
+FINISHED = ("completed", "failed", "cancelled")
+
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _alive(worker):
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        # Another machine's jobs are its own business
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+# -----------------------------
+# Job store
+# -----------------------------
+class JobStore:
+    """Team runs submitted from the UI, their progress events and results, stored in SQLite."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    -- queued, running, completed, failed or cancelled
+                    status TEXT NOT NULL,
+                    content TEXT NOT NULL DEFAULT '',
+                    error TEXT,
+                    metrics TEXT,
+                    -- host:pid of the process running the job
+                    worker TEXT NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session_id, created_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    -- started, tool or completed
+                    kind TEXT NOT NULL,
+                    agent TEXT NOT NULL,
+                    detail TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def create(self, session_id, request):
+        job_id = uuid4().hex
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, session_id, request, status, worker, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, session_id, request, WORKER, time.time()),
+            )
+        return job_id
+
+    def start(self, job_id):
+        """Mark a queued job as running; False when it was cancelled in the meantime."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            ).rowcount == 1
+
+    def set_content(self, job_id, content):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET content = ? WHERE id = ?", (content, job_id))
+
+    def finish(self, job_id, status, content=None, error=None, metrics=None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, content = COALESCE(?, content), error = ?, metrics = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, content, error, json.dumps(metrics) if metrics else None, time.time(), job_id),
+            )
+
+    def request_cancel(self, job_id):
+        """Flag a job for cancellation; a queued job is cancelled right away. False when already finished."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, "
+                "status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END, "
+                "finished_at = CASE WHEN status = 'queued' THEN ? ELSE finished_at END "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            ).rowcount == 1
+
+    def cancel_requested(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def add_event(self, job_id, kind, agent, detail=None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_events (job_id, kind, agent, detail, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, agent, detail, time.time()),
+            )
+
+    def events(self, job_id, after_id=0):
+        """Progress events of a job, oldest first, as dicts."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, agent, detail, created_at FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after_id),
+            ).fetchall()
+        return [dict(zip(("id", "kind", "agent", "detail", "created_at"), row)) for row in rows]
+
+    def _jobs(self, where, params):
+        columns = ("id", "session_id", "request", "status", "content", "error", "metrics",
+                   "worker", "created_at", "started_at", "finished_at")
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM jobs WHERE {where} ORDER BY created_at", params
+            ).fetchall()
+        jobs = [dict(zip(columns, row)) for row in rows]
+        for job in jobs:
+            job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else None
+        return jobs
+
+    def job(self, job_id):
+        jobs = self._jobs("id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def jobs(self, session_id):
+        """Jobs of a session, oldest first."""
+        return self._jobs("session_id = ?", (session_id,))
+
+    def active_sessions(self):
+        """Sessions with a queued or running job."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT session_id FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        return {row[0] for row in rows}
+
+    def recover(self):
+        """Fail jobs left queued or running by a process that no longer exists."""
+        with self._lock, self._connect() as conn:
+            workers = [row[0] for row in conn.execute(
+                "SELECT DISTINCT worker FROM jobs WHERE status IN ('queued', 'running')"
+            )]
+            dead = [worker for worker in workers if worker != WORKER and not _alive(worker)]
+            for worker in dead:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Interrupted: the server stopped while the job ran.', "
+                    "finished_at = ? WHERE worker = ? AND status IN ('queued', 'running')",
+                    (time.time(), worker),
+                )
+        return len(dead)
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+class JobQueue:
+    """Runs teams in background threads and records their progress in a JobStore.
+
+    Jobs of one session run one after another, since they share the session's team:
+    each session has its own FIFO queue, and its next job goes to the pool only when
+    the current one has finished, so no worker ever waits for another session.
+    """
+
+    def __init__(self, store, max_workers=MAX_WORKERS):
+        self.store = store
+        self.store.recover()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reposcribe-job")
+        # session id -> (job_id, team, request) waiting in order; the first one is in the pool
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        # Cancellations asked for in this process, checked on every event without a query
+        self._cancelled = set()
+
+    def submit(self, team, request, session_id):
+        job_id = self.store.create(session_id, request)
+        with self._sessions_lock:
+            queue = self._sessions.setdefault(session_id, deque())
+            queue.append((job_id, team, request))
+            first = len(queue) == 1
+        if first:
+            self._pool.submit(self._run, job_id, team, request, session_id)
+        return job_id
+
+    def cancel(self, job_id):
+        if not self.store.request_cancel(job_id):
+            return False
+        self._cancelled.add(job_id)
+        if self.store.job(job_id)["status"] == "running":
+            from agno.run.cancel import cancel_run
+
+            # The job id is the team's run id; agno stops the run at its next checkpoint
+            cancel_run(job_id)
+        return True
+
+    def _submit_next(self, session_id):
+        with self._sessions_lock:
+            queue = self._sessions[session_id]
+            queue.popleft()
+            if not queue:
+                del self._sessions[session_id]
+                return
+            job_id, team, request = queue[0]
+        self._pool.submit(self._run, job_id, team, request, session_id)
+
+    def _run(self, job_id, team, request, session_id):
+        try:
+            # False when the job was cancelled while it waited
+            if not self.store.start(job_id):
+                return
+            try:
+                status, content, error, metrics = self._stream(job_id, team, request, session_id)
+            except Exception as e:
+                status, content, error, metrics = "failed", None, str(e), None
+            finally:
+                self._cancelled.discard(job_id)
+            self.store.finish(job_id, status, content, error, metrics)
+        finally:
+            self._submit_next(session_id)
+
+    def _stream(self, job_id, team, request, session_id):
+        from agno.run.agent import RunEvent
+        from agno.run.team import TeamRunEvent
+
+        started = time.perf_counter()
+        first_token_at = None
+        flushed_at = checked_at = started
+        team_text = ""
+        member_text = {}
+        member_first_output = {}
+        status, error = "completed", None
+
+        stream = team.run(request, session_id=session_id, run_id=job_id, stream=True, stream_events=True)
+        try:
+            for event in stream:
+                if time.perf_counter() - checked_at >= FLUSH_SECONDS:
+                    # Cancellations from other processes only show up in the store
+                    if self.store.cancel_requested(job_id):
+                        self._cancelled.add(job_id)
+                    checked_at = time.perf_counter()
+                if job_id in self._cancelled:
+                    status = "cancelled"
+                    break
+                kind = getattr(event, "event", None)
+                content = getattr(event, "content", None)
+                agent_name = getattr(event, "agent_name", None) or getattr(event, "agent_id", None)
+
+                if kind == RunEvent.run_started.value:
+                    self.store.add_event(job_id, "started", agent_name)
+
+                elif kind in (RunEvent.tool_call_started.value, TeamRunEvent.tool_call_started.value):
+                    tool = getattr(event, "tool", None)
+                    if tool is not None and tool.tool_name:
+                        name = agent_name if kind == RunEvent.tool_call_started.value else getattr(event, "team_name", None)
+                        self.store.add_event(job_id, "tool", name or "team", tool.tool_name)
+
+                elif kind == RunEvent.run_content.value and isinstance(content, str) and content:
+                    if agent_name not in member_text:
+                        member_first_output[agent_name] = time.perf_counter() - started
+                        member_text[agent_name] = ""
+                    member_text[agent_name] += content
+                    first_token_at = first_token_at or time.perf_counter()
+
+                elif kind == RunEvent.run_completed.value:
+                    text = content if isinstance(content, str) else member_text.get(agent_name, "")
+                    self.store.add_event(job_id, "completed", agent_name, text)
+
+                elif kind == TeamRunEvent.run_content.value and isinstance(content, str) and content:
+                    team_text += content
+                    first_token_at = first_token_at or time.perf_counter()
+                    if time.perf_counter() - flushed_at >= FLUSH_SECONDS:
+                        self.store.set_content(job_id, team_text)
+                        flushed_at = time.perf_counter()
+
+                elif kind == TeamRunEvent.run_cancelled.value:
+                    status = "cancelled"
+                elif kind == TeamRunEvent.run_error.value:
+                    status, error = "failed", content if isinstance(content, str) else str(content)
+        finally:
+            # Closing the generator stops the run at its next step if it is still going
+            stream.close()
+
+        metrics = {
+            "time_to_first_token": first_token_at - started if first_token_at else None,
+            "total_latency": time.perf_counter() - started,
+            "members": member_first_output,
+        }
+        return status, team_text, error, metrics
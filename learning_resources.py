@@ -0,0 +1,165 @@
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from agno.tools import Toolkit
+
+from config import BASE_DIR, DB_FILE
+from storage import connect
+
+
+SEED_INDEX_FILE = BASE_DIR / "learning_resources.json"
+
+# Documentation URLs move rarely; searched results are refreshed after this long
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+MAX_RESULTS = 3
+
+# Hosts that are never official documentation
+EXCLUDED_HOSTS = ("medium.com", "dev.to", "stackoverflow.com", "reddit.com", "youtube.com", "w3schools.com", "geeksforgeeks.org")
+
+
+def normalize_technology(name):
+    return re.sub(r"\s+", " ", name.strip().lower())
+
+
+def load_seed_index(path=SEED_INDEX_FILE):
+    """Map of technology name and alias to its bundled resources."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    index = {}
+    for name, entry in json.loads(path.read_text())["technologies"].items():
+        for key in [name, *entry.get("aliases", [])]:
+            index[normalize_technology(key)] = {"technology": name, "resources": entry["resources"]}
+    return index
+
+
+# -----------------------------
+# Lookup cache
+# -----------------------------
+class ResourceCache:
+    """Searched learning resources per technology, stored in SQLite with a TTL."""
+
+    def __init__(self, db_file=DB_FILE, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.db_file = str(db_file)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS learning_resources (
+                    technology TEXT PRIMARY KEY,
+                    resources TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def get(self, technology, allow_stale=False):
+        """Cached resources, or None when missing or (unless `allow_stale`) expired."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT resources, fetched_at FROM learning_resources WHERE technology = ?",
+                (normalize_technology(technology),),
+            ).fetchone()
+        if row is None:
+            return None
+        if not allow_stale and time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, technology, resources):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO learning_resources (technology, resources, fetched_at) VALUES (?, ?, ?)",
+                (normalize_technology(technology), json.dumps(resources), time.time()),
+            )
+
+    def purge_expired(self):
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM learning_resources WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+
+
+def search_resources(technology, max_results=MAX_RESULTS):
+    """Web search for the official documentation of `technology`."""
+    # ddgs is only imported when a lookup actually misses both the index and the cache
+    from agno.tools.duckduckgo import DuckDuckGoTools
+
+    results = json.loads(
+        DuckDuckGoTools(enable_news=False).duckduckgo_search(f"{technology} official documentation", max_results=8)
+    )
+    resources = []
+    for result in results:
+        url = result.get("href") or ""
+        host = urlparse(url).netloc.lower()
+        if not host or any(host == h or host.endswith("." + h) for h in EXCLUDED_HOSTS):
+            continue
+        resources.append({"title": result.get("title") or url, "url": url, "kind": "search result"})
+        if len(resources) == max_results:
+            break
+    return resources
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class LearningResourceTools(Toolkit):
+    def __init__(self, cache=None, seed_index=None, offline=False, search=search_resources, **kwargs):
+        self.cache = cache
+        self.seed_index = load_seed_index() if seed_index is None else seed_index
+        self.offline = offline
+        self.search = search
+        super().__init__(
+            name="learning_resource_tools",
+            tools=[self.lookup_learning_resources],
+            **kwargs,
+        )
+
+    def _lookup(self, technology):
+        key = normalize_technology(technology)
+        if key in self.seed_index:
+            entry = self.seed_index[key]
+            return {"technology": entry["technology"], "source": "bundled index", "resources": entry["resources"]}
+
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return {"technology": technology, "source": "cache", "resources": cached}
+
+        if not self.offline:
+            try:
+                resources = self.search(technology)
+            except Exception as e:
+                resources, error = None, str(e)
+            else:
+                if self.cache is not None and resources:
+                    self.cache.put(key, resources)
+                return {"technology": technology, "source": "web search", "resources": resources}
+        else:
+            error = "offline"
+
+        # An expired entry is better than nothing when the search is unavailable
+        stale = self.cache.get(key, allow_stale=True) if self.cache is not None else None
+        if stale is not None:
+            return {"technology": technology, "source": "cache (expired)", "resources": stale}
+        return {"technology": technology, "source": None, "resources": [], "error": error}
+
+    def lookup_learning_resources(self, technologies: list[str]) -> str:
+        """Look up official documentation and tutorials for technologies found in the repository.
+        Answers come from a bundled index of official documentation and a local cache; the web is
+        searched only for technologies found in neither.
+
+        Args:
+            technologies (list[str]): Technology, framework or tool names, e.g. ["FastAPI", "SQLAlchemy"].
+
+        Returns:
+            str: JSON list with the resources found per technology and where they came from.
+        """
+        return json.dumps([self._lookup(t) for t in technologies if t.strip()], indent=2)
@@ -0,0 +1,469 @@
+import json
+import os
+import re
+import tomllib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from functools import cache, lru_cache
+from pathlib import Path
+from uuid import uuid4
+
+from agno.tools import Toolkit
+
+from config import BASE_DIR, CACHE_DIR, REPO_DIR
+from repo_index import LANGUAGES, find_checkout, load_index
+from repo_walker import BINARY_SUFFIXES, WALKER_VERSION, files_under
+
+
+TEMPLATE_DIR = BASE_DIR / "license_templates"
+LICENSE_DIR = CACHE_DIR / "licenses"
+# Bump when what is scanned changes, so maps of the old scan are redone
+SCAN_VERSION = 2
+
+# Word n-grams; long enough that unrelated texts share almost none
+NGRAM = 5
+HEADER_BYTES = 4096
+MAX_LICENSE_FILE_BYTES = 256 * 1024
+
+# Dice similarity of a license file to a template, and the share of a template found
+# inside a file header or a file with several licenses
+FILE_MATCH = 0.9
+FILE_CLOSE = 0.7
+CONTAINED = 0.9
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 500
+
+LICENSE_FILE = re.compile(r"^(licen[cs]e|copying|unlicense|notice|copyright)([-_.].*)?$", re.IGNORECASE)
+SPDX_TAG = re.compile(rb"SPDX-License-Identifier:\s*([A-Za-z0-9.+()\- ]+?)\s*(?:\*/|-->|\"\"\"|$)", re.MULTILINE)
+# Headers without any of these words (lowercased) are not matched at all
+HINT_WORDS = (b"license", b"licence", b"copyright", b"permission is hereby granted", b"public domain")
+# Words that end a license header, and the blank (or comment-only) line after its paragraph
+HEADER_WORDS = (b"licen", b"copyright", b"warrant", b"liabilit", b"notice", b"public domain")
+PARAGRAPH_END = re.compile(rb"\n[ \t#*/;%!\-]*\r?\n")
+
+# Comment markers are not words, so only copyright lines need removing; they may follow a marker
+COPYRIGHT_LINE = re.compile(r"^[\s#*/;%!<\-]*(?:copyright\b|\(c\)|©).*$", re.IGNORECASE | re.MULTILINE)
+COPYRIGHT_STARTS = (b"copyright", b"(c)", "©".encode())
+WORD = re.compile(r"[a-z0-9]+")
+
+# GNU notices differ from each other mostly in a version number, which n-grams weigh too
+# little, so they are read directly
+GNU_NOTICE = re.compile(
+    r"gnu (affero |lesser |library )?general public license .{0,120}?version (\d(?: \d)?)\b"
+    r"(?: of the license)?(?:(?: or)? at your option any later version)?",
+)
+GNU_IDS = {"": "GPL", "affero ": "AGPL", "lesser ": "LGPL", "library ": "LGPL"}
+
+
+# -----------------------------
+# Matching
+# -----------------------------
+def normalize(text):
+    """Words of `text` without copyright lines, which vary between copies."""
+    text = COPYRIGHT_LINE.sub(" ", text)
+    text = text.lower().replace("licence", "license").replace("http://", "https://")
+    return WORD.findall(text)
+
+
+def fingerprint(words):
+    """Set of word n-grams. Tuples hash in C, and templates and texts are always fingerprinted
+    in the same process, so no stable hash is needed."""
+    if len(words) < NGRAM:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[i:] for i in range(NGRAM))))
+
+
+def gnu_notice(words):
+    """SPDX id of a GNU license notice such as "... either version 3 of the License, or ... any later version"."""
+    text = " ".join(words)
+    match = GNU_NOTICE.search(text)
+    # The license's own title page names a version too, but is not a notice
+    if match is None or "published by the free software foundation" not in text:
+        return None
+    family, version = GNU_IDS[match.group(1) or ""], match.group(2).replace(" ", ".")
+    if "." not in version:
+        version += ".0"
+    if family == "LGPL" and version == "2.0" and match.group(1) == "lesser ":
+        version = "2.1"
+    suffix = "-or-later" if "any later version" in match.group(0) else "-only"
+    return f"{family}-{version}{suffix}"
+
+
+class LicenseMatcher:
+    """Bundled SPDX license texts and standard header notices, fingerprinted once."""
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        template_dir = Path(template_dir)
+        self.texts = {p.stem: fingerprint(normalize(p.read_text())) for p in sorted(template_dir.glob("*.txt"))}
+        self.headers = {p.stem: fingerprint(normalize(p.read_text())) for p in sorted((template_dir / "headers").glob("*.txt"))}
+        # n-gram -> templates containing it, so a text is only compared with templates it shares n-grams with
+        self.postings = {}
+        for kind, templates in (("text", self.texts), ("header", self.headers)):
+            for spdx, grams in templates.items():
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append((kind, spdx))
+        self.known = frozenset(self.postings)
+
+    def _overlaps(self, grams):
+        shared = Counter()
+        # Most n-grams of source code are in no template; the set intersection drops them in C
+        for gram in grams & self.known:
+            shared.update(self.postings[gram])
+        return shared
+
+    def _cover(self, grams, candidates, taken=()):
+        """Templates that make up `grams`, largest first. Texts nest (the BSD-2 clauses are
+        part of BSD-3), so each template is judged by the part not shared with those taken."""
+        found, covered = [], set().union(*(self.texts[spdx] for spdx in taken))
+        for spdx in sorted(candidates, key=lambda s: -len(self.texts[s])):
+            template = self.texts[spdx]
+            own = template - covered
+            if len(own) >= 0.2 * len(template) and len(grams & own) / len(own) >= CONTAINED:
+                found.append(spdx)
+                covered |= template
+        return sorted(found)
+
+    def match_file(self, text):
+        """Match a whole license file: (SPDX ids, "exact" | "close" | "contains", score) or None."""
+        words = normalize(text)
+        grams = fingerprint(words)
+        if not grams:
+            return None
+        shared = self._overlaps(grams)
+        scored = sorted(
+            ((2 * count / (len(grams) + len(self.texts[spdx])), spdx) for (kind, spdx), count in shared.items() if kind == "text"),
+            reverse=True,
+        )
+        # Dual-licensed projects often put several texts in one file
+        contained = [
+            spdx for (kind, spdx), count in shared.items()
+            if kind == "text" and count / len(self.texts[spdx]) >= CONTAINED
+        ]
+        if scored and scored[0][0] >= FILE_CLOSE:
+            score, spdx = scored[0]
+            others = self._cover(grams, [s for s in contained if s != spdx], taken=[spdx])
+            # The Affero GPL is the GPL 3 with one more section; its title tells them apart
+            if spdx == "GPL-3.0" and "gnu affero general public license" in " ".join(words[:40]):
+                spdx = "AGPL-3.0"
+            return [spdx, *others], "exact" if score >= FILE_MATCH else "close", round(score, 3)
+        if contained:
+            return self._cover(grams, contained), "contains", 1.0
+        notice = gnu_notice(words)
+        if notice:
+            return [notice], "notice", 1.0
+        return None
+
+    def match_header(self, text):
+        """Match the top of a source file: (SPDX ids, how, score) or None."""
+        words = normalize(text)
+        notice = gnu_notice(words)
+        if notice:
+            return [notice], "notice", 1.0
+        grams = fingerprint(words)
+        best = None
+        for (kind, spdx), count in self._overlaps(grams).items():
+            template = self.headers[spdx] if kind == "header" else self.texts[spdx]
+            share = count / len(template)
+            # Of nested texts (ISC contains 0BSD) the largest one found is the license
+            if share >= CONTAINED and (best is None or len(template) > best[2]):
+                best = (spdx, share, len(template))
+        if best is None:
+            return None
+        return [best[0]], "header", round(best[1], 3)
+
+
+@cache
+def get_matcher():
+    # One per process, so pool workers fingerprint the templates once each
+    return LicenseMatcher()
+
+
+def header_text(lower):
+    """The license part of a lowercased header: up to the end of the paragraph with the last
+    license word, without copyright lines. What follows is code and would only slow matching down."""
+    last = max(lower.rfind(word) for word in HEADER_WORDS)
+    end = PARAGRAPH_END.search(lower, max(last, 0))
+    lines = (lower[:end.start()] if end else lower).split(b"\n")
+    return b"\n".join(line for line in lines if not line.lstrip(b" \t#*/;%!<-").startswith(COPYRIGHT_STARTS))
+
+
+@lru_cache(maxsize=4096)
+def match_header_text(text):
+    # Most files of a project carry the same header, so most calls are cache hits
+    return get_matcher().match_header(text.decode("utf-8", errors="replace"))
+
+
+def spdx_expression(tag):
+    return tag.decode("utf-8", errors="replace").strip()
+
+
+def expression_ids(expression):
+    """License ids of an SPDX expression such as "(Apache-2.0 OR MIT)"."""
+    return set(re.findall(r"[A-Za-z0-9.+\-]+", expression)) - {"AND", "OR", "WITH"}
+
+
+def scan_file(item):
+    """License finding for one file, or None. License files are read whole, other files only their header."""
+    checkout, path = item
+    is_license_file = bool(LICENSE_FILE.match(path.rsplit("/", 1)[-1]))
+    try:
+        with open(os.path.join(checkout, path), "rb") as f:
+            head = f.read(MAX_LICENSE_FILE_BYTES if is_license_file else HEADER_BYTES)
+    except OSError:
+        return None
+
+    tag = SPDX_TAG.search(head) if b"SPDX-License-Identifier" in head else None
+    if tag:
+        return {"licenses": [spdx_expression(tag.group(1))], "match": "spdx-tag", "score": 1.0}
+    lower = head.lower()
+    if not any(word in lower for word in HINT_WORDS):
+        return None
+    if is_license_file:
+        found = get_matcher().match_file(head.decode("utf-8", errors="replace"))
+    else:
+        found = match_header_text(header_text(lower))
+    if found is None:
+        # A license file nobody recognizes is still worth reporting
+        return {"licenses": [], "match": "unknown", "score": 0.0} if is_license_file else None
+    licenses, how, score = found
+    return {"licenses": licenses, "match": how, "score": score}
+
+
+# -----------------------------
+# Declared licenses
+# -----------------------------
+DECLARING_MANIFESTS = {"package.json", "composer.json", "Cargo.toml", "pyproject.toml"}
+
+
+def _declared_in(name, text):
+    if name in ("package.json", "composer.json"):
+        value = json.loads(text).get("license")
+        if isinstance(value, dict):
+            value = value.get("type")
+        if isinstance(value, list):
+            value = " OR ".join(v if isinstance(v, str) else v.get("type", "") for v in value)
+        return [value] if value else []
+    if name == "Cargo.toml":
+        value = tomllib.loads(text).get("package", {}).get("license")
+        return [value] if value else []
+    if name == "pyproject.toml":
+        project = tomllib.loads(text).get("project", {})
+        value = project.get("license")
+        if isinstance(value, dict):
+            value = value.get("text")
+        found = [value] if isinstance(value, str) and value and len(value) < 100 else []
+        found += [c.split("::")[-1].strip() for c in project.get("classifiers", []) if c.startswith("License ::")]
+        return found
+    return []
+
+
+def declared_licenses(checkout, files):
+    declared = []
+    for path in files:
+        name = path.rsplit("/", 1)[-1]
+        if name not in DECLARING_MANIFESTS:
+            continue
+        try:
+            values = _declared_in(name, (Path(checkout) / path).read_text(encoding="utf-8"))
+        except (OSError, ValueError, tomllib.TOMLDecodeError, AttributeError):
+            continue
+        declared += [{"manifest": path, "license": value} for value in values]
+    return declared
+
+
+# -----------------------------
+# Per-commit license map
+# -----------------------------
+def scan_files(checkout, files, max_workers=None):
+    items = [(str(checkout), path) for path in files]
+    if len(items) < PARALLEL_THRESHOLD:
+        results = map(scan_file, items)
+        return {path: found for (_, path), found in zip(items, results) if found}
+    # Spawned rather than forked, since the server process runs threads with open SQLite connections
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        results = pool.map(scan_file, items, chunksize=256)
+        return {path: found for (_, path), found in zip(items, results) if found}
+
+
+def _scannable(index):
+    return [path for path, _ in index["files"]]
+
+
+def _third_party(checkout, index):
+    """License files and source files of the vendored files and excluded directories the index
+    leaves out. Their licenses still bind the project, so they are scanned all the same."""
+    skipped = index.get("skipped", {})
+    directories = [d for d in skipped.get("excluded_dir", []) if d.rstrip("/").rsplit("/", 1)[-1] != ".git"]
+    paths = set(files_under(checkout, directories)) | set(skipped.get("vendored", []))
+    return sorted(
+        path for path in paths
+        if LICENSE_FILE.match(path.rsplit("/", 1)[-1])
+        or (Path(path).suffix.lower() in LANGUAGES and Path(path).suffix.lower() not in BINARY_SUFFIXES)
+    )
+
+
+def _license_file(sha):
+    # The map follows the walker's rules too, through the index it scans
+    return LICENSE_DIR / f"{sha}.v{WALKER_VERSION}.s{SCAN_VERSION}.json"
+
+
+def _save_license_map(license_map):
+    LICENSE_DIR.mkdir(parents=True, exist_ok=True)
+    license_file = _license_file(license_map["sha"])
+    # Concurrent agents may scan the same commit, so each writer gets its own temp file
+    tmp_file = license_file.with_name(f"{license_file.name}.{uuid4().hex}.tmp")
+    tmp_file.write_text(json.dumps(license_map))
+    tmp_file.replace(license_file)
+
+
+def _license_map(checkout, index, files, third_party, third_party_scanned):
+    return {
+        "sha": index["sha"],
+        "scanned": len(_scannable(index)),
+        "files": dict(sorted(files.items())),
+        "declared": declared_licenses(checkout, _scannable(index)),
+        "third_party_scanned": third_party_scanned,
+        "third_party": dict(sorted(third_party.items())),
+    }
+
+
+def cached_license_map(sha):
+    license_file = _license_file(sha)
+    if not license_file.exists():
+        return None
+    return json.loads(license_file.read_text())
+
+
+def load_license_map(checkout, rebuild=False):
+    """Return the license findings for `checkout`, scanned once per commit."""
+    index = load_index(checkout)
+    sha = index["sha"]
+    if sha and not rebuild:
+        license_map = cached_license_map(sha)
+        if license_map is not None:
+            return license_map
+
+    third_party = _third_party(checkout, index)
+    license_map = _license_map(
+        checkout, index, scan_files(checkout, _scannable(index)), scan_files(checkout, third_party), len(third_party)
+    )
+    if sha:
+        _save_license_map(license_map)
+    return license_map
+
+
+def update_license_map(checkout, old_sha, changed_paths):
+    """Carry the findings of unchanged files over from `old_sha`; rescan only changed files.
+
+    Returns None when there is no scan of `old_sha` to start from.
+    """
+    previous = cached_license_map(old_sha)
+    if previous is None:
+        return None
+    index = load_index(checkout)
+    changed = set(changed_paths)
+    files = {path: found for path, found in previous["files"].items() if path not in changed}
+    files.update(scan_files(checkout, [path for path in _scannable(index) if path in changed]))
+    third_party_paths = _third_party(checkout, index)
+    listed = set(third_party_paths)
+    third_party = {
+        path: found for path, found in previous["third_party"].items()
+        if path not in changed and path in listed
+    }
+    third_party.update(scan_files(checkout, [path for path in third_party_paths if path in changed]))
+    license_map = _license_map(checkout, index, files, third_party, len(third_party_paths))
+    _save_license_map(license_map)
+    return license_map
+
+
+def _directory(path, depth=2):
+    parts = path.split("/")[:-1][:depth]
+    return "/".join(parts) + "/" if parts else "./"
+
+
+def _split(files, prefix):
+    files = {p: f for p, f in files.items() if not prefix or p.startswith(prefix)}
+    license_files = {p: f for p, f in files.items() if LICENSE_FILE.match(p.rsplit("/", 1)[-1])}
+    headers = {p: f for p, f in files.items() if p not in license_files}
+    return files, license_files, headers
+
+
+def _headers_by_license(headers, project, depth=2):
+    by_license = {}
+    for path, found in headers.items():
+        for spdx in found["licenses"] or ["unknown"]:
+            by_license.setdefault(spdx, []).append(path)
+    return {
+        spdx: {
+            "files": len(paths),
+            "directories": dict(Counter(_directory(p, depth) for p in paths).most_common(10)),
+            **({"examples": paths[:5]} if not expression_ids(spdx) & project else {}),
+        }
+        for spdx, paths in sorted(by_license.items(), key=lambda kv: -len(kv[1]))
+    }
+
+
+def summarize_license_map(license_map, source_files, prefix=None, limit=50):
+    """Compact view: license files, declared licenses, and per license the directories whose headers
+    carry it; the same for third-party code (vendored files and excluded directories)."""
+    files, license_files, headers = _split(license_map["files"], prefix)
+    project = {l for p, f in license_files.items() if "/" not in p for l in f["licenses"]}
+    vendored, vendored_license_files, vendored_headers = _split(license_map["third_party"], prefix)
+
+    summary = {
+        "scanned_files": license_map["scanned"],
+        "license_files": [{"path": p, **f} for p, f in license_files.items()][:limit],
+        "declared": license_map["declared"],
+        "headers": _headers_by_license(headers, project),
+        "source_files_without_license_header": sum(
+            1 for p in source_files if (not prefix or p.startswith(prefix)) and p not in headers
+        ),
+        "third_party": {
+            "scanned_files": license_map["third_party_scanned"],
+            "license_files": [{"path": p, **f} for p, f in vendored_license_files.items()][:limit],
+            # One level deeper, so each vendored package gets its own entry
+            "headers": _headers_by_license(vendored_headers, project, depth=3),
+        },
+    }
+    if prefix:
+        summary["files"] = {p: f["licenses"] for p, f in list({**files, **vendored}.items())[:limit]}
+    return summary
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class LicenseTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        super().__init__(
+            name="license_tools",
+            tools=[self.detect_licenses],
+            **kwargs,
+        )
+
+    def detect_licenses(self, path: str | None = None, limit: int = 50) -> str:
+        """Detect licenses locally: license files and every file's header are matched against
+        SPDX license templates, and license fields of package manifests are read. Returns a
+        compact map of which licenses apply where; headers under a license other than the
+        project's come with example paths. Vendored code (vendor/, third_party/, ...) is
+        reported separately under third_party.
+
+        Args:
+            path (str | None): Only files under this directory, e.g. "vendor/lib/"; also lists them one by one.
+            limit (int): Maximum number of license files, or files when `path` is given.
+
+        Returns:
+            str: JSON with license_files, declared, headers (per SPDX id: file count and directories),
+                the number of source files without a license header, and third_party with the
+                license files and headers of vendored code.
+        """
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return "No cloned repository found."
+        index = load_index(checkout)
+        source_files = [p for p, _ in index["files"] if Path(p).suffix.lower() in LANGUAGES]
+        summary = summarize_license_map(load_license_map(checkout), source_files, prefix=path, limit=limit)
+        return json.dumps(summary, indent=2)
@@ -1,798 +1,1029 @@
-from agno.models.groq import Groq
-from agno.db.sqlite import SqliteDb
-from agno.tools.file import FileTools
 from agno.tools.shell import ShellTools
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.agent import Agent
 from pathlib import Path
 from dotenv import load_dotenv
-import os
+from functools import cache
 from agno.team import Team
+from config import DB_FILE, OFFLINE, REPO_DIR
+from repo_index import RepoFileTools, RepoIndexTools
+from repo_loader import GitLoaderTools
+from code_metrics import CodeMetricsTools
+from agent_cache import AgentResultCache, enable_result_cache
+from summarizer import SummaryTools
+from manifests import DependencyManifestTools
+from symbol_index import SymbolIndexTools
+from search_index import SearchIndexTools
+from workspaces import WORKSPACE_QUOTA_BYTES
+from instrumentation import MetricsStore, instrument_team
+from memory_policy import MemoryPolicy, MemoryStore, MemoryTools, apply_memory_policy
+from storage import get_engine, start_maintenance, thread_safe
+from intent_router import RoutingLog, apply_router, make_router
+from learning_resources import LearningResourceTools, ResourceCache
+from license_scan import LicenseTools
+from readme_sections import ReadmeStore, ReadmeTools
 
 
 load_dotenv()
 
-model = Groq(id="qwen/qwen3-32b")
+# The model client, the database, the stores and the team are created on first
+# use, so importing this module stays cheap. Assign `model` before building a
+# team to run it with another model.
+model = None
 
-BASE_DIR = Path(__file__).parent
-REPO_DIR = BASE_DIR / "repo"
 
-REPO_DIR.mkdir(parents=True, exist_ok=True)
+def get_model():
+    global model
+    if model is None:
+        from agno.models.groq import Groq
+
+        model = Groq(id="qwen/qwen3-32b")
+    return model
+
+
+@cache
+def get_db():
+    from agno.db.sqlite import SqliteDb
+
+    # WAL, a connection pool, and pruning/compaction once a day (see storage.py)
+    db = SqliteDb(
+        db_engine=get_engine(DB_FILE),
+        session_table="session_table"
+    )
+    start_maintenance(DB_FILE)
+    # Background jobs run several teams on it at once (see jobs.py)
+    return thread_safe(db)
+
+
+# Same commit + same request + same instructions => same answer, so repeated
+# questions are served from memory.db instead of calling the model again.
+@cache
+def get_result_cache():
+    return AgentResultCache(db_file=DB_FILE)
+
+
+# Per-agent latency, token and tool-call records (see instrumentation.py)
+@cache
+def get_metrics_store():
+    return MetricsStore(db_file=DB_FILE)
+
+
+# Conversation memory: the last turns verbatim, older ones in a running summary,
+# plus facts the user confirmed. Token ceilings are per agent.
+@cache
+def get_memory_store():
+    return MemoryStore(db_file=DB_FILE)
+
+
+# Documentation links per technology, so common frameworks need no web search
+@cache
+def get_resource_cache():
+    return ResourceCache(db_file=DB_FILE)
+
+
+# README preview sections with the inputs they were written from, so an edit or a
+# changed analysis only rewrites the sections it affects
+@cache
+def get_readme_store():
+    return ReadmeStore(db_file=DB_FILE)
+
+
+MEMORY_POLICIES = {
+    "file_analyzer_agent": MemoryPolicy(recent_turns=2, max_history_tokens=2000),
+    "code_understanding_agent": MemoryPolicy(recent_turns=3, max_history_tokens=4000),
+    "compliance_agent": MemoryPolicy(recent_turns=2, max_history_tokens=1500),
+    "readme_preview_agent": MemoryPolicy(recent_turns=2, max_history_tokens=6000, max_turn_tokens=2000),
+    "repo_chatbot_team": MemoryPolicy(recent_turns=4, max_history_tokens=3000),
+}
+
+# Clear-cut questions go straight to one member; the rest still go through the orchestrator.
+# Train the optional lexical model with `python intent_router.py train`.
+@cache
+def get_intent_router():
+    return make_router()
+
+
+@cache
+def get_routing_log():
+    return RoutingLog(db_file=DB_FILE)
 
-db = SqliteDb(
-    db_file="memory.db",
-    session_table="session_table"
-)
 
 # -----------------------------
 # GitHub Loader Agent
 # -----------------------------
-github_loader_agent = Agent(
-    id="github_loader_agent",
-    name="GitHub Loader Agent",
-    role="Repository loader",
-    description="Clones a GitHub repository into the local workspace.",
-    instructions=[
-        "You are responsible for cloning GitHub repositories.",
-        "Use git clone to clone the repository provided as input.",
-        "Clone the repository inside the 'repo' directory.",
-        "Do not modify repository contents after cloning.",
-        "Confirm successful cloning and list the top-level files."
-    ],
-    model=model,
-    tools=[
-        ShellTools(),
-        FileTools(base_dir=REPO_DIR)
-    ]
-)
+def make_github_loader_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="github_loader_agent",
+        name="GitHub Loader Agent",
+        role="Repository loader",
+        description="Clones a GitHub repository into the local workspace.",
+        instructions=[
+            "You are responsible for cloning GitHub repositories.",
+            "Use the clone_repository tool to clone the repository provided as input; do not run git yourself.",
+            "clone_repository makes a shallow, blob-filtered clone inside the 'repo' directory and indexes it.",
+            "Pass sparse_paths only when the user asks about specific directories of a large repository.",
+            "If an agent later needs paths outside a sparse checkout, use expand_checkout.",
+            "If the repository is already cloned and the user asks to refresh or pull it, use update_repository "
+            "and report which agents need to re-run.",
+            "Do not modify repository contents after cloning.",
+            "Confirm successful cloning, report clone time and bytes transferred, and list the top-level files."
+        ],
+        model=get_model(),
+        tools=[
+            GitLoaderTools(repo_dir=repo_dir, cache=get_result_cache(), max_bytes=WORKSPACE_QUOTA_BYTES),
+            RepoFileTools(base_dir=repo_dir)
+        ]
+    )
 
 # -----------------------------
 #   Repository Metadata Agent
 # -----------------------------
-repo_metadata_agent = Agent(
-    id="repo_metadata_agent",
-    name="Repository Metadata Agent",
-    role="Repository inspector",
-    description=(
-        "Collects high-level metadata about the GitHub repository such as "
-        "repository identity, branch details, commit information, and folder structure "
-        "without analyzing application logic."
-    ),
-    model=model,
-    tools=[
-        FileTools(base_dir=REPO_DIR),
-        ShellTools()
-    ],
-    instructions=[
-        # Core responsibility
-        "You are responsible for extracting high-level, factual metadata about the repository.",
-        "Focus strictly on repository structure and Git metadata, not code behavior or business logic.",
-
-        # Repository identity
-        "Determine the repository name from the directory or git configuration.",
-        "Identify the currently checked-out branch using git commands.",
-        "If available, list other local branches without switching branches.",
-
-        # Commit metadata
-        "Retrieve the latest commit hash, author, and commit message using git log.",
-        "If git history is shallow or unavailable, clearly state that.",
-
-        # Repository structure
-        "List all top-level directories and files in the repository root.",
-        "Highlight important project files such as README, LICENSE, Dockerfile, "
-        "package.json, pyproject.toml, requirements.txt, or configuration folders.",
-
-        # Repository health indicators
-        "Check whether a README file exists and report its presence or absence.",
-        "Check whether a LICENSE file exists and report its presence or absence.",
-
-        # Safety constraints
-        "Do not open or analyze source code files.",
-        "Do not infer project purpose or functionality.",
-        "Do not modify any files or git state.",
-
-        # Output format
-        "Present the metadata in a clean, structured, and human-readable summary.",
-        "Clearly separate Git metadata from file-system metadata.",
-        "Explicitly note any missing or unavailable information."
-    ]
-)
-
-file_analyzer_agent = Agent(
-    id="file_analyzer_agent",
-    name="File Analyzer Agent",
-    role="Universal repository analyzer",
-    description=(
-        "Performs language-agnostic analysis of a repository by inspecting "
-        "file extensions, ecosystem configuration files, and structural "
-        "conventions to identify languages, build tools, and entry indicators."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are an expert, language-agnostic repository structure analysis agent.",
-        "Analyze the repository strictly through file and directory inspection.",
-
-        # Language detection
-        "Detect all programming languages present using file extensions.",
-        "Classify languages as primary or secondary based on prevalence.",
-        "If the repository contains multiple languages, explicitly mark it as multi-language.",
-
-        # Ecosystem detection
-        "Detect build tools, package managers, and ecosystems using well-known configuration files "
-        "such as package.json, pyproject.toml, pom.xml, build.gradle, go.mod, Cargo.toml, "
-        "composer.json, Gemfile, Package.swift, build.sbt, Makefile, or CMakeLists.txt.",
-
-        # Entry point identification
-        "Identify potential application entry points based on naming conventions and directory placement "
-        "without interpreting code logic.",
-        "Classify entry indicators as likely web service, CLI tool, library, desktop app, or mobile app "
-        "only when structure clearly supports the classification.",
-
-        # Configuration files
-        "List important configuration and environment-related files such as .env.example, "
-        "Dockerfile, docker-compose.yml, and CI/CD configuration files.",
-
-        # Exclusions
-        "Ignore generated or dependency directories such as .git, node_modules, vendor, dist, build, "
-        "__pycache__, and target unless explicitly asked.",
-
-        # Safety constraints
-        "Do not open or interpret source code.",
-        "Do not execute any scripts or build tools.",
-        "Do not use git commands.",
-
-        # Output format
-        "Present results in clearly separated sections: Languages, Ecosystems & Build Tools, "
-        "Entry Indicators, Configuration Files, and Notes.",
-        "Indicate uncertainty where signals are weak or ambiguous.",
-        "Ask the user to review and confirm or correct the analysis before downstream documentation proceeds."
-    ]
-)
-
-dependency_agent = Agent(
-    id="dependency_analysis_agent",
-    name="Dependency Analysis Agent",
-    role="Dependency inspector",
-    description=(
-        "Analyzes declared project dependencies to identify external libraries, "
-        "frameworks, and tooling used across supported languages, based strictly "
-        "on dependency configuration files."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are responsible for identifying and documenting external dependencies declared by the project.",
-        "Analyze only explicit dependency definition files and do not infer dependencies from source code imports.",
-
-        # Language-agnostic dependency sources
-        "Detect and analyze dependency files based on the ecosystem, including but not limited to:",
-        "- Python: requirements.txt, pyproject.toml, setup.py, Pipfile",
-        "- JavaScript / TypeScript: package.json",
-        "- Java: pom.xml, build.gradle",
-        "- Go: go.mod",
-        "- Rust: Cargo.toml",
-        "- PHP: composer.json",
-        "- Ruby: Gemfile",
-        "- .NET: .csproj, packages.config",
-        "If an ecosystem is detected but no dependency file is present, explicitly state this.",
-
-        # Dependency extraction
-        "Extract the list of direct (top-level) dependencies only.",
-        "Ignore transitive or lock-file dependencies unless explicitly asked.",
-        "If version constraints are present, include them in the report.",
-
-        # Classification
-        "Classify dependencies into categories such as framework, library, database client, "
-        "authentication, testing, build tool, or utility when the purpose is obvious from the dependency name.",
-        "If the purpose is unclear, mark it as 'purpose unclear' rather than guessing.",
-
-        # Human-in-the-loop review
-        "Present the dependency analysis in a clear, structured format suitable for human review.",
-        "Explicitly ask the user to confirm, correct, or annotate the purpose of any dependency "
-        "that is ambiguous or project-specific.",
-        "Allow the user to override or add context to dependency descriptions.",
-
-        # Safety constraints
-        "Do not install dependencies or execute any package manager commands.",
-        "Do not infer runtime behavior or architectural decisions from dependencies alone.",
-        "Do not use external internet knowledge to describe dependency purpose unless it is universally obvious.",
-
-        # Output format
-        "Organize the output by ecosystem with sections for:",
-        "- Dependency Name",
-        "- Version (if specified)",
-        "- Category",
-        "- Observed Purpose",
-        "- Confidence (high / medium / low)",
-        "Clearly separate confirmed information from assumptions.",
-        "Wait for user confirmation before downstream documentation or README generation proceeds."
-    ]
-)
-
-code_quality_agent = Agent(
-    id="code_quality_agent",
-    name="Code Quality Agent",
-    role="Static code quality analyzer",
-    description=(
-        "Performs language-agnostic static code quality analysis by inspecting "
-        "source files for common maintainability issues and code smells without "
-        "executing or modifying any code."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are responsible for identifying potential code quality issues and "
-        "maintainability risks using static inspection techniques only.",
-
-        # Scope & methodology
-        "Analyze source code files by reading their structure, size, and patterns, "
-        "not by executing or testing the code.",
-        "Apply language-agnostic heuristics that are valid across most programming languages.",
-
-        # Code smell detection
-        "Identify functions or methods that are unusually long based on file context "
-        "and common readability expectations.",
-        "Detect duplicated or near-duplicated logic across files when repetition is clearly visible.",
-        "Flag areas of tight coupling, such as excessive cross-module imports or "
-        "deeply nested dependency chains when structurally evident.",
-
-        # Complexity indicators
-        "Highlight files or functions with high apparent complexity, such as deeply nested "
-        "control structures, large conditional blocks, or extensive branching.",
-        "Do not calculate formal complexity metrics unless they are explicitly derivable from structure.",
-
-        # Exclusions & safety
-        "Do not refactor or suggest code changes.",
-        "Do not execute code or run linters.",
-        "Do not infer runtime performance or correctness.",
-        "Do not flag stylistic preferences unless they clearly impact maintainability.",
-
-        # Evidence-based reporting
-        "For each identified issue, reference the file path and a brief structural reason "
-        "for why the issue was flagged.",
-        "Avoid subjective language; report only what is directly observable.",
-
-        # Human-in-the-loop review
-        "Present findings in a structured, review-friendly format.",
-        "Explicitly state uncertainty where an issue is borderline or context-dependent.",
-        "Invite the user to confirm, dismiss, or annotate reported issues before "
-        "downstream documentation or recommendations are generated.",
-
-        # Output format
-        "Group findings by category, such as Long Functions, Duplication, Coupling, and Complexity.",
-        "Summarize overall codebase quality at a high level without assigning a numeric score."
-    ]
-)
-
-error_doc_agent = Agent(
-    id="error_documentation_agent",
-    name="Error Documentation Agent",
-    role="Error analyzer",
-    description=(
-        "Identifies and documents error-handling patterns, raised exceptions, "
-        "and observable failure scenarios by statically inspecting source code "
-        "and configuration files without executing the application."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are responsible for identifying and documenting observable error conditions "
-        "and error-handling behavior present in the repository.",
-
-        # Scope & methodology
-        "Analyze source code and configuration files using static inspection only.",
-        "Do not execute the application, run tests, or simulate failures.",
-
-        # Error detection (language-agnostic)
-        "Search for explicit error raising constructs such as exceptions, throws, panics, "
-        "or error returns, using language-appropriate keywords when visible.",
-        "Identify try-catch, try-except, rescue, or equivalent error-handling blocks.",
-        "Detect logging statements that clearly indicate error conditions or failure paths.",
-
-        # Failure scenarios
-        "Group related error patterns into high-level failure scenarios such as "
-        "configuration errors, missing dependencies, invalid input, network failures, "
-        "authentication or authorization failures, and external service errors when "
-        "these categories are clearly supported by the code.",
-        "Do not invent failure scenarios that are not explicitly observable.",
-
-        # Cause & mitigation
-        "When error messages, comments, or configuration clearly indicate a cause, "
-        "document the likely cause of the error.",
-        "When recovery or mitigation steps are explicitly coded (e.g., retries, fallbacks, "
-        "graceful exits), document them as observed behavior.",
-        "If no mitigation is visible, explicitly state that none is documented.",
-
-        # Evidence-based reporting
-        "For each documented error or failure scenario, reference the file path and "
-        "briefly describe the structural evidence supporting the observation.",
-        "Avoid speculative explanations or inferred runtime behavior.",
-
-        # Exclusions & safety
-        "Do not infer production incidents or historical failures.",
-        "Do not assume operational environments or deployment configurations.",
-        "Do not suggest fixes or code changes.",
-
-        # Human-in-the-loop review
-        "Present findings in a structured, review-friendly format suitable for technical users.",
-        "Clearly indicate confidence levels (high / medium / low) based on the strength of evidence.",
-        "Invite the user to confirm, correct, or annotate documented error scenarios before "
-        "they are used in README or operational documentation.",
-
-        # Output format
-        "Organize output into sections such as Error Patterns, Failure Scenarios, "
-        "Observed Causes, and Observed Mitigations.",
-        "Include a brief summary of error-handling coverage without assigning blame or severity scores."
-    ]
-)
-
-code_understanding_agent = Agent(
-    id="code_understanding_agent",
-    name="Code Understanding Agent",
-    role="Code comprehension specialist",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Understands the purpose, core functionality, and exposed interfaces "
-        "of the project by statically analyzing source code across supported languages, "
-        "without executing or modifying the code."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are an expert code comprehension agent.",
-        "Analyze source code files to understand what the project does at a high level, "
-        "based strictly on observable code structure.",
-
-        # Scope of understanding
-        "Focus on publicly exposed functionality such as APIs, CLI commands, background jobs, "
-        "event handlers, or reusable libraries.",
-        "Identify core features strictly using file organization, function or class names, "
-        "routes, handlers, and imports.",
-
-        # Interface classification
-        "Explicitly classify exposed interfaces when possible, such as:",
-        "- Web API service",
-        "- Command-line interface (CLI)",
-        "- Background worker or scheduled job",
-        "- Library or SDK",
-        "Only classify when structural evidence is clear; otherwise state uncertainty.",
-
-        # Language-specific cues (non-exclusive)
-        "For JavaScript or TypeScript code, identify API routes, middleware, CLI entry points, "
-        "and environment variables using observable patterns such as process.env, routing files, "
-        "or bin scripts.",
-        "For Python code, identify API routes, CLI entry points, and environment variables using "
-        "patterns such as os.environ, argparse, click, or framework-specific routing files.",
-        "For other languages, rely on common structural conventions without attempting deep semantic analysis.",
-
-        # Environment variables
-        "List referenced environment variables when they are explicitly accessed in code.",
-        "Do not guess required values or defaults unless they are clearly defined in code or configuration files.",
-        "Indicate whether environment variables appear required or optional only when this is explicitly evident.",
-
-        # Safety & non-goals
-        "Do not execute any code.",
-        "Do not infer runtime behavior, performance characteristics, scalability, or business intent.",
-        "Do not assume undocumented features or hidden workflows.",
-
-        # Output format
-        "Present findings in a structured format with clear sections such as:",
-        "- High-Level Purpose",
-        "- Exposed Interfaces",
-        "- Core Features",
-        "- Environment Variables",
-        "- Notes & Uncertainties",
-        "Use concise, factual language suitable for README and onboarding documentation.",
-
-        # Human-in-the-loop
-        "Explicitly ask the user to review, confirm, or correct the understanding before "
-        "README generation, onboarding documentation, or test generation proceeds."
-    ]
-)
-
-onboarding_agent = Agent(
-    id="onboarding_agent",
-    name="Getting Started Agent",
-    role="Onboarding documentation writer",
-    description=(
-        "Generates a clear and accurate 'Getting Started' guide that helps new users "
-        "set up, configure, and run the project based strictly on repository structure "
-        "and confirmed analysis."
-    ),
-    model=model,
-    instructions=[
-        # Core responsibility
-        "You are responsible for generating onboarding documentation that enables a new developer "
-        "to set up and run the project for the first time.",
-
-        # Evidence-based generation
-        "Base all setup steps strictly on observable files, configuration, and previously confirmed analysis.",
-        "Do not invent commands, scripts, or workflows that are not explicitly present in the repository.",
-
-        # Environment setup
-        "Identify required runtimes or platforms (e.g., Python, Node.js, Java, Go, Docker) "
-        "only when they are clearly indicated by configuration files or project structure.",
-        "Document environment setup steps at a high level without assuming specific OS distributions.",
-
-        # Dependency installation
-        "Provide dependency installation steps using standard commands derived from detected package managers "
-        "(e.g., pip, npm, yarn, gradle, go mod) only when configuration files explicitly support them.",
-        "If multiple installation options exist, document the safest and most conventional one.",
-
-        # Configuration
-        "Identify required configuration or environment variables only when they are explicitly referenced "
-        "in code or documented in configuration examples.",
-        "If configuration details are incomplete or missing, explicitly state this.",
-
-        # Running the project
-        "Describe how to start or run the project based on detected entry points or scripts.",
-        "If no clear run command is present, explicitly state that manual investigation is required.",
-
-        # Optional steps
-        "Include optional setup steps such as database initialization, migrations, or seed data "
-        "only if they are clearly documented or visible in the repository.",
-
-        # Safety & non-goals
-        "Do not execute any commands or scripts.",
-        "Do not infer deployment, scaling, or production workflows.",
-        "Do not optimize or rewrite setup steps.",
-
-        # Output format
-        "Present onboarding instructions in a step-by-step, numbered format.",
-        "Use fenced code blocks for commands when applicable.",
-        "Clearly label sections such as Prerequisites, Installation, Configuration, and Running the Project.",
-
-        # Human-in-the-loop
-        "Explicitly ask the user to review, confirm, or correct the onboarding steps before "
-        "they are included in README or shared documentation."
-    ]
-)
-
-compliance_agent = Agent(
-    id="compliance_agent",
-    name="Compliance & Licensing Agent",
-    role="Legal compliance analyzer",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Inspects the repository for observable licensing information and explicit "
-        "references to regulatory or standards-related compliance, reporting only "
-        "factual findings without interpretation or legal advice."
-    ),
-    model=model,
-    tools=[FileTools(base_dir=REPO_DIR)],
-    instructions=[
-        # Core responsibility
-        "You are responsible for identifying and documenting licensing and compliance-related "
-        "signals that are explicitly present in the repository.",
-
-        # License detection
-        "Search for license-related files such as LICENSE, LICENSE.md, COPYING, NOTICE, "
-        "or license references in top-level documentation files.",
-        "If a license file is found, report the license name only if it is explicitly stated "
-        "in the file text.",
-        "If a license file exists but the license type is unclear, explicitly mark it as ambiguous.",
-        "If no license file is found, explicitly report that licensing information is missing.",
-
-        # Dependency and notice awareness
-        "Check for files that document third-party licenses or notices (e.g., NOTICE files), "
-        "and report their presence without attempting to validate their completeness.",
-
-        # Compliance indicators
-        "Look for explicit mentions of compliance frameworks, standards, or regulations such as "
-        "GDPR, HIPAA, ISO, SOC 2, PCI-DSS, or similar, only when they are clearly referenced in "
-        "documentation, configuration files, or comments.",
-        "Do not assume compliance based on the technologies used or project domain.",
-
-        # Data handling signals
-        "Identify visible indicators related to data protection, security, or audit practices "
-        "only when they are explicitly documented (e.g., privacy notices, data retention notes).",
-        "Do not infer how data is processed, stored, or protected beyond what is written.",
-
-        # Missing or unclear information
-        "Clearly distinguish between information that is:",
-        "- Explicitly present",
-        "- Present but unclear or ambiguous",
-        "- Completely absent",
-        "Avoid filling gaps with assumptions.",
-
-        # Safety & non-goals
-        "Do not provide legal advice, recommendations, or risk assessments.",
-        "Do not state or imply that the project is compliant or non-compliant.",
-        "Do not interpret legal obligations or regulatory scope.",
-
-        # Human-in-the-loop review
-        "Present findings in a neutral, factual, and review-friendly format.",
-        "Invite the user to verify, correct, or supplement the observed compliance information "
-        "before it is included in documentation or reports.",
-
-        # Output format
-        "Organize the output into clear sections such as:",
-        "- Licensing",
-        "- Third-Party Notices",
-        "- Compliance Mentions",
-        "- Data Handling References",
-        "- Notes & Uncertainties",
-        "Use cautious language and explicitly state uncertainty where information is incomplete."
-    ]
-)
-
-
-readme_preview_agent = Agent(
-    id="readme_preview_agent",
-    name="README Preview Agent",
-    role="Documentation writer",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Generates a complete, reviewable README.md preview using confirmed "
-        "repository analysis, without writing any files to disk."
-    ),
-    model=model,
-    instructions=[
-        # Core responsibility
-        "You are an expert technical documentation writer responsible for producing a "
-        "high-quality README.md preview for user review.",
-
-        # Input constraints
-        "Use ONLY information that has been explicitly reviewed and confirmed by the user "
-        "from prior agents, such as repository metadata, file analysis, dependency analysis, "
-        "code understanding, onboarding steps, compliance observations, and error documentation.",
-        "If required information is missing or unconfirmed, clearly indicate this instead of guessing.",
-
-        # Content scope
-        "Do not invent or assume features, APIs, commands, configurations, performance characteristics, "
-        "deployment workflows, or future plans.",
-        "Do not include opinions, marketing language, or speculative claims.",
-
-        # README structure
-        "Generate a complete README.md using GitHub-flavored Markdown.",
-        "Include standard sections such as:",
-        "- Project Overview",
-        "- Features",
-        "- Tech Stack",
-        "- Prerequisites (if applicable)",
-        "- Installation",
-        "- Configuration",
-        "- Usage",
-        "- Error Handling (only if confirmed)",
-        "- Compliance & Licensing (only if confirmed)",
-        "- Notes or Limitations (if applicable)",
-
-        # Language & ecosystem handling
-        "Adapt installation and usage instructions based on the detected language, framework, "
-        "or ecosystem, without limiting support to specific languages.",
-        "If multiple languages or runtimes are involved, clearly document this.",
-
-        # Formatting & style
-        "Use clear headings, bullet points, tables where appropriate, and fenced code blocks for commands.",
-        "Use minimal emojis only when they improve readability.",
-        "Maintain a neutral, professional tone suitable for open-source or enterprise projects.",
-
-        # Safety & non-goals
-        "DO NOT write the README.md to disk.",
-        "DO NOT include badges, diagrams, or external links unless explicitly confirmed.",
-        "DO NOT modify repository files or metadata.",
-
-        # Human-in-the-loop
-        "Present the README content clearly as a preview.",
-        "Explicitly ask the user to approve, request edits, or supply missing information "
-        "before final README generation or export."
-    ]
-)
-
-learning_agent = Agent(
-    id="learning_resource_agent",
-    name="Learning Resource Agent",
-    role="Educational recommender",
-    description=(
-        "Recommends high-quality learning resources to help users understand "
-        "technologies, frameworks, or patterns detected in the repository."
-    ),
-    model=model,
-    instructions=[
-        # Core responsibility
-        "You are responsible for suggesting learning resources that help users "
-        "understand unfamiliar technologies, frameworks, or architectural patterns "
-        "present in the repository.",
-
-        # Input constraints
-        "Base recommendations strictly on confirmed technologies, frameworks, "
-        "languages, and patterns identified by previous agents.",
-        "Do not introduce new technologies or assumptions.",
-
-        # When to suggest resources
-        "Suggest learning resources only when a technology, framework, or pattern "
-        "is likely to be unfamiliar or non-obvious to a general developer audience.",
-        "Do not recommend resources for basic or universally known concepts unless "
-        "explicitly requested.",
-
-        # Resource selection criteria
-        "Prefer official documentation, official tutorials, or well-known authoritative sources.",
-        "Avoid personal blogs, opinion pieces, marketing pages, or unverified third-party content.",
-        "If an official resource does not exist, clearly state this and avoid guessing alternatives.",
-
-        # Scope of recommendations
-        "Provide a small, curated list of resources per topic (ideally 1–3 links).",
-        "Explain briefly what each resource helps the reader learn.",
-
-        # Safety & non-goals
-        "Do not provide step-by-step tutorials that duplicate onboarding instructions.",
-        "Do not recommend tools or services not used in the repository.",
-        "Do not claim endorsement or quality beyond what is widely accepted.",
-
-        # Output format
-        "Organize recommendations by technology or concept.",
-        "Clearly label each recommendation as official documentation, official tutorial, "
-        "or reference material.",
-        "Indicate the intended audience level (beginner, intermediate, advanced) when appropriate.",
-
-        # Human-in-the-loop
-        "Present recommendations for user review.",
-        "Invite the user to approve, remove, or replace suggested resources before they "
-        "are included in documentation or exported."
-
-        "Use web search only to retrieve official documentation or authoritative references",
-        "for technologies already confirmed by repository analysis.",
-        "Do not introduce new technologies, tools, or assumptions based on search results.",
-        "Prefer official domains and project-owned documentation."
-
-    ],
-    tools=[DuckDuckGoTools()]
-)
-
-
-test_generator_agent = Agent(
-    id="test_generator_agent",
-    name="Test Case Generator Agent",
-    role="Test case author",
-    description=(
-        "Generates high-level and implementation-ready test cases based on "
-        "confirmed repository understanding, without executing code or assuming "
-        "undocumented behavior."
-    ),
-    model=model,
-    instructions=[
-        # Core responsibility
-        "You are responsible for generating test cases that validate the observable "
-        "functionality and interfaces of the project.",
-
-        # Input constraints
-        "Base all test cases strictly on confirmed outputs from prior agents, "
-        "especially the Code Understanding Agent, Dependency Analysis Agent, "
-        "and Onboarding Agent.",
-        "Do not generate tests for features, APIs, or workflows that are not explicitly confirmed.",
-
-        # Test scope
-        "Generate test cases for publicly exposed interfaces such as:",
-        "- Web APIs (endpoints, request/response behavior)",
-        "- CLI commands and flags",
-        "- Background jobs or workers",
-        "- Libraries or reusable modules (public functions only)",
-        "Do not generate tests for internal helper functions unless they are explicitly exposed.",
-
-        # Test types
-        "Generate appropriate test types based on the project, including:",
-        "- Unit tests for isolated logic",
-        "- Integration tests for API or service interactions",
-        "- Smoke tests for basic startup or execution paths",
-        "Do not generate end-to-end or load tests unless explicitly requested.",
-
-        # Language & framework awareness
-        "Adapt test case structure and examples to the detected language and testing ecosystem "
-        "(e.g., pytest, unittest, Jest, Mocha, JUnit, Go test) only when such tools are "
-        "explicitly present in the repository.",
-        "If no testing framework is detected, generate framework-agnostic test case descriptions.",
-
-        # Assertions & expectations
-        "Define clear test objectives, inputs, and expected outcomes.",
-        "Avoid asserting internal implementation details.",
-        "When expected behavior is unclear, explicitly state assumptions and mark confidence as low.",
-
-        # Safety & non-goals
-        "Do not execute any tests.",
-        "Do not generate mock data that implies real user or production data.",
-        "Do not assume database schemas, external services, or infrastructure details "
-        "unless explicitly visible in the repository.",
-
-        # Human-in-the-loop review
-        "Present test cases for human review before any file generation or export.",
-        "Allow the user to confirm, modify, or reject individual test cases.",
-        "Ask the user whether tests should be generated as documentation only or "
-        "written to test files.",
-
-        # Output format
-        "Present test cases in a structured format including:",
-        "- Test Name",
-        "- Purpose",
-        "- Preconditions",
-        "- Steps",
-        "- Expected Result",
-        "- Confidence (high / medium / low)",
-        "Group test cases by feature or interface."
-    ]
-)
-
-repo_chatbot_team = Team(
-    id="repo_chatbot_team",
-    name="Repository Q&A Chatbot",
-    role="Conversational repository assistant",
-    description=(
-        "A conversational agent that answers user questions about a GitHub repository "
-        "by delegating tasks to specialized analysis and documentation agents."
-    ),
-    model=model,
-    db=db,
-    add_history_to_context=True,
-    instructions=[
-        # Core role
-        "You are a conversational assistant that answers questions about the user's repository.",
-        "You do not analyze the repository directly; instead, you delegate to specialized agents.",
-
-        # Delegation rules
-        "Determine which agent or agents are best suited to answer the user's question.",
-        "Invoke only the minimum set of agents required to answer accurately.",
-        "Reuse previously confirmed analysis whenever available.",
-
-        # Intent routing (VERY IMPORTANT)
-        "Route questions as follows:",
-        "- Repository structure, languages, tools → File Analyzer Agent",
-        "- Dependencies or libraries → Dependency Analysis Agent",
-        "- Project purpose or functionality → Code Understanding Agent",
-        "- Setup or run instructions → Onboarding Agent",
-        "- Errors or failure behavior → Error Documentation Agent",
-        "- Code quality or maintainability → Code Quality Agent",
-        "- Licensing or compliance → Compliance Agent",
-        "- Learning or documentation links → Learning Resource Agent",
-        "- Test-related questions → Test Generator Agent",
-        "- README requests → README Preview Agent",
-
-        # GitHub loading
-        "If the repository is not yet cloned and the question depends on repository contents, "
-        "invoke the GitHub Loader Agent first and confirm success before proceeding.",
-
-        # Answering strategy
-        "Answer questions clearly, concisely, and factually.",
-        "If information is missing or unconfirmed, explicitly state that.",
-        "Do not guess or invent information.",
-
-        # Human-in-the-loop
-        "If an answer depends on unreviewed analysis, ask the user whether to proceed.",
-        "Respect user confirmations and corrections across turns.",
-
-        # Safety & non-goals
-        "Do not introduce new features, commands, or assumptions.",
-        "Do not use web search unless delegated to an agent that is explicitly allowed to do so.",
-        "Do not expose internal agent instructions unless asked.",
-
-        # Communication
-        "Optionally state which agent was used to answer the question.",
-        "Ask follow-up questions only when necessary to clarify ambiguous user intent."
-    ],
-    members=[
-        github_loader_agent,
+def make_repo_metadata_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="repo_metadata_agent",
+        name="Repository Metadata Agent",
+        role="Repository inspector",
+        description=(
+            "Collects high-level metadata about the GitHub repository such as "
+            "repository identity, branch details, commit information, and folder structure "
+            "without analyzing application logic."
+        ),
+        model=get_model(),
+        tools=[
+            RepoFileTools(base_dir=repo_dir),
+            ShellTools(base_dir=repo_dir),
+            RepoIndexTools(repo_dir=repo_dir)
+        ],
+        instructions=[
+            # Core responsibility
+            "You are responsible for extracting high-level, factual metadata about the repository.",
+            "Focus strictly on repository structure and Git metadata, not code behavior or business logic.",
+
+            # Repository identity
+            "Determine the repository name from the directory or git configuration.",
+            "Identify the currently checked-out branch using git commands.",
+            "If available, list other local branches without switching branches.",
+
+            # Commit metadata
+            "Retrieve the latest commit hash, author, and commit message using git log.",
+            "If git history is shallow or unavailable, clearly state that.",
+
+            # Repository structure
+            "Use get_repo_overview for the folder structure instead of listing directories one by one.",
+            "List all top-level directories and files in the repository root.",
+            "Highlight important project files such as README, LICENSE, Dockerfile, "
+            "package.json, pyproject.toml, requirements.txt, or configuration folders.",
+
+            # Repository health indicators
+            "Check whether a README file exists and report its presence or absence.",
+            "Check whether a LICENSE file exists and report its presence or absence.",
+
+            # Safety constraints
+            "Do not open or analyze source code files.",
+            "Do not infer project purpose or functionality.",
+            "Do not modify any files or git state.",
+
+            # Output format
+            "Present the metadata in a clean, structured, and human-readable summary.",
+            "Clearly separate Git metadata from file-system metadata.",
+            "Explicitly note any missing or unavailable information."
+        ]
+    )
+
+def make_file_analyzer_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="file_analyzer_agent",
+        name="File Analyzer Agent",
+        role="Universal repository analyzer",
+        description=(
+            "Performs language-agnostic analysis of a repository by inspecting "
+            "file extensions, ecosystem configuration files, and structural "
+            "conventions to identify languages, build tools, and entry indicators."
+        ),
+        model=get_model(),
+        tools=[RepoFileTools(base_dir=repo_dir), RepoIndexTools(repo_dir=repo_dir)],
+        instructions=[
+            # Core responsibility
+            "You are an expert, language-agnostic repository structure analysis agent.",
+            "Analyze the repository strictly through file and directory inspection.",
+            "Start from get_repo_overview and find_files; only list directories when the index is missing.",
+
+            # Language detection
+            "Detect all programming languages present using file extensions.",
+            "Classify languages as primary or secondary based on prevalence.",
+            "If the repository contains multiple languages, explicitly mark it as multi-language.",
+
+            # Ecosystem detection
+            "Detect build tools, package managers, and ecosystems using well-known configuration files "
+            "such as package.json, pyproject.toml, pom.xml, build.gradle, go.mod, Cargo.toml, "
+            "composer.json, Gemfile, Package.swift, build.sbt, Makefile, or CMakeLists.txt.",
+
+            # Entry point identification
+            "Identify potential application entry points based on naming conventions and directory placement "
+            "without interpreting code logic.",
+            "Classify entry indicators as likely web service, CLI tool, library, desktop app, or mobile app "
+            "only when structure clearly supports the classification.",
+
+            # Configuration files
+            "List important configuration and environment-related files such as .env.example, "
+            "Dockerfile, docker-compose.yml, and CI/CD configuration files.",
+
+            # Exclusions
+            "Ignore generated or dependency directories such as .git, node_modules, vendor, dist, build, "
+            "__pycache__, and target unless explicitly asked.",
+
+            # Safety constraints
+            "Do not open or interpret source code.",
+            "Do not execute any scripts or build tools.",
+            "Do not use git commands.",
+
+            # Output format
+            "Present results in clearly separated sections: Languages, Ecosystems & Build Tools, "
+            "Entry Indicators, Configuration Files, and Notes.",
+            "Indicate uncertainty where signals are weak or ambiguous.",
+            "Ask the user to review and confirm or correct the analysis before downstream documentation proceeds."
+        ]
+    )
+
+def make_dependency_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="dependency_analysis_agent",
+        name="Dependency Analysis Agent",
+        role="Dependency inspector",
+        description=(
+            "Analyzes declared project dependencies to identify external libraries, "
+            "frameworks, and tooling used across supported languages, based strictly "
+            "on dependency configuration files."
+        ),
+        model=get_model(),
+        tools=[
+            RepoFileTools(base_dir=repo_dir),
+            RepoIndexTools(repo_dir=repo_dir),
+            DependencyManifestTools(repo_dir=repo_dir)
+        ],
+        instructions=[
+            # Core responsibility
+            "You are responsible for identifying and documenting external dependencies declared by the project.",
+            "Analyze only explicit dependency definition files and do not infer dependencies from source code imports.",
+            "Call list_declared_dependencies first; it parses every supported manifest deterministically "
+            "and returns the exact direct dependencies with version constraints and scope.",
+            "Your job is to classify the dependencies in that table; do not re-extract, rename or change versions.",
+            "Read a manifest with RepoFileTools only when it is reported as unparseable or its ecosystem is not covered by the tool.",
+
+            # Language-agnostic dependency sources
+            "Detect and analyze dependency files based on the ecosystem, including but not limited to:",
+            "- Python: requirements.txt, pyproject.toml, setup.py, Pipfile",
+            "- JavaScript / TypeScript: package.json",
+            "- Java: pom.xml, build.gradle",
+            "- Go: go.mod",
+            "- Rust: Cargo.toml",
+            "- PHP: composer.json",
+            "- Ruby: Gemfile",
+            "- .NET: .csproj, packages.config",
+            "If an ecosystem is detected but no dependency file is present, explicitly state this.",
+
+            # Dependency extraction
+            "Extract the list of direct (top-level) dependencies only.",
+            "Ignore transitive or lock-file dependencies unless explicitly asked.",
+            "If version constraints are present, include them in the report.",
+
+            # Classification
+            "Classify dependencies into categories such as framework, library, database client, "
+            "authentication, testing, build tool, or utility when the purpose is obvious from the dependency name.",
+            "If the purpose is unclear, mark it as 'purpose unclear' rather than guessing.",
+
+            # Human-in-the-loop review
+            "Present the dependency analysis in a clear, structured format suitable for human review.",
+            "Explicitly ask the user to confirm, correct, or annotate the purpose of any dependency "
+            "that is ambiguous or project-specific.",
+            "Allow the user to override or add context to dependency descriptions.",
+
+            # Safety constraints
+            "Do not install dependencies or execute any package manager commands.",
+            "Do not infer runtime behavior or architectural decisions from dependencies alone.",
+            "Do not use external internet knowledge to describe dependency purpose unless it is universally obvious.",
+
+            # Output format
+            "Organize the output by ecosystem with sections for:",
+            "- Dependency Name",
+            "- Version (if specified)",
+            "- Category",
+            "- Observed Purpose",
+            "- Confidence (high / medium / low)",
+            "Clearly separate confirmed information from assumptions.",
+            "Wait for user confirmation before downstream documentation or README generation proceeds."
+        ]
+    )
+
+def make_code_quality_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="code_quality_agent",
+        name="Code Quality Agent",
+        role="Static code quality analyzer",
+        description=(
+            "Performs language-agnostic static code quality analysis by inspecting "
+            "source files for common maintainability issues and code smells without "
+            "executing or modifying any code."
+        ),
+        model=get_model(),
+        tools=[
+            CodeMetricsTools(repo_dir=repo_dir),
+            RepoFileTools(base_dir=repo_dir, ranged_reads=True),
+            RepoIndexTools(repo_dir=repo_dir),
+        ],
+        instructions=[
+            # Core responsibility
+            "You are responsible for identifying potential code quality issues and "
+            "maintainability risks using static inspection techniques only.",
+
+            # Measured metrics
+            "Call code_metrics first. It measures every source file: lines of code, cyclomatic complexity, "
+            "function length, nesting depth and duplicated blocks, as percentiles and hotspot lists. "
+            "Base your findings on these numbers and interpret them. Do not sample files to estimate them.",
+            "Use file_metrics for the functions of one file, and read code only to explain a hotspot.",
+
+            # Scope & methodology
+            "Analyze source code files by reading their structure, size, and patterns, "
+            "not by executing or testing the code.",
+            "Apply language-agnostic heuristics that are valid across most programming languages.",
+            "Use find_files to pick which source files to inspect instead of listing directories.",
+            "For big files, use grep_file and read_lines to inspect the relevant parts instead of reading them whole.",
+
+            # Code smell detection
+            "Identify functions or methods that are unusually long based on file context "
+            "and common readability expectations.",
+            "Detect duplicated or near-duplicated logic across files when repetition is clearly visible.",
+            "Flag areas of tight coupling, such as excessive cross-module imports or "
+            "deeply nested dependency chains when structurally evident.",
+
+            # Complexity indicators
+            "Highlight files or functions with high apparent complexity, such as deeply nested "
+            "control structures, large conditional blocks, or extensive branching.",
+            "Do not calculate complexity metrics yourself; quote the ones code_metrics reports.",
+
+            # Exclusions & safety
+            "Do not refactor or suggest code changes.",
+            "Do not execute code or run linters.",
+            "Do not infer runtime performance or correctness.",
+            "Do not flag stylistic preferences unless they clearly impact maintainability.",
+
+            # Evidence-based reporting
+            "For each identified issue, reference the file path and a brief structural reason "
+            "for why the issue was flagged.",
+            "Avoid subjective language; report only what is directly observable.",
+
+            # Human-in-the-loop review
+            "Present findings in a structured, review-friendly format.",
+            "Explicitly state uncertainty where an issue is borderline or context-dependent.",
+            "Invite the user to confirm, dismiss, or annotate reported issues before "
+            "downstream documentation or recommendations are generated.",
+
+            # Output format
+            "Group findings by category, such as Long Functions, Duplication, Coupling, and Complexity.",
+            "Summarize overall codebase quality at a high level without assigning a numeric score."
+        ]
+    )
+
+def make_error_doc_agent(summary_tools, repo_dir=REPO_DIR):
+    return Agent(
+        id="error_documentation_agent",
+        name="Error Documentation Agent",
+        role="Error analyzer",
+        description=(
+            "Identifies and documents error-handling patterns, raised exceptions, "
+            "and observable failure scenarios by statically inspecting source code "
+            "and configuration files without executing the application."
+        ),
+        model=get_model(),
+        tools=[
+            RepoFileTools(base_dir=repo_dir, ranged_reads=True),
+            RepoIndexTools(repo_dir=repo_dir),
+            summary_tools,
+            SearchIndexTools(repo_dir=repo_dir)
+        ],
+        instructions=[
+            # Core responsibility
+            "You are responsible for identifying and documenting observable error conditions "
+            "and error-handling behavior present in the repository.",
+
+            # Scope & methodology
+            "Analyze source code and configuration files using static inspection only.",
+            "Do not execute the application, run tests, or simulate failures.",
+            "Use find_files to locate source and configuration files instead of listing directories.",
+            "Use search_repo with terms such as raise, except, throw, error or retry to find "
+            "error-handling code without reading every file.",
+            "In big files and logs, use grep_file (e.g. \"raise |except |ERROR\"), read_tail and read_lines "
+            "instead of reading them whole.",
+            "For large repositories, start from summarize_repository and summarize_path to decide "
+            "which files are worth reading instead of reading every source file.",
+
+            # Error detection (language-agnostic)
+            "Search for explicit error raising constructs such as exceptions, throws, panics, "
+            "or error returns, using language-appropriate keywords when visible.",
+            "Identify try-catch, try-except, rescue, or equivalent error-handling blocks.",
+            "Detect logging statements that clearly indicate error conditions or failure paths.",
+
+            # Failure scenarios
+            "Group related error patterns into high-level failure scenarios such as "
+            "configuration errors, missing dependencies, invalid input, network failures, "
+            "authentication or authorization failures, and external service errors when "
+            "these categories are clearly supported by the code.",
+            "Do not invent failure scenarios that are not explicitly observable.",
+
+            # Cause & mitigation
+            "When error messages, comments, or configuration clearly indicate a cause, "
+            "document the likely cause of the error.",
+            "When recovery or mitigation steps are explicitly coded (e.g., retries, fallbacks, "
+            "graceful exits), document them as observed behavior.",
+            "If no mitigation is visible, explicitly state that none is documented.",
+
+            # Evidence-based reporting
+            "For each documented error or failure scenario, reference the file path and "
+            "briefly describe the structural evidence supporting the observation.",
+            "Avoid speculative explanations or inferred runtime behavior.",
+
+            # Exclusions & safety
+            "Do not infer production incidents or historical failures.",
+            "Do not assume operational environments or deployment configurations.",
+            "Do not suggest fixes or code changes.",
+
+            # Human-in-the-loop review
+            "Present findings in a structured, review-friendly format suitable for technical users.",
+            "Clearly indicate confidence levels (high / medium / low) based on the strength of evidence.",
+            "Invite the user to confirm, correct, or annotate documented error scenarios before "
+            "they are used in README or operational documentation.",
+
+            # Output format
+            "Organize output into sections such as Error Patterns, Failure Scenarios, "
+            "Observed Causes, and Observed Mitigations.",
+            "Include a brief summary of error-handling coverage without assigning blame or severity scores."
+        ]
+    )
+
+def make_code_understanding_agent(summary_tools, repo_dir=REPO_DIR):
+    return Agent(
+        id="code_understanding_agent",
+        name="Code Understanding Agent",
+        role="Code comprehension specialist",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Understands the purpose, core functionality, and exposed interfaces "
+            "of the project by statically analyzing source code across supported languages, "
+            "without executing or modifying the code."
+        ),
+        model=get_model(),
+        tools=[
+            RepoFileTools(base_dir=repo_dir),
+            RepoIndexTools(repo_dir=repo_dir),
+            summary_tools,
+            SymbolIndexTools(repo_dir=repo_dir),
+            SearchIndexTools(repo_dir=repo_dir)
+        ],
+        instructions=[
+            # Core responsibility
+            "You are an expert code comprehension agent.",
+            "Analyze source code files to understand what the project does at a high level, "
+            "based strictly on observable code structure.",
+            "Use get_repo_overview for languages and entry files, and find_files to locate source files.",
+            "Call summarize_repository first; it summarizes every source file and directory within the "
+            "context budget. Read individual files only to confirm details the summaries point to.",
+            "Use get_interface_summary for routes, __main__ blocks, CLI commands and environment variables, "
+            "and query_symbols to look up functions or classes; cite the file:line locations they return.",
+            "Use search_repo to find where a feature or concept is implemented, e.g. \"retry logic\".",
+
+            # Scope of understanding
+            "Focus on publicly exposed functionality such as APIs, CLI commands, background jobs, "
+            "event handlers, or reusable libraries.",
+            "Identify core features strictly using file organization, function or class names, "
+            "routes, handlers, and imports.",
+
+            # Interface classification
+            "Explicitly classify exposed interfaces when possible, such as:",
+            "- Web API service",
+            "- Command-line interface (CLI)",
+            "- Background worker or scheduled job",
+            "- Library or SDK",
+            "Only classify when structural evidence is clear; otherwise state uncertainty.",
+
+            # Language-specific cues (non-exclusive)
+            "For JavaScript or TypeScript code, identify API routes, middleware, CLI entry points, "
+            "and environment variables using observable patterns such as process.env, routing files, "
+            "or bin scripts.",
+            "For Python code, identify API routes, CLI entry points, and environment variables using "
+            "patterns such as os.environ, argparse, click, or framework-specific routing files.",
+            "For other languages, rely on common structural conventions without attempting deep semantic analysis.",
+
+            # Environment variables
+            "List referenced environment variables when they are explicitly accessed in code.",
+            "Do not guess required values or defaults unless they are clearly defined in code or configuration files.",
+            "Indicate whether environment variables appear required or optional only when this is explicitly evident.",
+
+            # Safety & non-goals
+            "Do not execute any code.",
+            "Do not infer runtime behavior, performance characteristics, scalability, or business intent.",
+            "Do not assume undocumented features or hidden workflows.",
+
+            # Output format
+            "Present findings in a structured format with clear sections such as:",
+            "- High-Level Purpose",
+            "- Exposed Interfaces",
+            "- Core Features",
+            "- Environment Variables",
+            "- Notes & Uncertainties",
+            "Use concise, factual language suitable for README and onboarding documentation.",
+
+            # Human-in-the-loop
+            "Explicitly ask the user to review, confirm, or correct the understanding before "
+            "README generation, onboarding documentation, or test generation proceeds."
+        ]
+    )
+
+def make_onboarding_agent():
+    return Agent(
+        id="onboarding_agent",
+        name="Getting Started Agent",
+        role="Onboarding documentation writer",
+        description=(
+            "Generates a clear and accurate 'Getting Started' guide that helps new users "
+            "set up, configure, and run the project based strictly on repository structure "
+            "and confirmed analysis."
+        ),
+        model=get_model(),
+        instructions=[
+            # Core responsibility
+            "You are responsible for generating onboarding documentation that enables a new developer "
+            "to set up and run the project for the first time.",
+
+            # Evidence-based generation
+            "Base all setup steps strictly on observable files, configuration, and previously confirmed analysis.",
+            "Do not invent commands, scripts, or workflows that are not explicitly present in the repository.",
+
+            # Environment setup
+            "Identify required runtimes or platforms (e.g., Python, Node.js, Java, Go, Docker) "
+            "only when they are clearly indicated by configuration files or project structure.",
+            "Document environment setup steps at a high level without assuming specific OS distributions.",
+
+            # Dependency installation
+            "Provide dependency installation steps using standard commands derived from detected package managers "
+            "(e.g., pip, npm, yarn, gradle, go mod) only when configuration files explicitly support them.",
+            "If multiple installation options exist, document the safest and most conventional one.",
+
+            # Configuration
+            "Identify required configuration or environment variables only when they are explicitly referenced "
+            "in code or documented in configuration examples.",
+            "If configuration details are incomplete or missing, explicitly state this.",
+
+            # Running the project
+            "Describe how to start or run the project based on detected entry points or scripts.",
+            "If no clear run command is present, explicitly state that manual investigation is required.",
+
+            # Optional steps
+            "Include optional setup steps such as database initialization, migrations, or seed data "
+            "only if they are clearly documented or visible in the repository.",
+
+            # Safety & non-goals
+            "Do not execute any commands or scripts.",
+            "Do not infer deployment, scaling, or production workflows.",
+            "Do not optimize or rewrite setup steps.",
+
+            # Output format
+            "Present onboarding instructions in a step-by-step, numbered format.",
+            "Use fenced code blocks for commands when applicable.",
+            "Clearly label sections such as Prerequisites, Installation, Configuration, and Running the Project.",
+
+            # Human-in-the-loop
+            "Explicitly ask the user to review, confirm, or correct the onboarding steps before "
+            "they are included in README or shared documentation."
+        ]
+    )
+
+def make_compliance_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="compliance_agent",
+        name="Compliance & Licensing Agent",
+        role="Legal compliance analyzer",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Inspects the repository for observable licensing information and explicit "
+            "references to regulatory or standards-related compliance, reporting only "
+            "factual findings without interpretation or legal advice."
+        ),
+        model=get_model(),
+        tools=[RepoFileTools(base_dir=repo_dir), RepoIndexTools(repo_dir=repo_dir), LicenseTools(repo_dir=repo_dir)],
+        instructions=[
+            # Core responsibility
+            "You are responsible for identifying and documenting licensing and compliance-related "
+            "signals that are explicitly present in the repository.",
+
+            # License detection
+            "Call detect_licenses first: it matches license files and every file header against SPDX "
+            "license texts and returns which licenses apply where. Report its SPDX ids as detected, "
+            "and read a file yourself only when its match is \"close\" or \"unknown\".",
+            "Report licenses in file headers that differ from the project license, with the directories "
+            "and example paths detect_licenses gives; call it with a path to list the files of one directory.",
+            "Use get_repo_overview to see documentation and license files at the repository root.",
+            "Search for license-related files such as LICENSE, LICENSE.md, COPYING, NOTICE, "
+            "or license references in top-level documentation files.",
+            "If a license file is found, report the license name only if it is explicitly stated "
+            "in the file text.",
+            "If a license file exists but the license type is unclear, explicitly mark it as ambiguous.",
+            "If no license file is found, explicitly report that licensing information is missing.",
+
+            # Dependency and notice awareness
+            "Check for files that document third-party licenses or notices (e.g., NOTICE files), "
+            "and report their presence without attempting to validate their completeness.",
+
+            # Compliance indicators
+            "Look for explicit mentions of compliance frameworks, standards, or regulations such as "
+            "GDPR, HIPAA, ISO, SOC 2, PCI-DSS, or similar, only when they are clearly referenced in "
+            "documentation, configuration files, or comments.",
+            "Do not assume compliance based on the technologies used or project domain.",
+
+            # Data handling signals
+            "Identify visible indicators related to data protection, security, or audit practices "
+            "only when they are explicitly documented (e.g., privacy notices, data retention notes).",
+            "Do not infer how data is processed, stored, or protected beyond what is written.",
+
+            # Missing or unclear information
+            "Clearly distinguish between information that is:",
+            "- Explicitly present",
+            "- Present but unclear or ambiguous",
+            "- Completely absent",
+            "Avoid filling gaps with assumptions.",
+
+            # Safety & non-goals
+            "Do not provide legal advice, recommendations, or risk assessments.",
+            "Do not state or imply that the project is compliant or non-compliant.",
+            "Do not interpret legal obligations or regulatory scope.",
+
+            # Human-in-the-loop review
+            "Present findings in a neutral, factual, and review-friendly format.",
+            "Invite the user to verify, correct, or supplement the observed compliance information "
+            "before it is included in documentation or reports.",
+
+            # Output format
+            "Organize the output into clear sections such as:",
+            "- Licensing",
+            "- Third-Party Notices",
+            "- Compliance Mentions",
+            "- Data Handling References",
+            "- Notes & Uncertainties",
+            "Use cautious language and explicitly state uncertainty where information is incomplete."
+        ]
+    )
+
+
+def make_readme_preview_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="readme_preview_agent",
+        name="README Preview Agent",
+        role="Documentation writer",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Generates a complete, reviewable README.md preview using confirmed "
+            "repository analysis, without writing any files to disk."
+        ),
+        model=get_model(),
+        tools=[
+            ReadmeTools(
+                model=get_model(),
+                repo_dir=repo_dir,
+                memory_store=get_memory_store(),
+                result_cache=get_result_cache(),
+                store=get_readme_store(),
+            )
+        ],
+        instructions=[
+            # Core responsibility
+            "You are an expert technical documentation writer responsible for producing a "
+            "high-quality README.md preview for user review.",
+
+            # Input constraints
+            "Use ONLY information that has been explicitly reviewed and confirmed by the user "
+            "from prior agents, such as repository metadata, file analysis, dependency analysis, "
+            "code understanding, onboarding steps, compliance observations, and error documentation.",
+            "If required information is missing or unconfirmed, clearly indicate this instead of guessing.",
+
+            # Content scope
+            "Do not invent or assume features, APIs, commands, configurations, performance characteristics, "
+            "deployment workflows, or future plans.",
+            "Do not include opinions, marketing language, or speculative claims.",
+
+            # README structure
+            "The README is kept as sections (Project Overview, Features, Tech Stack, Prerequisites, "
+            "Installation, Configuration, Usage, Error Handling, Compliance & Licensing, Notes & Limitations), "
+            "each written from the analysis of the agents it depends on.",
+            "To show the README, call render_readme: it rewrites only the sections whose analysis, pinned "
+            "facts or edits changed and reuses the rest. Do not write the README yourself.",
+            "When the user asks to change part of the README, call edit_readme_section once per affected "
+            "section with the user's request; never regenerate the whole README for an edit.",
+            "Use list_readme_sections to tell the user which sections are outdated or lack confirmed analysis.",
+
+            # Language & ecosystem handling
+            "Adapt installation and usage instructions based on the detected language, framework, "
+            "or ecosystem, without limiting support to specific languages.",
+            "If multiple languages or runtimes are involved, clearly document this.",
+
+            # Formatting & style
+            "Use clear headings, bullet points, tables where appropriate, and fenced code blocks for commands.",
+            "Use minimal emojis only when they improve readability.",
+            "Maintain a neutral, professional tone suitable for open-source or enterprise projects.",
+
+            # Safety & non-goals
+            "DO NOT write the README.md to disk.",
+            "DO NOT include badges, diagrams, or external links unless explicitly confirmed.",
+            "DO NOT modify repository files or metadata.",
+
+            # Human-in-the-loop
+            "Present the README content clearly as a preview.",
+            "Explicitly ask the user to approve, request edits, or supply missing information "
+            "before final README generation or export."
+        ]
+    )
+
+def make_learning_agent():
+    return Agent(
+        id="learning_resource_agent",
+        name="Learning Resource Agent",
+        role="Educational recommender",
+        description=(
+            "Recommends high-quality learning resources to help users understand "
+            "technologies, frameworks, or patterns detected in the repository."
+        ),
+        model=get_model(),
+        instructions=[
+            # Core responsibility
+            "You are responsible for suggesting learning resources that help users "
+            "understand unfamiliar technologies, frameworks, or architectural patterns "
+            "present in the repository.",
+
+            # Input constraints
+            "Base recommendations strictly on confirmed technologies, frameworks, "
+            "languages, and patterns identified by previous agents.",
+            "Do not introduce new technologies or assumptions.",
+
+            # When to suggest resources
+            "Suggest learning resources only when a technology, framework, or pattern "
+            "is likely to be unfamiliar or non-obvious to a general developer audience.",
+            "Do not recommend resources for basic or universally known concepts unless "
+            "explicitly requested.",
+
+            # Resource selection criteria
+            "Prefer official documentation, official tutorials, or well-known authoritative sources.",
+            "Avoid personal blogs, opinion pieces, marketing pages, or unverified third-party content.",
+            "If an official resource does not exist, clearly state this and avoid guessing alternatives.",
+
+            # Scope of recommendations
+            "Provide a small, curated list of resources per topic (ideally 1–3 links).",
+            "Explain briefly what each resource helps the reader learn.",
+
+            # Safety & non-goals
+            "Do not provide step-by-step tutorials that duplicate onboarding instructions.",
+            "Do not recommend tools or services not used in the repository.",
+            "Do not claim endorsement or quality beyond what is widely accepted.",
+
+            # Output format
+            "Organize recommendations by technology or concept.",
+            "Clearly label each recommendation as official documentation, official tutorial, "
+            "or reference material.",
+            "Indicate the intended audience level (beginner, intermediate, advanced) when appropriate.",
+
+            # Human-in-the-loop
+            "Present recommendations for user review.",
+            "Invite the user to approve, remove, or replace suggested resources before they "
+            "are included in documentation or exported.",
+
+            # Lookups
+            "Get links with lookup_learning_resources, passing all confirmed technologies in one call; "
+            "it answers from a bundled index of official documentation and a local cache, "
+            "and searches the web only for the rest.",
+            "Only recommend URLs returned by the tool; never write links from memory.",
+            "Do not introduce new technologies, tools, or assumptions based on search results.",
+            "Prefer official domains and project-owned documentation."
+
+        ],
+        tools=[LearningResourceTools(cache=get_resource_cache(), offline=OFFLINE)]
+    )
+
+
+def make_test_generator_agent():
+    return Agent(
+        id="test_generator_agent",
+        name="Test Case Generator Agent",
+        role="Test case author",
+        description=(
+            "Generates high-level and implementation-ready test cases based on "
+            "confirmed repository understanding, without executing code or assuming "
+            "undocumented behavior."
+        ),
+        model=get_model(),
+        instructions=[
+            # Core responsibility
+            "You are responsible for generating test cases that validate the observable "
+            "functionality and interfaces of the project.",
+
+            # Input constraints
+            "Base all test cases strictly on confirmed outputs from prior agents, "
+            "especially the Code Understanding Agent, Dependency Analysis Agent, "
+            "and Onboarding Agent.",
+            "Do not generate tests for features, APIs, or workflows that are not explicitly confirmed.",
+
+            # Test scope
+            "Generate test cases for publicly exposed interfaces such as:",
+            "- Web APIs (endpoints, request/response behavior)",
+            "- CLI commands and flags",
+            "- Background jobs or workers",
+            "- Libraries or reusable modules (public functions only)",
+            "Do not generate tests for internal helper functions unless they are explicitly exposed.",
+
+            # Test types
+            "Generate appropriate test types based on the project, including:",
+            "- Unit tests for isolated logic",
+            "- Integration tests for API or service interactions",
+            "- Smoke tests for basic startup or execution paths",
+            "Do not generate end-to-end or load tests unless explicitly requested.",
+
+            # Language & framework awareness
+            "Adapt test case structure and examples to the detected language and testing ecosystem "
+            "(e.g., pytest, unittest, Jest, Mocha, JUnit, Go test) only when such tools are "
+            "explicitly present in the repository.",
+            "If no testing framework is detected, generate framework-agnostic test case descriptions.",
+
+            # Assertions & expectations
+            "Define clear test objectives, inputs, and expected outcomes.",
+            "Avoid asserting internal implementation details.",
+            "When expected behavior is unclear, explicitly state assumptions and mark confidence as low.",
+
+            # Safety & non-goals
+            "Do not execute any tests.",
+            "Do not generate mock data that implies real user or production data.",
+            "Do not assume database schemas, external services, or infrastructure details "
+            "unless explicitly visible in the repository.",
+
+            # Human-in-the-loop review
+            "Present test cases for human review before any file generation or export.",
+            "Allow the user to confirm, modify, or reject individual test cases.",
+            "Ask the user whether tests should be generated as documentation only or "
+            "written to test files.",
+
+            # Output format
+            "Present test cases in a structured format including:",
+            "- Test Name",
+            "- Purpose",
+            "- Preconditions",
+            "- Steps",
+            "- Expected Result",
+            "- Confidence (high / medium / low)",
+            "Group test cases by feature or interface."
+        ]
+    )
+
+# -----------------------------
+# Team assembly
+# -----------------------------
+def make_repo_chatbot_team(repo_dir=REPO_DIR, use_router=True):
+    # Every tool of every member is bound to `repo_dir`, so each workspace gets its own team
+    repo_dir = Path(repo_dir)
+    repo_dir.mkdir(parents=True, exist_ok=True)
+    memory_store = get_memory_store()
+    # Shared so both agents reuse the same per-commit summaries
+    summary_tools = SummaryTools(model=get_model(), repo_dir=repo_dir)
+
+    github_loader_agent = make_github_loader_agent(repo_dir)
+    repo_metadata_agent = make_repo_metadata_agent(repo_dir)
+    file_analyzer_agent = make_file_analyzer_agent(repo_dir)
+    dependency_agent = make_dependency_agent(repo_dir)
+    code_quality_agent = make_code_quality_agent(repo_dir)
+    error_doc_agent = make_error_doc_agent(summary_tools, repo_dir)
+    code_understanding_agent = make_code_understanding_agent(summary_tools, repo_dir)
+    onboarding_agent = make_onboarding_agent()
+    compliance_agent = make_compliance_agent(repo_dir)
+    readme_preview_agent = make_readme_preview_agent(repo_dir)
+    learning_agent = make_learning_agent()
+    test_generator_agent = make_test_generator_agent()
+
+    # Result cache for analysis agents
+    for cached_agent in [
         repo_metadata_agent,
         file_analyzer_agent,
         dependency_agent,
-        code_understanding_agent,
-        onboarding_agent,
         code_quality_agent,
         error_doc_agent,
+        code_understanding_agent,
+        onboarding_agent,
         compliance_agent,
-        learning_agent,
         test_generator_agent,
-        readme_preview_agent,
-    ]
-)
+    ]:
+        enable_result_cache(cached_agent, get_result_cache(), repo_dir=repo_dir)
+
+    team = Team(
+        id="repo_chatbot_team",
+        name="Repository Q&A Chatbot",
+        role="Conversational repository assistant",
+        description=(
+            "A conversational agent that answers user questions about a GitHub repository "
+            "by delegating tasks to specialized analysis and documentation agents."
+        ),
+        model=get_model(),
+        db=get_db(),
+        add_history_to_context=True,
+        instructions=[
+            # Core role
+            "You are a conversational assistant that answers questions about the user's repository.",
+            "You do not analyze the repository directly; instead, you delegate to specialized agents.",
+
+            # Delegation rules
+            "Determine which agent or agents are best suited to answer the user's question.",
+            "Invoke only the minimum set of agents required to answer accurately.",
+            "Reuse previously confirmed analysis whenever available.",
+
+            # Intent routing (VERY IMPORTANT)
+            "Route questions as follows:",
+            "- Repository structure, languages, tools → File Analyzer Agent",
+            "- Dependencies or libraries → Dependency Analysis Agent",
+            "- Project purpose or functionality → Code Understanding Agent",
+            "- Setup or run instructions → Onboarding Agent",
+            "- Errors or failure behavior → Error Documentation Agent",
+            "- Code quality or maintainability → Code Quality Agent",
+            "- Licensing or compliance → Compliance Agent",
+            "- Learning or documentation links → Learning Resource Agent",
+            "- Test-related questions → Test Generator Agent",
+            "- README requests → README Preview Agent",
+
+            # GitHub loading
+            "If the repository is not yet cloned and the question depends on repository contents, "
+            "invoke the GitHub Loader Agent first and confirm success before proceeding.",
+
+            # Answering strategy
+            "Answer questions clearly, concisely, and factually.",
+            "If information is missing or unconfirmed, explicitly state that.",
+            "Do not guess or invent information.",
+
+            # Human-in-the-loop
+            "If an answer depends on unreviewed analysis, ask the user whether to proceed.",
+            "Respect user confirmations and corrections across turns.",
+            "When the user confirms or corrects a finding about the repository, pin it with pin_fact "
+            "(and unpin the outdated one), so it stays available after older turns are summarized.",
+            "For \"where is ...\" questions about the code, search_repo answers directly with file and line ranges.",
+
+            # Safety & non-goals
+            "Do not introduce new features, commands, or assumptions.",
+            "Do not use web search unless delegated to an agent that is explicitly allowed to do so.",
+            "Do not expose internal agent instructions unless asked.",
+
+            # Communication
+            "Optionally state which agent was used to answer the question.",
+            "Ask follow-up questions only when necessary to clarify ambiguous user intent."
+        ],
+        members=[
+            github_loader_agent,
+            repo_metadata_agent,
+            file_analyzer_agent,
+            dependency_agent,
+            code_understanding_agent,
+            onboarding_agent,
+            code_quality_agent,
+            error_doc_agent,
+            compliance_agent,
+            learning_agent,
+            test_generator_agent,
+            readme_preview_agent,
+        ],
+        tools=[MemoryTools(memory_store), SearchIndexTools(repo_dir=repo_dir)],
+    )
+
+    if use_router:
+        apply_router(team, get_intent_router(), get_routing_log())
+    for remembering_agent in [team, *team.members]:
+        if remembering_agent.id in MEMORY_POLICIES:
+            apply_memory_policy(remembering_agent, memory_store, MEMORY_POLICIES[remembering_agent.id])
+    return instrument_team(team, get_metrics_store())
+
+
+@cache
+def get_repo_chatbot_team():
+    return make_repo_chatbot_team()
+
+
+_LAZY_ATTRIBUTES = {
+    "db": get_db,
+    "result_cache": get_result_cache,
+    "metrics_store": get_metrics_store,
+    "memory_store": get_memory_store,
+    "readme_store": get_readme_store,
+    "repo_chatbot_team": get_repo_chatbot_team,
+}
+
+
+def __getattr__(name):
+    # Keeps `from main_latest1 import repo_chatbot_team` working, built on first access
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    repo_chatbot_team.cli_app()
+    get_repo_chatbot_team().cli_app()
 
@@ -1,33 +1,78 @@
-from agno.models.groq import Groq
-from agno.db.sqlite import SqliteDb
-from agno.tools.file import FileTools
-from agno.tools.shell import ShellTools
-from agno.tools.python import PythonTools
 from agno.agent import Agent
 from pathlib import Path
 from dotenv import load_dotenv
-import os
+from functools import cache
 from agno.team import Team
+from config import DB_FILE, REPO_DIR
+from repo_index import RepoFileTools, RepoIndexTools
+from repo_loader import GitLoaderTools
+from symbol_index import SymbolIndexTools
+from search_index import SearchIndexTools
+from workspaces import WORKSPACE_QUOTA_BYTES
+from instrumentation import MetricsStore, instrument_team
+from memory_policy import MemoryPolicy, MemoryStore, MemoryTools, apply_memory_policy
+from storage import get_engine, start_maintenance, thread_safe
+from readme_sections import ReadmeStore, ReadmeTools
 
 
 # Load environment variables
 load_dotenv()
 
-# Model
-model = Groq(id="qwen/qwen3-32b")
+# The model client, the database and the teams are created on first use, so
+# importing this module (e.g. on every Streamlit start) stays cheap.
+# Assign `model` before building a team to run it with another model.
+model = None
 
-# Base directories
-BASE_DIR = Path(__file__).parent
-REPO_DIR = BASE_DIR / "repo"
 
-# Create required directories
-REPO_DIR.mkdir(parents=True, exist_ok=True)
+def get_model():
+    global model
+    if model is None:
+        from agno.models.groq import Groq
+
+        model = Groq(id="qwen/qwen3-32b")
+    return model
+
 
 # Database for agent memory
-db = SqliteDb(
-    db_file="memory.db",
-    session_table="session_table"
-)
+@cache
+def get_db():
+    from agno.db.sqlite import SqliteDb
+
+    # WAL, a connection pool, and pruning/compaction once a day (see storage.py)
+    db = SqliteDb(
+        db_engine=get_engine(DB_FILE),
+        session_table="session_table"
+    )
+    start_maintenance(DB_FILE)
+    # Background jobs run several teams on it at once (see jobs.py)
+    return thread_safe(db)
+
+
+# Per-agent latency, token and tool-call records (see instrumentation.py)
+@cache
+def get_metrics_store():
+    return MetricsStore(db_file=DB_FILE)
+
+
+# Conversation memory: the last turns verbatim, older ones in a running summary,
+# plus facts the user confirmed. Token ceilings are per agent.
+@cache
+def get_memory_store():
+    return MemoryStore(db_file=DB_FILE)
+
+
+# README preview sections, so an edit only rewrites the sections it affects
+@cache
+def get_readme_store():
+    return ReadmeStore(db_file=DB_FILE)
+
+
+MEMORY_POLICIES = {
+    "file_analyzer_agent": MemoryPolicy(recent_turns=2, max_history_tokens=2000),
+    "code_understanding_agent": MemoryPolicy(recent_turns=3, max_history_tokens=4000),
+    "readme_preview_agent": MemoryPolicy(recent_turns=2, max_history_tokens=6000, max_turn_tokens=2000),
+    "readme_generation_team": MemoryPolicy(recent_turns=4, max_history_tokens=3000),
+}
 
 # -----------------------------
 # File Manager Agent
@@ -53,186 +98,245 @@ db = SqliteDb(
 # -----------------------------
 # GitHub Loader Agent
 # -----------------------------
-github_loader_agent = Agent(
-    id="github_loader_agent",
-    name="GitHub Loader Agent",
-    role="Repository loader",
-    description="Clones a GitHub repository into the local workspace.",
-    instructions=[
-        "You are responsible for cloning GitHub repositories.",
-        "Use git clone to clone the repository provided as input.",
-        "Clone the repository inside the 'repo' directory.",
-        "Do not modify repository contents after cloning.",
-        "Confirm successful cloning and list the top-level files."
-    ],
-    tools=[
-        ShellTools(),
-        FileTools(base_dir=REPO_DIR)
-    ]
-)
-
-file_analyzer_agent = Agent(
-    id="file_analyzer_agent",
-    name="File Analyzer Agent",
-    role="Repository analyzer",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Analyzes the repository structure to identify project languages, "
-        "frameworks, configuration files, and entry points for both "
-        "JavaScript and Python projects."
-    ),
-    model=model,
-    instructions=[
-        "You are an expert repository analysis agent.",
-        "Analyze the directory structure of the cloned repository.",
+def make_github_loader_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="github_loader_agent",
+        name="GitHub Loader Agent",
+        role="Repository loader",
+        description="Clones a GitHub repository into the local workspace.",
+        instructions=[
+            "You are responsible for cloning GitHub repositories.",
+            "Use the clone_repository tool to clone the repository provided as input; do not run git yourself.",
+            "clone_repository makes a shallow, blob-filtered clone inside the 'repo' directory and indexes it.",
+            "Pass sparse_paths only when the user asks about specific directories of a large repository.",
+            "If an agent later needs paths outside a sparse checkout, use expand_checkout.",
+            "Do not modify repository contents after cloning.",
+            "Confirm successful cloning, report clone time and bytes transferred, and list the top-level files."
+        ],
+        tools=[
+            GitLoaderTools(repo_dir=repo_dir, max_bytes=WORKSPACE_QUOTA_BYTES),
+            RepoFileTools(base_dir=repo_dir)
+        ]
+    )
+
+def make_file_analyzer_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="file_analyzer_agent",
+        name="File Analyzer Agent",
+        role="Repository analyzer",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Analyzes the repository structure to identify project languages, "
+            "frameworks, configuration files, and entry points for both "
+            "JavaScript and Python projects."
+        ),
+        model=get_model(),
+        instructions=[
+            "You are an expert repository analysis agent.",
+            "Analyze the directory structure of the cloned repository.",
+            "Start from get_repo_overview and find_files; only list directories when the index is missing.",
         
-        # Language detection
-        "Identify the primary programming languages used (JavaScript, TypeScript, Python, or others).",
+            # Language detection
+            "Identify the primary programming languages used (JavaScript, TypeScript, Python, or others).",
         
-        # JavaScript-specific detection
-        "For JavaScript or TypeScript projects, detect frameworks and runtimes using indicators such as "
-        "package.json, node_modules, src/, pages/, app/, and common entry files like index.js, app.js, or server.js.",
+            # JavaScript-specific detection
+            "For JavaScript or TypeScript projects, detect frameworks and runtimes using indicators such as "
+            "package.json, node_modules, src/, pages/, app/, and common entry files like index.js, app.js, or server.js.",
         
-        # Python-specific detection
-        "For Python projects, detect frameworks and runtimes using indicators such as "
-        "requirements.txt, pyproject.toml, setup.py, Pipfile, and common entry files like main.py, app.py, or manage.py.",
+            # Python-specific detection
+            "For Python projects, detect frameworks and runtimes using indicators such as "
+            "requirements.txt, pyproject.toml, setup.py, Pipfile, and common entry files like main.py, app.py, or manage.py.",
         
-        # Config & entry files
-        "Locate and list important configuration files relevant to the detected languages.",
-        "Identify application entry points based strictly on file presence and naming conventions.",
+            # Config & entry files
+            "Locate and list important configuration files relevant to the detected languages.",
+            "Identify application entry points based strictly on file presence and naming conventions.",
         
-        # Safety & correctness
-        "Do not assume application behavior beyond what is explicitly visible in the repository.",
-        "If multiple languages or entry points are detected, clearly report them.",
+            # Safety & correctness
+            "Do not assume application behavior beyond what is explicitly visible in the repository.",
+            "If multiple languages or entry points are detected, clearly report them.",
         
-        # Output & review
-        "Present the analysis in a clear, structured, and human-readable summary.",
-        "Explicitly ask the user to review and confirm or correct the analysis before any README generation proceeds."
-    ],
-    tools=[
-        FileTools(base_dir=REPO_DIR)
-    ]
-)
-
-code_agent = Agent(
-    id="code_understanding_agent",
-    name="Code Understanding Agent",
-    role="Code comprehension specialist",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Understands the purpose, core functionality, and exposed interfaces "
-        "of the project by analyzing source code for JavaScript and Python repositories."
-    ),
-    model=model,
-    instructions=[
-        "You are an expert code comprehension agent.",
-        "Analyze source code files to understand what the project does at a high level.",
+            # Output & review
+            "Present the analysis in a clear, structured, and human-readable summary.",
+            "Explicitly ask the user to review and confirm or correct the analysis before any README generation proceeds."
+        ],
+        tools=[
+            RepoFileTools(base_dir=repo_dir),
+            RepoIndexTools(repo_dir=repo_dir)
+        ]
+    )
+
+def make_code_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="code_understanding_agent",
+        name="Code Understanding Agent",
+        role="Code comprehension specialist",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Understands the purpose, core functionality, and exposed interfaces "
+            "of the project by analyzing source code for JavaScript and Python repositories."
+        ),
+        model=get_model(),
+        instructions=[
+            "You are an expert code comprehension agent.",
+            "Analyze source code files to understand what the project does at a high level.",
+            "Use get_repo_overview for languages and entry files, and find_files to locate source files.",
+            "Use get_interface_summary for routes, __main__ blocks, CLI commands and environment variables, "
+            "and query_symbols to look up functions or classes; cite the file:line locations they return.",
+            "Use search_repo to find where a feature or concept is implemented, e.g. \"retry logic\".",
         
-        # Scope
-        "Focus on publicly exposed functionality such as APIs, CLI commands, background jobs, or libraries.",
-        "Identify core features strictly based on code structure, function names, routes, and imports.",
+            # Scope
+            "Focus on publicly exposed functionality such as APIs, CLI commands, background jobs, or libraries.",
+            "Identify core features strictly based on code structure, function names, routes, and imports.",
         
-        # JavaScript-specific
-        "For JavaScript or TypeScript code, identify API routes, middleware, CLI entry points, and environment variables using patterns like process.env.",
+            # JavaScript-specific
+            "For JavaScript or TypeScript code, identify API routes, middleware, CLI entry points, and environment variables using patterns like process.env.",
         
-        # Python-specific
-        "For Python code, identify API routes, CLI entry points, and environment variables using patterns like os.environ or settings files.",
+            # Python-specific
+            "For Python code, identify API routes, CLI entry points, and environment variables using patterns like os.environ or settings files.",
         
-        # Safety
-        "Do not execute any code or infer runtime behavior.",
-        "Do not assume business logic beyond what is explicitly present in the code.",
+            # Safety
+            "Do not execute any code or infer runtime behavior.",
+            "Do not assume business logic beyond what is explicitly present in the code.",
         
-        # Output
-        "Summarize findings in a clear, structured, and concise format suitable for README documentation.",
-        "Explicitly ask the user to review and confirm the understanding before README generation continues."
-    ],
-    tools=[
-        FileTools(base_dir=REPO_DIR)
-    ]
-)
-
-readme_preview_agent = Agent(
-    id="readme_preview_agent",
-    name="README Preview Agent",
-    role="Documentation writer",
-    db=db,
-    add_history_to_context=True,
-    description=(
-        "Generates a README.md preview for user review without writing it to disk."
-    ),
-    model=model,
-    instructions=[
-        "You are an expert technical documentation writer.",
-        "Generate a complete README.md using GitHub-flavored Markdown.",
-        "Use only information that has been reviewed and confirmed by the user.",
-        "Do not invent or assume features, APIs, commands, or configurations.",
+            # Output
+            "Summarize findings in a clear, structured, and concise format suitable for README documentation.",
+            "Explicitly ask the user to review and confirm the understanding before README generation continues."
+        ],
+        tools=[
+            RepoFileTools(base_dir=repo_dir),
+            RepoIndexTools(repo_dir=repo_dir),
+            SymbolIndexTools(repo_dir=repo_dir),
+            SearchIndexTools(repo_dir=repo_dir)
+        ]
+    )
+
+def make_readme_preview_agent(repo_dir=REPO_DIR):
+    return Agent(
+        id="readme_preview_agent",
+        name="README Preview Agent",
+        role="Documentation writer",
+        db=get_db(),
+        add_history_to_context=True,
+        description=(
+            "Generates a README.md preview for user review without writing it to disk."
+        ),
+        model=get_model(),
+        tools=[ReadmeTools(model=get_model(), repo_dir=repo_dir, memory_store=get_memory_store(), store=get_readme_store())],
+        instructions=[
+            "You are an expert technical documentation writer.",
+            "Generate the README.md preview with render_readme; it writes each section from the confirmed "
+            "analysis and reuses the sections whose inputs did not change. Do not write the README yourself.",
+            "Use only information that has been reviewed and confirmed by the user.",
+            "Do not invent or assume features, APIs, commands, or configurations.",
         
-        "Include standard sections such as Project Overview, Features, Tech Stack, Installation, Usage, and Configuration.",
-        "Adapt instructions based on the detected language (JavaScript or Python).",
+            "When the user asks to change part of the README, call edit_readme_section for each affected section.",
+            "Adapt instructions based on the detected language (JavaScript or Python).",
         
-        "Use clear headings, bullet points, fenced code blocks, and minimal emojis.",
-        "DO NOT save the README.md to disk.",
-        "Present the README content clearly and ask the user to approve or request changes."
-    ]
-)
-
-readme_generation_team = Team(
-    id="readme_generation_team",
-    name="README Generation Team",
-    role="Orchestration agent",
-    description=(
-        "An orchestration agent that coordinates multiple specialized agents "
-        "to analyze a GitHub repository, answer repository-related questions, "
-        "and generate an accurate README.md."
-    ),
-    model=model,
-    db=db,
-    add_history_to_context=True,
-    instructions=[
-        # Core orchestration role
-        "You are the primary orchestration agent.",
-        "You decide which agent to invoke based on the user's request.",
-        "Do not blindly follow the README generation flow if the user asks a direct question.",
-
-        # Repo loading
-        "If the repository is not yet cloned and the user's request depends on repository contents, "
-        "first invoke the GitHub Loader Agent and confirm successful cloning.",
-
-        # Repo Q&A handling
-        "If the user asks any question related to the repository, "
-        "such as project purpose, architecture, languages used, entry points, APIs, configuration, "
-        "setup steps, or usage, answer the question directly.",
-        "Use the File Analyzer Agent or Code Understanding Agent as needed to gather accurate information.",
-        "Base answers strictly on the repository contents and previously confirmed analysis.",
-        "If the answer is unclear or not present in the repository, explicitly state that.",
-
-        # README flow (only when relevant)
-        "Proceed with README generation only when the user explicitly asks to generate or update the README.",
-        "Follow the approved multi-step flow for README generation when applicable.",
-
-        # Review & approval gates
-        "Respect user confirmations and corrections at every step.",
-        "Do not regenerate analysis or README unless the user requests it.",
-
-        # Safety & correctness
-        "Never hallucinate features, commands, or behavior.",
-        "Do not assume intent; clarify if the user's request is ambiguous.",
-
-        # Communication
-        "Clearly state which agent is being used to answer the question when appropriate.",
-        "Keep answers concise, technical, and easy to understand."
-    ],
-    members=[
-        github_loader_agent,
-        file_analyzer_agent,
-        code_agent,
-        readme_preview_agent,
-    ]
-)
+            "Use clear headings, bullet points, fenced code blocks, and minimal emojis.",
+            "DO NOT save the README.md to disk.",
+            "Present the README content clearly and ask the user to approve or request changes."
+        ]
+    )
+
+# -----------------------------
+# Team assembly
+# -----------------------------
+def make_readme_generation_team(repo_dir=REPO_DIR):
+    # Every tool of every member is bound to `repo_dir`, so each workspace gets its own team
+    repo_dir = Path(repo_dir)
+    repo_dir.mkdir(parents=True, exist_ok=True)
+    memory_store = get_memory_store()
+    github_loader_agent = make_github_loader_agent(repo_dir)
+    file_analyzer_agent = make_file_analyzer_agent(repo_dir)
+    code_agent = make_code_agent(repo_dir)
+    readme_preview_agent = make_readme_preview_agent(repo_dir)
+
+    team = Team(
+        id="readme_generation_team",
+        name="README Generation Team",
+        role="Orchestration agent",
+        description=(
+            "An orchestration agent that coordinates multiple specialized agents "
+            "to analyze a GitHub repository, answer repository-related questions, "
+            "and generate an accurate README.md."
+        ),
+        model=get_model(),
+        db=get_db(),
+        add_history_to_context=True,
+        instructions=[
+            # Core orchestration role
+            "You are the primary orchestration agent.",
+            "You decide which agent to invoke based on the user's request.",
+            "Do not blindly follow the README generation flow if the user asks a direct question.",
+
+            # Repo loading
+            "If the repository is not yet cloned and the user's request depends on repository contents, "
+            "first invoke the GitHub Loader Agent and confirm successful cloning.",
+
+            # Repo Q&A handling
+            "If the user asks any question related to the repository, "
+            "such as project purpose, architecture, languages used, entry points, APIs, configuration, "
+            "setup steps, or usage, answer the question directly.",
+            "Use the File Analyzer Agent or Code Understanding Agent as needed to gather accurate information.",
+            "Base answers strictly on the repository contents and previously confirmed analysis.",
+            "If the answer is unclear or not present in the repository, explicitly state that.",
+
+            # README flow (only when relevant)
+            "Proceed with README generation only when the user explicitly asks to generate or update the README.",
+            "Follow the approved multi-step flow for README generation when applicable.",
+
+            # Review & approval gates
+            "Respect user confirmations and corrections at every step.",
+            "When the user confirms or corrects a finding about the repository, pin it with pin_fact "
+            "(and unpin the outdated one), so it stays available after older turns are summarized.",
+            "Do not regenerate analysis or README unless the user requests it.",
+
+            # Safety & correctness
+            "Never hallucinate features, commands, or behavior.",
+            "Do not assume intent; clarify if the user's request is ambiguous.",
+
+            # Communication
+            "Clearly state which agent is being used to answer the question when appropriate.",
+            "Keep answers concise, technical, and easy to understand."
+        ],
+        members=[
+            github_loader_agent,
+            file_analyzer_agent,
+            code_agent,
+            readme_preview_agent,
+        ],
+        tools=[MemoryTools(memory_store)],
+    )
+
+    for remembering_agent in [team, *team.members]:
+        if remembering_agent.id in MEMORY_POLICIES:
+            apply_memory_policy(remembering_agent, memory_store, MEMORY_POLICIES[remembering_agent.id])
+    return instrument_team(team, get_metrics_store())
+
+
+@cache
+def get_readme_generation_team():
+    return make_readme_generation_team()
+
+
+_LAZY_ATTRIBUTES = {
+    "db": get_db,
+    "metrics_store": get_metrics_store,
+    "memory_store": get_memory_store,
+    "readme_store": get_readme_store,
+    "readme_generation_team": get_readme_generation_team,
+}
+
+
+def __getattr__(name):
+    # Keeps `from main_original import readme_generation_team` working, built on first access
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    readme_generation_team.cli_app()
+    get_readme_generation_team().cli_app()
 
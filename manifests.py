@@ -0,0 +1,391 @@
+import ast
+import configparser
+import json
+import re
+import tomllib
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from agno.tools import Toolkit
+
+from config import REPO_DIR
+from repo_index import find_checkout, load_index
+
+
+@dataclass
+class Dependency:
+    ecosystem: str
+    manifest: str
+    name: str
+    version: str = ""
+    scope: str = "runtime"
+
+
+# -----------------------------
+# Python
+# -----------------------------
+REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$")
+
+
+def _requirement(spec, manifest, scope="runtime"):
+    spec = spec.split("#", 1)[0].strip()
+    if not spec or spec.startswith(("-", "git+", "http:", "https:", "file:")):
+        return None
+    match = REQUIREMENT.match(spec)
+    if not match:
+        return None
+    name, _, version = match.groups()
+    version = version.split(";", 1)[0].strip().lstrip("(").rstrip(")").strip()
+    return Dependency("python", manifest, name, version, scope)
+
+
+def parse_requirements(text, manifest):
+    scope = "dev" if re.search(r"(dev|test|lint|doc)", Path(manifest).name, re.I) else "runtime"
+    deps = [_requirement(line, manifest, scope) for line in text.splitlines()]
+    return [d for d in deps if d]
+
+
+def _poetry_version(value):
+    if isinstance(value, dict):
+        return value.get("version", "")
+    return "" if value == "*" else str(value)
+
+
+def parse_pyproject(text, manifest):
+    data = tomllib.loads(text)
+    deps = []
+    project = data.get("project", {})
+    for spec in project.get("dependencies", []):
+        deps.append(_requirement(spec, manifest))
+    for extra, specs in project.get("optional-dependencies", {}).items():
+        deps += [_requirement(spec, manifest, f"optional:{extra}") for spec in specs]
+    for group, specs in data.get("dependency-groups", {}).items():
+        deps += [_requirement(spec, manifest, group) for spec in specs if isinstance(spec, str)]
+
+    poetry = data.get("tool", {}).get("poetry", {})
+    poetry_groups = [("runtime", poetry.get("dependencies", {})), ("dev", poetry.get("dev-dependencies", {}))]
+    poetry_groups += [(name, group.get("dependencies", {})) for name, group in poetry.get("group", {}).items()]
+    for scope, table in poetry_groups:
+        for name, value in table.items():
+            if name.lower() != "python":
+                deps.append(Dependency("python", manifest, name, _poetry_version(value), scope))
+    return [d for d in deps if d]
+
+
+def parse_setup_py(text, manifest):
+    deps = []
+    for node in ast.walk(ast.parse(text)):
+        if not isinstance(node, ast.Call):
+            continue
+        for keyword in node.keywords:
+            if keyword.arg == "install_requires" and isinstance(keyword.value, (ast.List, ast.Tuple)):
+                specs = [e.value for e in keyword.value.elts if isinstance(e, ast.Constant)]
+                deps += [_requirement(spec, manifest) for spec in specs]
+            elif keyword.arg == "extras_require" and isinstance(keyword.value, ast.Dict):
+                for key, value in zip(keyword.value.keys, keyword.value.values):
+                    if isinstance(key, ast.Constant) and isinstance(value, (ast.List, ast.Tuple)):
+                        specs = [e.value for e in value.elts if isinstance(e, ast.Constant)]
+                        deps += [_requirement(spec, manifest, f"optional:{key.value}") for spec in specs]
+    return [d for d in deps if d]
+
+
+def parse_setup_cfg(text, manifest):
+    parser = configparser.ConfigParser()
+    parser.read_string(text)
+    deps = []
+    if parser.has_option("options", "install_requires"):
+        deps += parse_requirements(parser.get("options", "install_requires"), manifest)
+    if parser.has_section("options.extras_require"):
+        for extra, specs in parser.items("options.extras_require"):
+            deps += [_requirement(spec, manifest, f"optional:{extra}") for spec in specs.splitlines()]
+    return [d for d in deps if d]
+
+
+def parse_pipfile(text, manifest):
+    data = tomllib.loads(text)
+    deps = []
+    for section, scope in (("packages", "runtime"), ("dev-packages", "dev")):
+        for name, value in data.get(section, {}).items():
+            deps.append(Dependency("python", manifest, name, _poetry_version(value), scope))
+    return deps
+
+
+# -----------------------------
+# JavaScript / PHP
+# -----------------------------
+def parse_package_json(text, manifest):
+    data = json.loads(text)
+    sections = {
+        "dependencies": "runtime",
+        "devDependencies": "dev",
+        "peerDependencies": "peer",
+        "optionalDependencies": "optional",
+    }
+    return [
+        Dependency("javascript", manifest, name, str(version), scope)
+        for section, scope in sections.items()
+        for name, version in data.get(section, {}).items()
+    ]
+
+
+def parse_composer_json(text, manifest):
+    data = json.loads(text)
+    deps = []
+    for section, scope in (("require", "runtime"), ("require-dev", "dev")):
+        for name, version in data.get(section, {}).items():
+            # Platform requirements (php itself and extensions) are not packages
+            if name == "php" or name.startswith("ext-"):
+                continue
+            deps.append(Dependency("php", manifest, name, str(version), scope))
+    return deps
+
+
+# -----------------------------
+# JVM / .NET
+# -----------------------------
+def _strip_namespaces(root):
+    for element in root.iter():
+        if isinstance(element.tag, str) and "}" in element.tag:
+            element.tag = element.tag.split("}", 1)[1]
+    return root
+
+
+def parse_pom_xml(text, manifest):
+    root = _strip_namespaces(ET.fromstring(text))
+    properties = {}
+    props = root.find("properties")
+    if props is not None:
+        properties = {child.tag: (child.text or "").strip() for child in props}
+    project_version = root.findtext("version", "")
+    properties.setdefault("project.version", project_version)
+
+    def resolve(value):
+        return re.sub(r"\$\{([^}]+)\}", lambda m: properties.get(m.group(1), m.group(0)), value or "")
+
+    deps = []
+    # Only the project's own <dependencies>, not <dependencyManagement> or plugins
+    section = root.find("dependencies")
+    for dependency in section if section is not None else []:
+        group = dependency.findtext("groupId", "")
+        artifact = dependency.findtext("artifactId", "")
+        deps.append(Dependency(
+            "java",
+            manifest,
+            f"{group}:{artifact}",
+            resolve(dependency.findtext("version", "")).strip(),
+            dependency.findtext("scope", "compile").strip(),
+        ))
+    return deps
+
+
+GRADLE_DEPENDENCY = re.compile(
+    r"""\b(implementation|api|compileOnly|runtimeOnly|testImplementation|testRuntimeOnly|"""
+    r"""testCompileOnly|annotationProcessor|kapt|ksp|compile|testCompile)\s*\(?\s*["']([^"':]+):([^"':]+)(?::([^"']+))?["']"""
+)
+
+
+def parse_gradle(text, manifest):
+    return [
+        Dependency("java", manifest, f"{group}:{name}", version or "", configuration)
+        for configuration, group, name, version in GRADLE_DEPENDENCY.findall(text)
+    ]
+
+
+def parse_csproj(text, manifest):
+    root = _strip_namespaces(ET.fromstring(text))
+    deps = []
+    for reference in root.iter("PackageReference"):
+        name = reference.get("Include") or reference.get("Update")
+        version = reference.get("Version") or reference.findtext("Version", "")
+        if name:
+            deps.append(Dependency("dotnet", manifest, name, version.strip()))
+    return deps
+
+
+def parse_packages_config(text, manifest):
+    root = ET.fromstring(text)
+    return [
+        Dependency(
+            "dotnet",
+            manifest,
+            package.get("id"),
+            package.get("version", ""),
+            "dev" if package.get("developmentDependency") == "true" else "runtime",
+        )
+        for package in root.iter("package")
+        if package.get("id")
+    ]
+
+
+# -----------------------------
+# Go / Rust / Ruby
+# -----------------------------
+def parse_go_mod(text, manifest):
+    deps = []
+    in_block = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("require ("):
+            in_block = True
+            continue
+        if in_block and line == ")":
+            in_block = False
+            continue
+        if line.startswith("require "):
+            line = line[len("require "):]
+        elif not in_block:
+            continue
+        # Indirect requirements are transitive dependencies recorded by go mod tidy
+        if "// indirect" in line:
+            continue
+        parts = line.split("//", 1)[0].split()
+        if len(parts) >= 2:
+            deps.append(Dependency("go", manifest, parts[0], parts[1]))
+    return deps
+
+
+def parse_cargo_toml(text, manifest):
+    data = tomllib.loads(text)
+    deps = []
+    sections = {"dependencies": "runtime", "dev-dependencies": "dev", "build-dependencies": "build"}
+    tables = [(scope, data.get(section, {})) for section, scope in sections.items()]
+    for target in data.get("target", {}).values():
+        tables += [(scope, target.get(section, {})) for section, scope in sections.items()]
+    for scope, table in tables:
+        for name, value in table.items():
+            if isinstance(value, dict):
+                version = value.get("version", "git" if "git" in value else "path" if "path" in value else "")
+            else:
+                version = str(value)
+            deps.append(Dependency("rust", manifest, name, version, scope))
+    return deps
+
+
+GEM = re.compile(r"""^\s*gem\s+["']([^"']+)["']((?:\s*,\s*["'][^"']*["'])*)""")
+GEM_GROUP = re.compile(r"^\s*group\s+(.+?)\s+do\b")
+# Anything closed by its own `end`: keyword blocks at the start of a line and `do` blocks
+RUBY_BLOCK = re.compile(r"^\s*(?:if|unless|case|while|until|for|begin|def|class|module)\b|\bdo\s*(?:\|[^|]*\|)?\s*(?:#.*)?$")
+RUBY_END = re.compile(r"^\s*end\b")
+
+
+def parse_gemfile(text, manifest):
+    deps = []
+    # One entry per open block: the group it opens, or None for `if`, `platforms ... do` and the like
+    blocks = []
+    for line in text.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        if RUBY_END.match(line):
+            if blocks:
+                blocks.pop()
+            continue
+        group = GEM_GROUP.match(line)
+        if group:
+            blocks.append(",".join(re.findall(r":(\w+)", group.group(1))) or "group")
+            continue
+        if RUBY_BLOCK.search(line) and not re.search(r"\bend\s*(?:#.*)?$", line):
+            blocks.append(None)
+            continue
+        gem = GEM.match(line)
+        if gem:
+            groups = [name for name in blocks if name]
+            versions = re.findall(r"""["']([^"']*)["']""", gem.group(2))
+            deps.append(Dependency("ruby", manifest, gem.group(1), ", ".join(versions), groups[-1] if groups else "runtime"))
+    return deps
+
+
+# -----------------------------
+# Dispatch
+# -----------------------------
+PARSERS = {
+    "pyproject.toml": parse_pyproject,
+    "setup.py": parse_setup_py,
+    "setup.cfg": parse_setup_cfg,
+    "Pipfile": parse_pipfile,
+    "package.json": parse_package_json,
+    "composer.json": parse_composer_json,
+    "pom.xml": parse_pom_xml,
+    "build.gradle": parse_gradle,
+    "build.gradle.kts": parse_gradle,
+    "packages.config": parse_packages_config,
+    "go.mod": parse_go_mod,
+    "Cargo.toml": parse_cargo_toml,
+    "Gemfile": parse_gemfile,
+}
+
+
+def parser_for(path):
+    name = Path(path).name
+    if name in PARSERS:
+        return PARSERS[name]
+    if name.endswith((".csproj", ".fsproj", ".vbproj")):
+        return parse_csproj
+    if name.startswith("requirements") and name.endswith((".txt", ".in")):
+        return parse_requirements
+    return None
+
+
+def collect_dependencies(checkout):
+    """Parse every known manifest in `checkout`; returns (dependencies, errors)."""
+    checkout = Path(checkout)
+    deps, errors = [], []
+    for path, _ in load_index(checkout)["files"]:
+        parser = parser_for(path)
+        if parser is None:
+            continue
+        try:
+            deps += parser((checkout / path).read_text(encoding="utf-8"), path)
+        # A manifest of an unexpected shape (a list where a table was expected, ...) fails parsing
+        # with AttributeError or TypeError; that is reported for the manifest like any other error
+        except (OSError, UnicodeDecodeError, ValueError, SyntaxError, AttributeError, TypeError, KeyError,
+                ET.ParseError, tomllib.TOMLDecodeError) as e:
+            errors.append({"manifest": path, "error": str(e)})
+    return deps, errors
+
+
+def format_table(deps):
+    lines = ["| Ecosystem | Manifest | Dependency | Version | Scope |", "|---|---|---|---|---|"]
+    for d in deps:
+        lines.append(f"| {d.ecosystem} | {d.manifest} | {d.name} | {d.version or '-'} | {d.scope} |")
+    return "\n".join(lines)
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class DependencyManifestTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        super().__init__(
+            name="dependency_manifest_tools",
+            tools=[self.list_declared_dependencies],
+            **kwargs,
+        )
+
+    def list_declared_dependencies(self, output_format: str = "table") -> str:
+        """List the direct dependencies declared in every dependency manifest of the
+        cloned repository (pyproject.toml, requirements*.txt, setup.py, setup.cfg, Pipfile,
+        package.json, composer.json, pom.xml, build.gradle, *.csproj, packages.config,
+        go.mod, Cargo.toml, Gemfile), parsed deterministically.
+
+        Args:
+            output_format (str): "table" for a Markdown table or "json".
+
+        Returns:
+            str: The dependencies with ecosystem, manifest, version constraint and scope,
+                followed by any manifests that could not be parsed.
+        """
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return "No cloned repository found."
+        deps, errors = collect_dependencies(checkout)
+        if output_format == "json":
+            return json.dumps({"dependencies": [asdict(d) for d in deps], "errors": errors}, indent=2)
+        if not deps and not errors:
+            return "No dependency manifests found."
+        result = format_table(deps)
+        if errors:
+            result += "\n\nManifests that could not be parsed:\n"
+            result += "\n".join(f"- {e['manifest']}: {e['error']}" for e in errors)
+        return result
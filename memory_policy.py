@@ -0,0 +1,410 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agno.agent import Agent
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunContext
+from agno.run.team import TeamRunOutput
+from agno.tools import Toolkit
+
+from config import DB_FILE
+from storage import connect
+
+
+CHARS_PER_TOKEN = 4
+
+SUMMARY_INSTRUCTIONS = [
+    "You maintain a running summary of a conversation about a code repository.",
+    "Merge the new turns into the existing summary. Keep decisions, confirmed findings, "
+    "open questions and anything the user asked to change; drop pleasantries and repetition.",
+    "Answer with the updated summary only, in at most {words} words.",
+]
+
+
+@dataclass
+class MemoryPolicy:
+    # Turns replayed word for word; older ones only survive in the running summary
+    recent_turns: int = 3
+    # Ceiling for everything added to a run from memory: pinned facts, summary and turns.
+    # Pins are filled in first and are only cut when they alone exceed it
+    max_history_tokens: int = 3000
+    max_summary_tokens: int = 400
+    # Long answers are cut to this when replayed, the full text stays in the agent's session
+    max_turn_tokens: int = 800
+
+
+# -----------------------------
+# Memory store
+# -----------------------------
+class MemoryStore:
+    """Turns, running summaries and pinned facts per (session, agent), stored in SQLite."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memory_turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_turns_owner ON memory_turns (session_id, agent_id, id)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memory_summaries (
+                    session_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    -- id of the last turn folded into the summary
+                    through_turn INTEGER NOT NULL,
+                    PRIMARY KEY (session_id, agent_id)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memory_pins (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    fact TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (session_id, fact)
+                )
+                """
+            )
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def add_turn(self, session_id, agent_id, request, answer):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO memory_turns (session_id, agent_id, request, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, agent_id, request, answer, time.time()),
+            )
+
+    def summary(self, session_id, agent_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary, through_turn FROM memory_summaries WHERE session_id = ? AND agent_id = ?",
+                (session_id, agent_id),
+            ).fetchone()
+        return row if row else ("", 0)
+
+    def set_summary(self, session_id, agent_id, summary, through_turn):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO memory_summaries (session_id, agent_id, summary, through_turn) VALUES (?, ?, ?, ?)",
+                (session_id, agent_id, summary, through_turn),
+            )
+
+    def turns_after(self, session_id, agent_id, turn_id):
+        """Turns not folded into the summary yet, oldest first, as (id, request, answer)."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "SELECT id, request, answer FROM memory_turns WHERE session_id = ? AND agent_id = ? AND id > ? ORDER BY id",
+                (session_id, agent_id, turn_id),
+            ).fetchall()
+
+    def latest_answers(self, session_id, agent_ids, limit=3):
+        """Newest answers per agent in the session, as {agent_id: [(created_at, request, answer), ...]}."""
+        found = {}
+        with self._lock, self._connect() as conn:
+            for agent_id in agent_ids:
+                rows = conn.execute(
+                    "SELECT created_at, request, answer FROM memory_turns WHERE session_id = ? AND agent_id = ? "
+                    "ORDER BY id DESC LIMIT ?",
+                    (session_id, agent_id, limit),
+                ).fetchall()
+                if rows:
+                    found[agent_id] = rows
+        return found
+
+    def pin(self, session_id, fact):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO memory_pins (session_id, fact, created_at) VALUES (?, ?, ?)",
+                (session_id, fact.strip(), time.time()),
+            )
+
+    def unpin(self, session_id, pin_id):
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM memory_pins WHERE session_id = ? AND id = ?", (session_id, pin_id)
+            ).rowcount
+
+    def pins(self, session_id):
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "SELECT id, fact FROM memory_pins WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+
+
+# -----------------------------
+# Compaction
+# -----------------------------
+CLIPPED = " [...]"
+
+
+def _clip_chars(text, limit):
+    # The marker counts towards the limit, so a clipped text never exceeds it
+    if len(text) <= limit:
+        return text
+    return text[:limit - len(CLIPPED)] + CLIPPED if limit > len(CLIPPED) else ""
+
+
+def _clip(text, max_tokens):
+    return _clip_chars(text, max_tokens * CHARS_PER_TOKEN)
+
+
+def model_compactor(model, max_words):
+    def compact(summary, turns):
+        # A fresh agent per call, like the repository summarizer
+        agent = Agent(
+            model=model,
+            instructions=[line.format(words=max_words) for line in SUMMARY_INSTRUCTIONS],
+            telemetry=False,
+        )
+        body = "\n\n".join(f"User: {request}\nAssistant: {answer}" for request, answer in turns)
+        output = agent.run(f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{body}")
+        return output.content if isinstance(output.content, str) else str(output.content)
+
+    return compact
+
+
+def extractive_compactor(summary, turns):
+    """Model-free fallback: keep the first line of every request and answer."""
+    lines = [summary] if summary else []
+    for request, answer in turns:
+        first = (answer.strip().splitlines() or [""])[0]
+        lines.append(f"- {request.strip().splitlines()[0] if request.strip() else ''} -> {first}")
+    return "\n".join(lines)
+
+
+NOTED = "Noted."
+
+
+def build_context(store, policy, session_id, agent_id):
+    """Messages to put in front of a request: pinned facts, running summary, recent turns.
+
+    Everything together stays within policy.max_history_tokens. Pinned facts
+    are filled in first and only cut when they alone exceed it; the summary
+    gets what is left (at most max_summary_tokens); turns are then added
+    newest first while they fit, and put back in chronological order.
+    """
+    # Counted in characters, so rounding per part cannot add up past the ceiling
+    budget = policy.max_history_tokens * CHARS_PER_TOKEN
+    pins = store.pins(session_id)
+    summary, through_turn = store.summary(session_id, agent_id)
+    turns = store.turns_after(session_id, agent_id, through_turn)
+
+    sections = []
+    if pins:
+        facts = "Confirmed facts (pinned by the user):\n" + "\n".join(f"- {fact}" for _, fact in pins)
+        sections.append(_clip_chars(facts, budget - len(NOTED)))
+    if summary:
+        # Room left after the pins, the blank line between the sections and the "Noted." reply
+        room = budget - len(sections[0]) - 2 if sections else budget
+        summary = _clip_chars(
+            "Summary of the earlier conversation:\n" + _clip(summary, policy.max_summary_tokens), room - len(NOTED)
+        )
+        if summary:
+            sections.append(summary)
+    preamble = "\n\n".join(section for section in sections if section)
+    if preamble:
+        budget -= len(preamble) + len(NOTED)
+
+    replayed = []
+    for _, request, answer in reversed(turns[-policy.recent_turns:] if policy.recent_turns else []):
+        answer = _clip(answer, policy.max_turn_tokens)
+        cost = len(request) + len(answer)
+        if cost > budget:
+            break
+        budget -= cost
+        replayed.append((request, answer))
+
+    messages = []
+    if preamble:
+        messages.append(Message(role="user", content=preamble, from_history=True))
+        messages.append(Message(role="assistant", content=NOTED, from_history=True))
+    for request, answer in reversed(replayed):
+        messages.append(Message(role="user", content=request, from_history=True))
+        messages.append(Message(role="assistant", content=answer, from_history=True))
+    return messages
+
+
+# -----------------------------
+# Agent wiring
+# -----------------------------
+# Summaries are folded in after the answer has been returned, one at a time
+_compaction_pool = ThreadPoolExecutor(max_workers=1)
+
+
+def _request_text(input):
+    if isinstance(input, Message):
+        input = input.content
+    return input if isinstance(input, str) else None
+
+
+def apply_memory_policy(agent, store, policy=None, compact=None):
+    """Replace agno's history replay for `agent` (or a team) with the bounded policy.
+
+    `compact(summary, turns)` folds turns into the running summary; it defaults to
+    a model call with the agent's own model.
+    """
+    policy = policy or MemoryPolicy()
+    compact = compact or model_compactor(agent.model, max_words=int(policy.max_summary_tokens * 0.75))
+    # The context built here takes the place of the full transcript agno would replay
+    agent.add_history_to_context = False
+    base_input = agent.additional_input
+    original_run = agent.run
+    original_arun = agent.arun
+    final_types = (RunOutput, TeamRunOutput)
+    lock = threading.Lock()
+
+    def fold(session_id):
+        # Everything older than the last `recent_turns` turns goes into the summary
+        with lock:
+            summary, through_turn = store.summary(session_id, agent.id)
+            turns = store.turns_after(session_id, agent.id, through_turn)
+            overflow = turns[:-policy.recent_turns] if policy.recent_turns else turns
+            if not overflow:
+                return
+            try:
+                summary = compact(summary, [(request, answer) for _, request, answer in overflow])
+            except Exception:
+                summary = extractive_compactor(summary, [(request, answer) for _, request, answer in overflow])
+            store.set_summary(session_id, agent.id, _clip(summary, policy.max_summary_tokens), overflow[-1][0])
+
+    def remember(session_id, request, content):
+        if session_id is None or request is None or not isinstance(content, str) or not content.strip():
+            return
+        store.add_turn(session_id, agent.id, request, content)
+        _compaction_pool.submit(fold, session_id)
+
+    def prepare(input, kwargs):
+        # The context goes in as additional input, which agents and teams both place
+        # right after the system message, where the replayed history used to be
+        session_id = kwargs.get("session_id")
+        request = _request_text(input)
+        context = build_context(store, policy, session_id, agent.id) if session_id and request else []
+        agent.additional_input = [*(base_input or []), *context] or None
+        return session_id, request
+
+    def watch(stream, session_id, request):
+        content = None
+        try:
+            for event in stream:
+                if isinstance(event, final_types) or getattr(event, "event", None) in ("RunCompleted", "TeamRunCompleted"):
+                    content = getattr(event, "content", None)
+                yield event
+        finally:
+            agent.additional_input = base_input
+        remember(session_id, request, content)
+
+    async def awatch(stream, session_id, request):
+        content = None
+        try:
+            async for event in stream:
+                if isinstance(event, final_types) or getattr(event, "event", None) in ("RunCompleted", "TeamRunCompleted"):
+                    content = getattr(event, "content", None)
+                yield event
+        finally:
+            agent.additional_input = base_input
+        remember(session_id, request, content)
+
+    def run(input, *args, stream=None, **kwargs):
+        if stream:
+            # Generators only start on first iteration, so prepare inside it
+            def started():
+                session_id, request = prepare(input, kwargs)
+                yield from watch(original_run(input, *args, stream=True, **kwargs), session_id, request)
+
+            return started()
+        session_id, request = prepare(input, kwargs)
+        try:
+            output = original_run(input, *args, stream=stream, **kwargs)
+        finally:
+            agent.additional_input = base_input
+        remember(session_id, request, getattr(output, "content", None))
+        return output
+
+    async def _arun(input, args, kwargs):
+        session_id, request = prepare(input, kwargs)
+        try:
+            output = await original_arun(input, *args, stream=False, **kwargs)
+        finally:
+            agent.additional_input = base_input
+        remember(session_id, request, getattr(output, "content", None))
+        return output
+
+    def arun(input, *args, stream=None, **kwargs):
+        if stream:
+            async def started():
+                session_id, request = prepare(input, kwargs)
+                async for event in awatch(original_arun(input, *args, stream=True, **kwargs), session_id, request):
+                    yield event
+
+            return started()
+        return _arun(input, args, kwargs)
+
+    agent.run = run
+    agent.arun = arun
+    return agent
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class MemoryTools(Toolkit):
+    def __init__(self, store, **kwargs):
+        self.store = store
+        super().__init__(
+            name="memory_tools",
+            tools=[self.pin_fact, self.list_pinned_facts, self.unpin_fact],
+            **kwargs,
+        )
+
+    def pin_fact(self, fact: str, run_context: RunContext) -> str:
+        """Pin a fact about the repository that the user has confirmed, so it stays in
+        context for the rest of the conversation even after older turns are summarized.
+
+        Args:
+            fact (str): One short, self-contained statement, e.g. "The project targets Python 3.12".
+
+        Returns:
+            str: Confirmation message.
+        """
+        self.store.pin(run_context.session_id, fact)
+        return f"Pinned: {fact}"
+
+    def list_pinned_facts(self, run_context: RunContext) -> str:
+        """List the facts pinned in this conversation.
+
+        Returns:
+            str: One pinned fact per line, prefixed with its id.
+        """
+        pins = self.store.pins(run_context.session_id)
+        return "\n".join(f"{pin_id}: {fact}" for pin_id, fact in pins) or "No pinned facts."
+
+    def unpin_fact(self, fact_id: int, run_context: RunContext) -> str:
+        """Remove a pinned fact, e.g. after the user corrected it.
+
+        Args:
+            fact_id (int): Id of the fact as shown by list_pinned_facts.
+
+        Returns:
+            str: Confirmation message.
+        """
+        removed = self.store.unpin(run_context.session_id, fact_id)
+        return f"Unpinned fact {fact_id}." if removed else f"No pinned fact with id {fact_id}."
@@ -0,0 +1,469 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from agno.agent import Agent
+from agno.run.base import RunContext
+from agno.tools import Toolkit
+
+from config import DB_FILE, REPO_DIR
+from repo_index import find_checkout, head_sha
+from storage import connect
+
+
+# Bump when the section prompts change, so stored sections are written again
+SECTION_VERSION = 2
+MAX_WORKERS = 4
+MAX_INPUT_CHARS = 6000
+# A section is written from the newest analysis of each upstream agent, found among its
+# last RECENT_ANSWERS answers
+ANALYSES_PER_AGENT = 1
+RECENT_ANSWERS = 20
+
+SECTION_INSTRUCTIONS = [
+    "You write one section of a README.md preview in GitHub-flavored Markdown.",
+    "Use ONLY the confirmed analysis and pinned facts you are given. If something the section "
+    "needs is missing or unconfirmed, say so in one sentence instead of guessing.",
+    "Do not invent features, APIs, commands, configurations or plans. No opinions, marketing "
+    "language, badges, diagrams or external links unless the analysis contains them.",
+    "Use bullet points, tables and fenced code blocks for commands where they help.",
+    "Answer with the body of the section only: no heading for the section, nothing before or after it.",
+]
+
+LEADING_HEADING = re.compile(r"\A\s*#{1,6} [^\n]*\n+")
+WRAPPING_FENCE = re.compile(r"\A\s*```(?:markdown|md)?\n(.*?)\n```\s*\Z", re.DOTALL)
+# Separates the preview from the note on what was rewritten
+STATUS_MARKER = "<!-- readme-status -->"
+
+# Requests for an agent's analysis step ("Perform your analysis step", "Analyze the dependencies",
+# "Explain the code: ..."), as opposed to questions answered along the way ("Which license ...?"),
+# which must neither change a section nor end up in it
+ANALYSIS_REQUEST = re.compile(
+    r"\bperform your [\w ]+ step\b"
+    r"|^\W*(?:please\s+)?(?:re-?)?(?:analy[sz]e|analysis|explain|describe|document|summari[sz]e|review|audit"
+    r"|assess|evaluate|detect|scan|identify|extract|map|list|report|give (?:me )?an? (?:overview|summary|analysis))\b",
+    re.IGNORECASE,
+)
+QUESTION = re.compile(
+    r"\?\s*$|^\W*(?:what|which|who|where|when|why|how|is|are|does|do|did|can|could|should|will|would)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class ReadmeSection:
+    key: str
+    title: str
+    # Ids of the agents whose answers the section is written from
+    inputs: tuple
+    guidance: str
+
+
+SECTIONS = (
+    ReadmeSection(
+        "overview", "Project Overview",
+        ("repo_metadata_agent", "code_understanding_agent"),
+        "What the project is and does, in two or three short paragraphs.",
+    ),
+    ReadmeSection(
+        "features", "Features",
+        ("code_understanding_agent",),
+        "A bullet list of the capabilities the code actually implements.",
+    ),
+    ReadmeSection(
+        "tech_stack", "Tech Stack",
+        ("file_analyzer_agent", "dependency_analysis_agent"),
+        "Languages, frameworks, main libraries and tools, as a short list or table.",
+    ),
+    ReadmeSection(
+        "prerequisites", "Prerequisites",
+        ("onboarding_agent", "dependency_analysis_agent"),
+        "Runtimes, system packages and accounts needed before installing.",
+    ),
+    ReadmeSection(
+        "installation", "Installation",
+        ("onboarding_agent", "dependency_analysis_agent"),
+        "Step-by-step install commands for the detected ecosystem.",
+    ),
+    ReadmeSection(
+        "configuration", "Configuration",
+        ("onboarding_agent", "file_analyzer_agent"),
+        "Environment variables, configuration files and their settings.",
+    ),
+    ReadmeSection(
+        "usage", "Usage",
+        ("onboarding_agent", "code_understanding_agent"),
+        "How to run the project, with example commands or calls.",
+    ),
+    ReadmeSection(
+        "error_handling", "Error Handling",
+        ("error_documentation_agent",),
+        "Documented errors, their causes and how to resolve them.",
+    ),
+    ReadmeSection(
+        "compliance", "Compliance & Licensing",
+        ("compliance_agent",),
+        "The detected license(s) and any explicit compliance references, without legal interpretation.",
+    ),
+    ReadmeSection(
+        "notes", "Notes & Limitations",
+        ("code_understanding_agent", "code_quality_agent"),
+        "Known limitations and caveats that the analysis states explicitly.",
+    ),
+)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+def is_analysis_request(request):
+    request = (request or "").strip()
+    # A delegated task may carry earlier findings after its first line; the request itself comes first
+    first_sentences = " ".join(request.split("\n\n", 1)[0].split())
+    return bool(ANALYSIS_REQUEST.search(first_sentences)) and not QUESTION.search(first_sentences)
+
+
+def find_section(name):
+    """Resolve a section key or title ("Installation", "tech stack", ...) to its section."""
+    wanted = re.sub(r"[^a-z]", "", name.lower())
+    for section in SECTIONS:
+        names = (section.key.replace("_", ""), re.sub(r"[^a-z]", "", section.title.lower()))
+        if wanted and any(wanted in candidate or candidate in wanted for candidate in names):
+            return section
+    return None
+
+
+def section_digest(section, input_hashes, pins, edits):
+    """Everything a section's text depends on; an unchanged digest means the stored text is still valid."""
+    payload = json.dumps(
+        [SECTION_VERSION, SECTION_INSTRUCTIONS, asdict(section), input_hashes, pins, edits],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def clean_section(text):
+    match = WRAPPING_FENCE.match(text)
+    if match:
+        text = match.group(1)
+    return LEADING_HEADING.sub("", text, count=1).strip()
+
+
+def section_prompt(section, sources, pins, edits, previous):
+    parts = [f"Section: {section.title}\nWhat it covers: {section.guidance}"]
+    if pins:
+        parts.append("Confirmed facts (pinned by the user):\n" + "\n".join(f"- {fact}" for fact in pins))
+    for agent_id in section.inputs:
+        if agent_id in sources:
+            parts.append(f"Analysis from {agent_id}:\n{sources[agent_id]}")
+    if edits:
+        parts.append("Changes the user asked for in this section (apply all of them):\n" + "\n".join(f"- {edit}" for edit in edits))
+        if previous:
+            parts.append(
+                "Current text of the section. Keep what the analysis still supports and change "
+                f"only what the requests or the analysis require:\n{previous}"
+            )
+    return "\n\n".join(parts)
+
+
+def model_section_writer(model):
+    def write(prompt):
+        # A fresh agent per call, like the repository summarizer
+        agent = Agent(model=model, instructions=SECTION_INSTRUCTIONS, telemetry=False)
+        output = agent.run(prompt)
+        return output.content if isinstance(output.content, str) else str(output.content)
+
+    return write
+
+
+# -----------------------------
+# Section store
+# -----------------------------
+class ReadmeStore:
+    """README preview sections and the edits asked for them, per session, stored in SQLite."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS readme_sections (
+                    session_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    -- JSON {agent_id: content hash} of the answers the text was written from
+                    inputs TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, section)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_readme_sections_digest ON readme_sections (digest)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS readme_edits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    instruction TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_readme_edits_owner ON readme_edits (session_id, section, id)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def sections(self, session_id):
+        """Stored sections of the session, as {section: (digest, inputs, content, updated_at)}."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT section, digest, inputs, content, updated_at FROM readme_sections WHERE session_id = ?",
+                (session_id,),
+            ).fetchall()
+        return {section: (digest, json.loads(inputs), content, updated_at) for section, digest, inputs, content, updated_at in rows}
+
+    def by_digest(self, digest):
+        # Another session with the same inputs, pins and edits already wrote this text
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT content FROM readme_sections WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, session_id, section, digest, inputs, content):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO readme_sections (session_id, section, digest, inputs, content, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, section, digest, json.dumps(inputs, sort_keys=True), content, time.time()),
+            )
+
+    def edits(self, session_id):
+        """Edit requests of the session, as {section: [instruction, ...]} oldest first."""
+        found = {}
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT section, instruction FROM readme_edits WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        for section, instruction in rows:
+            found.setdefault(section, []).append(instruction)
+        return found
+
+    def add_edit(self, session_id, section, instruction):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO readme_edits (session_id, section, instruction, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, section, instruction.strip(), time.time()),
+            )
+
+
+# -----------------------------
+# Incremental build
+# -----------------------------
+class ReadmeBuilder:
+    """Writes only the sections whose inputs, pins or edits changed and splices them into the README.
+
+    `write(prompt)` returns the text of one section, e.g. a model call.
+    """
+
+    def __init__(self, write, store, max_workers=MAX_WORKERS):
+        self.write = write
+        self.store = store
+        self.max_workers = max_workers
+
+    def plan(self, session_id, sources, pins):
+        """One entry per section: (section, digest, input hashes, edits, stored row or None)."""
+        stored = self.store.sections(session_id)
+        edits = self.store.edits(session_id)
+        plan = []
+        for section in SECTIONS:
+            input_hashes = {agent_id: content_hash(sources[agent_id]) for agent_id in section.inputs if agent_id in sources}
+            section_edits = edits.get(section.key, [])
+            digest = section_digest(section, input_hashes, pins, section_edits)
+            plan.append((section, digest, input_hashes, section_edits, stored.get(section.key)))
+        return plan
+
+    def _generate(self, session_id, sources, pins, entry):
+        section, digest, input_hashes, edits, row = entry
+        content = self.store.by_digest(digest)
+        source = "cache"
+        if content is None:
+            previous = row[2] if row else None
+            content = clean_section(self.write(section_prompt(section, sources, pins, edits, previous)))
+            source = "written"
+        self.store.put(session_id, section.key, digest, input_hashes, content)
+        return content, source
+
+    def build(self, session_id, sources, pins, project):
+        """Return the README markdown and {"written": [...], "cached": [...], "missing": [...], "failed": [...]}."""
+        status = {"written": [], "cached": [], "missing": [], "failed": []}
+        contents = {}
+        pending = []
+        for entry in self.plan(session_id, sources, pins):
+            section, digest, input_hashes, edits, row = entry
+            if row is not None and row[0] == digest:
+                contents[section.key] = row[2]
+                status["cached"].append(section.title)
+            elif not input_hashes and not edits:
+                # Nothing confirmed to write from: say so instead of letting the model guess
+                status["missing"].append(section.title)
+            else:
+                pending.append(entry)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [(entry, pool.submit(self._generate, session_id, sources, pins, entry)) for entry in pending]
+            for (section, _, _, _, row), future in futures:
+                try:
+                    content, source = future.result()
+                except Exception:
+                    # Keep the last good text of the section rather than failing the whole preview
+                    status["failed"].append(section.title)
+                    if row is not None:
+                        contents[section.key] = row[2]
+                    continue
+                contents[section.key] = content
+                status["written" if source == "written" else "cached"].append(section.title)
+
+        parts = [f"# {project}"]
+        parts.extend(f"## {section.title}\n\n{contents[section.key]}" for section in SECTIONS if section.key in contents)
+        return "\n\n".join(parts) + "\n", status
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+def _merge_answers(*found):
+    """Newest distinct analyses per agent, joined and cut to MAX_INPUT_CHARS. Answers to
+    other requests are left out, so a question asked in between changes no section."""
+    merged = {}
+    for answers in found:
+        for agent_id, rows in answers.items():
+            merged.setdefault(agent_id, []).extend(rows)
+    sources = {}
+    for agent_id, rows in merged.items():
+        texts = []
+        for _, request, text in sorted(rows, key=lambda row: row[0], reverse=True):
+            text = text.strip()
+            if text and text not in texts and is_analysis_request(request):
+                texts.append(text)
+        joined = "\n\n---\n\n".join(texts[:ANALYSES_PER_AGENT])
+        if joined:
+            sources[agent_id] = joined if len(joined) <= MAX_INPUT_CHARS else joined[:MAX_INPUT_CHARS] + " [...]"
+    return sources
+
+
+def _status_note(status):
+    lines = []
+    if status["written"]:
+        lines.append(f"Written now: {', '.join(status['written'])}.")
+    if status["cached"]:
+        lines.append(f"Unchanged (from cache): {', '.join(status['cached'])}.")
+    if status["missing"]:
+        lines.append(f"Left out, no confirmed analysis yet: {', '.join(status['missing'])}.")
+    if status["failed"]:
+        lines.append(f"Could not be written, previous text kept where there was one: {', '.join(status['failed'])}.")
+    lines.append("Review the preview and name any section you want changed.")
+    return "\n".join(f"_{line}_" for line in lines)
+
+
+def strip_status(text):
+    """The README itself, without the note render_readme adds for the reviewer."""
+    return text.split(STATUS_MARKER, 1)[0].rstrip() + "\n"
+
+
+class ReadmeTools(Toolkit):
+    def __init__(self, model, repo_dir=REPO_DIR, memory_store=None, result_cache=None, store=None, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        self.memory_store = memory_store
+        self.result_cache = result_cache
+        self.builder = ReadmeBuilder(model_section_writer(model), store or ReadmeStore())
+        super().__init__(
+            name="readme_tools",
+            tools=[self.render_readme, self.edit_readme_section, self.list_readme_sections],
+            # The preview is the answer; the model does not need to repeat it
+            stop_after_tool_call_tools=["render_readme", "edit_readme_section"],
+            show_result_tools=["render_readme", "edit_readme_section"],
+            **kwargs,
+        )
+
+    def _inputs(self, session_id):
+        agent_ids = sorted({agent_id for section in SECTIONS for agent_id in section.inputs})
+        found = []
+        checkout = find_checkout(self.repo_dir)
+        sha = head_sha(checkout) if checkout else None
+        if self.result_cache is not None and sha:
+            found.append(self.result_cache.latest(sha, agent_ids, RECENT_ANSWERS))
+        if self.memory_store is not None and session_id:
+            found.append(self.memory_store.latest_answers(session_id, agent_ids, RECENT_ANSWERS))
+        pins = [fact for _, fact in self.memory_store.pins(session_id)] if self.memory_store is not None and session_id else []
+        project = checkout.name if checkout else "Project"
+        return _merge_answers(*found), pins, project
+
+    def _render(self, session_id):
+        sources, pins, project = self._inputs(session_id)
+        readme, status = self.builder.build(session_id or "", sources, pins, project)
+        return f"{readme}\n{STATUS_MARKER}\n---\n\n{_status_note(status)}"
+
+    def render_readme(self, run_context: RunContext) -> str:
+        """Render the README.md preview from the confirmed analysis of the other agents.
+        Sections whose analysis, pinned facts and edits are unchanged are reused as they are;
+        only the others are written again.
+
+        Returns:
+            str: The README preview in Markdown, followed by which sections were rewritten.
+        """
+        return self._render(run_context.session_id)
+
+    def edit_readme_section(self, section: str, instruction: str, run_context: RunContext) -> str:
+        """Change one section of the README preview as the user asked, e.g. "fix the Installation
+        section to use poetry". Only that section is rewritten; the request is kept, so the section
+        still honours it when the analysis changes later.
+
+        Args:
+            section (str): Section key or title, e.g. "installation" or "Tech Stack".
+            instruction (str): The change the user asked for, in their words.
+
+        Returns:
+            str: The updated README preview in Markdown.
+        """
+        found = find_section(section)
+        if found is None:
+            return f"Unknown section {section!r}. Sections: {', '.join(s.title for s in SECTIONS)}."
+        self.builder.store.add_edit(run_context.session_id or "", found.key, instruction)
+        return self._render(run_context.session_id)
+
+    def list_readme_sections(self, run_context: RunContext) -> str:
+        """List the README sections, the agents each is written from, whether the stored text
+        is current, and the edits the user asked for.
+
+        Returns:
+            str: JSON with one entry per section.
+        """
+        sources, pins, _ = self._inputs(run_context.session_id)
+        result = []
+        for section, digest, input_hashes, edits, row in self.builder.plan(run_context.session_id or "", sources, pins):
+            if row is None:
+                state = "not written" if input_hashes or edits else "no confirmed analysis"
+                changed = []
+            else:
+                state = "current" if row[0] == digest else "outdated"
+                changed = sorted(agent_id for agent_id in set(input_hashes) | set(row[1]) if input_hashes.get(agent_id) != row[1].get(agent_id))
+            result.append(
+                {
+                    "section": section.key,
+                    "title": section.title,
+                    "inputs": list(section.inputs),
+                    "state": state,
+                    "changed_inputs": changed,
+                    "edits": edits,
+                }
+            )
+        return json.dumps(result, indent=2)
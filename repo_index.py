@@ -0,0 +1,456 @@
+import fnmatch
+import json
+import subprocess
+from collections import Counter
+from pathlib import Path
+from uuid import uuid4
+
+from agno.tools import Toolkit
+from agno.tools.file import FileTools
+
+import file_reader
+from config import CACHE_DIR, REPO_DIR
+from repo_walker import WALKER_VERSION, excluded_dir, filter_paths, is_binary, skipped_summary, walk_repository
+
+
+INDEX_DIR = CACHE_DIR / "index"
+
+LANGUAGES = {
+    ".py": "Python", ".pyi": "Python", ".ipynb": "Jupyter Notebook",
+    ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin", ".scala": "Scala",
+    ".go": "Go", ".rs": "Rust", ".rb": "Ruby", ".php": "PHP",
+    ".cs": "C#", ".fs": "F#", ".swift": "Swift", ".m": "Objective-C",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".hpp": "C++", ".cxx": "C++",
+    ".dart": "Dart", ".lua": "Lua", ".r": "R", ".jl": "Julia",
+    ".ex": "Elixir", ".exs": "Elixir", ".erl": "Erlang", ".hs": "Haskell", ".clj": "Clojure",
+    ".sh": "Shell", ".bash": "Shell", ".ps1": "PowerShell",
+    ".html": "HTML", ".css": "CSS", ".scss": "SCSS", ".vue": "Vue", ".svelte": "Svelte",
+    ".sql": "SQL",
+}
+
+CONFIG_FILES = {
+    "package.json", "tsconfig.json", "pyproject.toml", "setup.py", "setup.cfg",
+    "requirements.txt", "Pipfile", "environment.yml", "pom.xml", "build.gradle",
+    "build.gradle.kts", "settings.gradle", "go.mod", "Cargo.toml", "composer.json",
+    "Gemfile", "Package.swift", "build.sbt", "Makefile", "CMakeLists.txt",
+    "Dockerfile", "docker-compose.yml", "docker-compose.yaml", ".env.example",
+    "tox.ini", "noxfile.py", ".gitlab-ci.yml", "Procfile",
+}
+
+ENTRY_FILES = {
+    "main.py", "app.py", "manage.py", "wsgi.py", "asgi.py", "__main__.py", "cli.py",
+    "index.js", "app.js", "server.js", "main.js", "index.ts", "main.ts", "server.ts",
+    "main.go", "main.rs", "lib.rs", "Main.java", "Program.cs", "index.php",
+}
+
+DOC_FILES = {"readme", "license", "licence", "copying", "notice", "contributing", "changelog"}
+
+
+# -----------------------------
+# Checkout discovery
+# -----------------------------
+def find_checkout(repo_dir=REPO_DIR):
+    """Return the git checkout inside `repo_dir`, preferring the most recent clone."""
+    repo_dir = Path(repo_dir)
+    if (repo_dir / ".git").exists():
+        return repo_dir
+    if not repo_dir.is_dir():
+        return None
+    candidates = [p for p in repo_dir.iterdir() if p.is_dir() and (p / ".git").exists()]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def head_sha(checkout):
+    result = subprocess.run(
+        ["git", "-C", str(checkout), "rev-parse", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+# -----------------------------
+# Index construction
+# -----------------------------
+def _is_config(name, rel_path):
+    if name in CONFIG_FILES or name.endswith((".csproj", ".sln")):
+        return True
+    return rel_path.startswith(".github/workflows/")
+
+
+def build_index(checkout, sha=None):
+    """Walk `checkout` once and return a compact, deterministic summary of it."""
+    checkout = Path(checkout)
+    walk = walk_repository(checkout)
+    return summarize_files(checkout.name, walk.files, sha, walk.skipped)
+
+
+def update_index(checkout, previous, changed_paths, sha=None):
+    """Derive the index of `checkout` from `previous`, re-checking only `changed_paths`."""
+    checkout = Path(checkout)
+    changed = set(changed_paths)
+    files = {path: size for path, size in previous["files"] if path not in changed}
+    skipped = {
+        reason: [path for path in paths if path not in changed]
+        for reason, paths in previous.get("skipped", {}).items()
+    }
+    walk = filter_paths(checkout, changed)
+    files.update(walk.files)
+    for reason, paths in walk.skipped.items():
+        skipped[reason] = sorted(set(skipped.get(reason, [])) | set(paths))
+    return summarize_files(checkout.name, sorted(files.items()), sha, skipped)
+
+
+def summarize_files(root, files, sha=None, skipped=None):
+    extensions = Counter()
+    language_files = Counter()
+    language_bytes = Counter()
+    top_level = Counter()
+    config_files, entry_files, doc_files = [], [], []
+
+    for rel_path, size in files:
+        name = rel_path.rsplit("/", 1)[-1]
+        suffix = Path(name).suffix.lower()
+        extensions[suffix or name] += 1
+        top_level[rel_path.split("/", 1)[0] if "/" in rel_path else "."] += 1
+
+        language = LANGUAGES.get(suffix)
+        if language:
+            language_files[language] += 1
+            language_bytes[language] += size
+
+        if _is_config(name, rel_path):
+            config_files.append(rel_path)
+        if name in ENTRY_FILES:
+            entry_files.append(rel_path)
+        if Path(name).stem.lower() in DOC_FILES and rel_path.count("/") == 0:
+            doc_files.append(rel_path)
+
+    languages = [
+        {"name": name, "files": language_files[name], "bytes": language_bytes[name]}
+        for name in sorted(language_bytes, key=lambda n: (-language_bytes[n], n))
+    ]
+
+    return {
+        "sha": sha,
+        "root": root,
+        "file_count": len(files),
+        "total_bytes": sum(size for _, size in files),
+        "languages": languages,
+        "extensions": dict(sorted(extensions.items(), key=lambda kv: (-kv[1], kv[0]))),
+        "top_level": dict(sorted(top_level.items())),
+        "config_files": config_files,
+        "entry_files": entry_files,
+        "doc_files": doc_files,
+        "files": files,
+        "skipped": {reason: paths for reason, paths in (skipped or {}).items() if paths},
+    }
+
+
+def index_path(sha):
+    # Versioned, so a change in what the walker skips rebuilds the index
+    return INDEX_DIR / f"{sha}.v{WALKER_VERSION}.json"
+
+
+def cached_index(sha):
+    index_file = index_path(sha)
+    return json.loads(index_file.read_text()) if index_file.exists() else None
+
+
+def save_index(index):
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    index_file = index_path(index["sha"])
+    # Agents of one stage may build the same index at once, so each writer gets its own temp file
+    tmp_file = index_file.with_name(f"{index_file.name}.{uuid4().hex}.tmp")
+    tmp_file.write_text(json.dumps(index))
+    tmp_file.replace(index_file)
+
+
+def load_index(checkout=None, rebuild=False):
+    """Return the index for the current checkout, building and persisting it on a miss."""
+    checkout = Path(checkout) if checkout else find_checkout()
+    if checkout is None:
+        return None
+
+    sha = head_sha(checkout)
+    if sha and not rebuild:
+        index = cached_index(sha)
+        if index is not None:
+            return index
+
+    index = build_index(checkout, sha=sha)
+    if sha:
+        save_index(index)
+    return index
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class RepoIndexTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        super().__init__(
+            name="repo_index_tools",
+            tools=[self.get_repo_overview, self.find_files, self.list_skipped_files],
+            **kwargs,
+        )
+
+    def _index(self):
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return None
+        return load_index(checkout)
+
+    def get_repo_overview(self) -> str:
+        """Get a precomputed overview of the cloned repository: languages, extensions,
+        top-level directories, configuration files, entry files and documentation files.
+        Prefer this over listing directories one by one.
+
+        Returns:
+            str: The repository overview as JSON.
+        """
+        index = self._index()
+        if index is None:
+            return "No cloned repository found."
+        overview = {key: value for key, value in index.items() if key not in ("files", "skipped")}
+        overview["skipped"] = skipped_summary(index["skipped"])
+        return json.dumps(overview, indent=2)
+
+    def find_files(self, pattern: str = "*", limit: int = 200) -> str:
+        """Find files in the cloned repository whose relative path matches a glob pattern.
+
+        Args:
+            pattern (str): Glob pattern such as "*.py", "src/*" or "*/routes/*".
+            limit (int): Maximum number of paths to return.
+
+        Returns:
+            str: JSON list of [path, size_in_bytes] pairs.
+        """
+        index = self._index()
+        if index is None:
+            return "No cloned repository found."
+        matches = [entry for entry in index["files"] if fnmatch.fnmatch(entry[0], pattern)]
+        result = {"total_matches": len(matches), "files": matches[:limit]}
+        return json.dumps(result, indent=2)
+
+    def list_skipped_files(self, reason: str | None = None, limit: int = 200) -> str:
+        """List files left out of the analysis (gitignored, vendored, generated, binary, too large).
+
+        Args:
+            reason (str | None): Only this reason, e.g. "vendored".
+            limit (int): Maximum number of paths per reason.
+
+        Returns:
+            str: JSON object of reason -> total and paths.
+        """
+        index = self._index()
+        if index is None:
+            return "No cloned repository found."
+        skipped = {r: paths for r, paths in index["skipped"].items() if reason in (None, r)}
+        result = {r: {"total": len(paths), "paths": paths[:limit]} for r, paths in skipped.items()}
+        return json.dumps(result, indent=2)
+
+
+def skip_reason(path, base_dir, checkouts):
+    """None when `path` below `base_dir` is analyzed, otherwise why the index skips it.
+
+    `checkouts` caches the index of every checkout seen, for the length of one tool call.
+    """
+    checkout = next((p for p in [path, *path.parents] if (p / ".git").exists()), None)
+    if checkout is None or base_dir not in [checkout, *checkout.parents]:
+        return None
+    if checkout not in checkouts:
+        index = load_index(checkout)
+        checkouts[checkout] = (
+            {p for p, _ in index["files"]},
+            {p: r for r, paths in index["skipped"].items() for p in paths},
+        )
+    files, skipped = checkouts[checkout]
+    rel_path = path.relative_to(checkout).as_posix()
+    if path == checkout or rel_path in files:
+        return None
+    if path.is_dir():
+        rel_path += "/"
+    if rel_path in skipped:
+        return skipped[rel_path]
+    if excluded_dir(rel_path) is not None:
+        return "excluded_dir"
+    # Everything below a skipped directory is skipped with it
+    for parent in Path(rel_path).parents:
+        reason = skipped.get(f"{parent.as_posix()}/")
+        if reason is not None:
+            return reason
+    return None
+
+
+class RepoFileTools(FileTools):
+    """FileTools that see the repository the way the index does: files it skips
+    (ignored, vendored, generated, binary) are hidden from listings and searches and
+    are not read. Reads never return more than `max_read_bytes`; with `ranged_reads`,
+    head, tail, byte-range and grep reads of big files are available too."""
+
+    def __init__(self, base_dir=REPO_DIR, ranged_reads=False, max_read_bytes=file_reader.MAX_READ_BYTES, **kwargs):
+        super().__init__(base_dir=Path(base_dir), **kwargs)
+        self.max_read_bytes = max_read_bytes
+        if ranged_reads:
+            for tool in (self.read_lines, self.read_tail, self.read_bytes, self.grep_file):
+                self.tools.append(tool)
+                self.register(tool)
+
+    def _readable(self, file_name):
+        """(path, None) when `file_name` may be read, otherwise (None, message)."""
+        safe, path = self.check_escape(file_name)
+        if not safe:
+            return None, "Error reading file"
+        reason = skip_reason(path, self.base_dir, {})
+        # Big files are exactly what ranged reads are for, unless they are binary
+        if reason == "too_large" and path.is_file() and is_binary(path):
+            reason = "binary"
+        if reason is not None and reason != "too_large":
+            return None, f"Not read: {file_name} is skipped ({reason}). list_skipped_files shows what the analysis leaves out."
+        if not path.is_file():
+            return None, f"Error reading file: {file_name} does not exist"
+        return path, None
+
+    def read_file(self, file_name: str, encoding: str = "utf-8") -> str:
+        """Reads the contents of the file `file_name` and returns the contents if successful.
+        Big files are cut off with a marker saying how to read the rest.
+
+        :param file_name: The name of the file to read.
+        :param encoding: Encoding to use, default - utf-8
+        :return: The contents of the file if successful, otherwise returns an error message.
+        """
+        path, error = self._readable(file_name)
+        if error:
+            return error
+        if path.stat().st_size <= self.max_read_bytes:
+            return super().read_file(file_name, encoding)
+        text = file_reader.read_lines(path, max_bytes=self.max_read_bytes, numbered=False, line_base=0)
+        return f"{text}\n[File is {path.stat().st_size} bytes; read further parts with read_file_chunk.]"
+
+    def read_file_chunk(self, file_name: str, start_line: int, end_line: int, encoding: str = "utf-8") -> str:
+        """Reads the contents of the file `file_name` and returns lines from start_line to end_line.
+
+        :param file_name: The name of the file to read.
+        :param start_line: Number of first line in the returned chunk
+        :param end_line: Number of the last line in the returned chunk
+        :param encoding: Encoding to use, default - utf-8
+        :return: The contents of the selected chunk
+        """
+        path, error = self._readable(file_name)
+        if error:
+            return error
+        # Same 0-based, inclusive range as FileTools, without loading the whole file
+        return file_reader.read_lines(
+            path, start_line + 1, end_line + 1, max_bytes=self.max_read_bytes, numbered=False, line_base=0
+        )
+
+    def read_lines(self, file_name: str, start_line: int = 1, end_line: int | None = None) -> str:
+        """Read numbered lines of a file, e.g. the head of a big log or a range around a line of interest.
+        Long answers end with a marker telling where to continue.
+
+        Args:
+            file_name (str): Path of the file.
+            start_line (int): First line, starting at 1.
+            end_line (int | None): Last line; by default as many as fit in one answer.
+
+        Returns:
+            str: The numbered lines.
+        """
+        path, error = self._readable(file_name)
+        return error or file_reader.read_lines(path, start_line, end_line, max_bytes=self.max_read_bytes)
+
+    def read_tail(self, file_name: str, lines: int = 50) -> str:
+        """Read the last lines of a file, e.g. the end of a log.
+
+        Args:
+            file_name (str): Path of the file.
+            lines (int): Number of lines.
+
+        Returns:
+            str: The numbered lines.
+        """
+        path, error = self._readable(file_name)
+        return error or file_reader.read_tail(path, lines, max_bytes=self.max_read_bytes)
+
+    def read_bytes(self, file_name: str, offset: int = 0, length: int = 4096) -> str:
+        """Read a byte range of a file, e.g. of a file with very long lines.
+
+        Args:
+            file_name (str): Path of the file.
+            offset (int): First byte; negative values count from the end.
+            length (int): Number of bytes.
+
+        Returns:
+            str: The bytes decoded as UTF-8.
+        """
+        path, error = self._readable(file_name)
+        return error or file_reader.read_bytes(path, offset, length, max_bytes=self.max_read_bytes)
+
+    def grep_file(self, file_name: str, pattern: str, ignore_case: bool = False, context: int = 0) -> str:
+        """Find the lines of one file matching a regular expression, without reading the whole file.
+
+        Args:
+            file_name (str): Path of the file.
+            pattern (str): Regular expression, e.g. "raise |except " or "ERROR".
+            ignore_case (bool): Match case-insensitively.
+            context (int): Lines to show before and after each match (at most 5).
+
+        Returns:
+            str: Numbered matching lines.
+        """
+        path, error = self._readable(file_name)
+        return error or file_reader.grep(path, pattern, ignore_case, context, max_bytes=self.max_read_bytes)
+
+    def list_files(self, **kwargs) -> str:
+        """Returns a list of files in directory
+        :param directory: (Optional) name of directory to list.
+
+        :return: JSON list of paths, or an object with the paths and the skipped ones.
+        """
+        directory = kwargs.get("directory", ".")
+        safe, d = self.check_escape(directory)
+        if not safe or not d.is_dir():
+            return super().list_files(**kwargs)
+        checkouts, files, skipped = {}, [], {}
+        for path in sorted(d.iterdir()):
+            reason = skip_reason(path, self.base_dir, checkouts)
+            rel_path = str(path.relative_to(self.base_dir))
+            if reason is None:
+                files.append(rel_path)
+            else:
+                skipped[rel_path] = reason
+        if not skipped:
+            return json.dumps(files, indent=4)
+        return json.dumps({"files": files, "skipped": skipped}, indent=4)
+
+    def search_files(self, pattern: str) -> str:
+        """Searches for files in the base directory that match the pattern
+
+        :param pattern: The pattern to search for, e.g. "*.txt", "file*.csv", "**/*.py".
+        :return: JSON formatted list of matching file paths, or error message.
+        """
+        result = super().search_files(pattern)
+        try:
+            found = json.loads(result)
+        except ValueError:
+            return result
+        checkouts, files, skipped = {}, [], Counter()
+        for file_path in found["files"]:
+            path = Path(file_path) if Path(file_path).is_absolute() else self.base_dir / file_path
+            reason = skip_reason(path, self.base_dir, checkouts)
+            if reason is None:
+                files.append(file_path)
+            else:
+                skipped[reason] += 1
+        found.update(matches_found=len(files), files=files)
+        if skipped:
+            found["skipped"] = dict(skipped)
+        return json.dumps(found, indent=2)
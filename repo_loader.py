@@ -0,0 +1,234 @@
+import json
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from agno.tools import Toolkit
+
+from config import REPO_DIR
+from repo_index import head_sha, load_index
+from repo_update import UpdateError, update_repository
+from workspaces import directory_size
+
+
+# Blobs above this size are left on the server until something checks them out
+DEFAULT_BLOB_LIMIT = "1m"
+
+# Local (file://) remotes run upload-pack on this machine, so filtering can be
+# enabled from the client side; hosted remotes such as GitHub already allow it.
+LOCAL_UPLOAD_PACK = "git -c uploadpack.allowFilter=true -c uploadpack.allowAnySHA1InWant=true upload-pack"
+
+
+class CloneError(RuntimeError):
+    pass
+
+
+@dataclass
+class CloneReport:
+    url: str
+    path: str
+    sha: str
+    depth: int
+    blob_limit: str
+    sparse_paths: list = field(default_factory=list)
+    seconds: float = 0.0
+    bytes_transferred: int = 0
+    files_checked_out: int = 0
+
+
+def repo_name(url):
+    name = url.rstrip("/").rsplit("/", 1)[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+def _git(args, cwd=None):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise CloneError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _objects_size(checkout):
+    total = 0
+    for root, _, names in os.walk(Path(checkout) / ".git" / "objects"):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _sparse_patterns(paths):
+    # Non-cone patterns anchored at the repo root; directories keep their subtree
+    patterns = []
+    for path in paths:
+        path = path.strip().strip("/")
+        if path:
+            patterns.append(f"/{path}")
+    return patterns
+
+
+def clone_repository(
+    url,
+    dest_dir=REPO_DIR,
+    depth=1,
+    blob_limit=DEFAULT_BLOB_LIMIT,
+    sparse_paths=None,
+    branch=None,
+    replace=False,
+):
+    """Clone `url` into `dest_dir` with a shallow, blob-filtered and optionally sparse checkout."""
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    target = dest_dir / repo_name(url)
+    if target.exists():
+        if not replace:
+            raise CloneError(f"{target.name} is already cloned")
+        shutil.rmtree(target)
+
+    args = ["clone", "--depth", str(depth), "--single-branch", "--no-tags", "--no-checkout"]
+    if blob_limit:
+        args.append(f"--filter=blob:limit={blob_limit}")
+    if branch:
+        args += ["--branch", branch]
+    if url.startswith("file://"):
+        args += ["--upload-pack", LOCAL_UPLOAD_PACK, "--config", f"remote.origin.uploadpack={LOCAL_UPLOAD_PACK}"]
+    args += [url, str(target)]
+
+    started = time.perf_counter()
+    _git(args)
+    patterns = _sparse_patterns(sparse_paths or [])
+    if patterns:
+        _git(["sparse-checkout", "set", "--no-cone", *patterns], cwd=target)
+    _git(["checkout", "--quiet"], cwd=target)
+    seconds = time.perf_counter() - started
+
+    # "S" marks index entries left out of a sparse checkout
+    files = [line for line in _git(["ls-files", "-t"], cwd=target).splitlines() if not line.startswith("S ")]
+    return CloneReport(
+        url=url,
+        path=str(target),
+        sha=head_sha(target),
+        depth=depth,
+        blob_limit=blob_limit or "",
+        sparse_paths=patterns,
+        seconds=round(seconds, 3),
+        bytes_transferred=_objects_size(target),
+        files_checked_out=len(files),
+    )
+
+
+def expand_checkout(checkout, paths):
+    """Add `paths` to a sparse checkout, fetching only the blobs they need."""
+    before = _objects_size(checkout)
+    started = time.perf_counter()
+    _git(["sparse-checkout", "add", *_sparse_patterns(paths)], cwd=checkout)
+    return {
+        "added": _sparse_patterns(paths),
+        "seconds": round(time.perf_counter() - started, 3),
+        "bytes_transferred": _objects_size(checkout) - before,
+    }
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class GitLoaderTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, blob_limit=DEFAULT_BLOB_LIMIT, cache=None, max_bytes=None, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        self.blob_limit = blob_limit
+        # Disk quota of the workspace `repo_dir` belongs to
+        self.max_bytes = max_bytes
+        # Agent result cache whose answers survive updates that don't touch their inputs
+        self.cache = cache
+        super().__init__(
+            name="git_loader_tools",
+            tools=[self.clone_repository, self.expand_checkout, self.update_repository],
+            **kwargs,
+        )
+
+    def clone_repository(self, url: str, sparse_paths: list[str] | None = None, branch: str | None = None) -> str:
+        """Clone a Git repository with a shallow (depth 1), blob-filtered checkout and
+        build the repository index for it.
+
+        Args:
+            url (str): The repository URL, e.g. https://github.com/owner/name.
+            sparse_paths (list[str] | None): Only check out these directories or files.
+                Leave empty to check out the whole tree.
+            branch (str | None): Branch to clone instead of the default branch.
+
+        Returns:
+            str: JSON report with the checkout path, commit SHA, clone time and bytes transferred.
+        """
+        try:
+            report = clone_repository(
+                url,
+                dest_dir=self.repo_dir,
+                blob_limit=self.blob_limit,
+                sparse_paths=sparse_paths,
+                branch=branch,
+            )
+        except CloneError as e:
+            return f"Error: {e}"
+        if self.max_bytes is not None:
+            used = directory_size(self.repo_dir)
+            if used > self.max_bytes:
+                shutil.rmtree(report.path, ignore_errors=True)
+                return (
+                    f"Error: the clone needs {used / 1024**2:.0f} MB, over the workspace quota of "
+                    f"{self.max_bytes / 1024**2:.0f} MB. Try again with sparse_paths."
+                )
+        load_index(report.path)
+        return json.dumps(asdict(report), indent=2)
+
+    def expand_checkout(self, repo_name: str, paths: list[str]) -> str:
+        """Check out additional directories or files of a sparse clone.
+
+        Args:
+            repo_name (str): Name of the cloned repository directory.
+            paths (list[str]): Directories or files to add to the checkout.
+
+        Returns:
+            str: JSON report with the added patterns, time taken and bytes transferred.
+        """
+        checkout = self._checkout(repo_name)
+        if checkout is None:
+            return f"Error: {repo_name} is not a cloned repository in the workspace"
+        try:
+            report = expand_checkout(checkout, paths)
+        except CloneError as e:
+            return f"Error: {e}"
+        load_index(checkout, rebuild=True)
+        return json.dumps(report, indent=2)
+
+    def _checkout(self, repo_name):
+        """The clone `repo_name` directly inside repo_dir, or None. The name comes from the
+        model, so anything that leads elsewhere ("..", "a/b", an absolute path) is refused."""
+        if not repo_name or "/" in repo_name or "\\" in repo_name or repo_name in (".", ".."):
+            return None
+        root = self.repo_dir.resolve()
+        checkout = (self.repo_dir / repo_name).resolve()
+        if checkout.parent != root or not (checkout / ".git").exists():
+            return None
+        return checkout
+
+    def update_repository(self, repo_name: str) -> str:
+        """Pull new commits into an already cloned repository and refresh only the
+        indexes and cached analyses touched by the changed files.
+
+        Args:
+            repo_name (str): Name of the cloned repository directory.
+
+        Returns:
+            str: JSON report with old and new commit, number of changed files, and which
+                agents need to re-run versus which answers were reused.
+        """
+        checkout = self._checkout(repo_name)
+        if checkout is None:
+            return f"Error: {repo_name} is not a cloned repository in the workspace"
+        try:
+            report = update_repository(checkout, cache=self.cache)
+        except UpdateError as e:
+            return f"Error: {e}"
+        return json.dumps(asdict(report), indent=2)
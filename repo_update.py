@@ -0,0 +1,175 @@
+import argparse
+import fnmatch
+import json
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from config import DB_FILE, REPO_DIR
+from license_scan import cached_license_map, update_license_map
+from repo_index import CONFIG_FILES, LANGUAGES, cached_index, head_sha, save_index, update_index
+from search_index import update_search_index
+from symbol_index import update_symbol_index
+
+
+class UpdateError(RuntimeError):
+    pass
+
+
+MANIFEST_PATTERNS = [
+    "*pyproject.toml", "*requirements*.txt", "*requirements*.in", "*setup.py", "*setup.cfg",
+    "*Pipfile", "*package.json", "*composer.json", "*pom.xml", "*build.gradle", "*build.gradle.kts",
+    "*.csproj", "*packages.config", "*go.mod", "*Cargo.toml", "*Gemfile",
+]
+LICENSE_PATTERNS = ["*LICENSE*", "*LICENCE*", "*COPYING*", "*NOTICE*", "*README*", "*.md"]
+DOC_PATTERNS = ["*README*", "*.md", "*.rst", "*Dockerfile", "*docker-compose*", "*Makefile", "*.env.example"]
+SOURCE_PATTERNS = [f"*{suffix}" for suffix in LANGUAGES]
+
+
+@dataclass
+class ChangeSet:
+    added: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+
+    @property
+    def paths(self):
+        return self.added + self.modified + self.deleted
+
+    @property
+    def structural(self):
+        # Files appearing or disappearing change what the tree looks like
+        return bool(self.added or self.deleted)
+
+
+def _matches(paths, patterns):
+    return any(fnmatch.fnmatch(path, pattern) for path in paths for pattern in patterns)
+
+
+def _config_changed(paths):
+    return any(Path(path).name in CONFIG_FILES for path in paths)
+
+
+# Which changes make each agent's earlier answers stale
+AGENT_INPUTS = {
+    # Commit metadata changes on every update
+    "repo_metadata_agent": lambda changes: True,
+    "file_analyzer_agent": lambda changes: changes.structural or _config_changed(changes.paths),
+    "dependency_analysis_agent": lambda changes: _matches(changes.paths, MANIFEST_PATTERNS),
+    "code_quality_agent": lambda changes: _matches(changes.paths, SOURCE_PATTERNS),
+    "error_documentation_agent": lambda changes: _matches(changes.paths, SOURCE_PATTERNS),
+    "code_understanding_agent": lambda changes: _matches(changes.paths, SOURCE_PATTERNS) or changes.structural,
+    "onboarding_agent": lambda changes: _matches(changes.paths, MANIFEST_PATTERNS + DOC_PATTERNS)
+    or _config_changed(changes.paths),
+    "compliance_agent": lambda changes: _matches(changes.paths, LICENSE_PATTERNS),
+    "test_generator_agent": lambda changes: _matches(changes.paths, SOURCE_PATTERNS),
+}
+
+
+@dataclass
+class UpdateReport:
+    repo: str
+    old_sha: str
+    new_sha: str
+    changed_files: int = 0
+    tracked_files: int = 0
+    affected_agents: list = field(default_factory=list)
+    reused_agents: list = field(default_factory=list)
+    reused_answers: int = 0
+    symbols_reindexed: bool = False
+    search_reindexed: bool = False
+    licenses_rescanned: bool = False
+
+
+def _git(checkout, args):
+    result = subprocess.run(["git", "-C", str(checkout), *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise UpdateError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def diff_commits(checkout, old_sha, new_sha):
+    changes = ChangeSet()
+    output = _git(checkout, ["diff", "--name-status", "--no-renames", old_sha, new_sha])
+    for line in output.splitlines():
+        status, _, path = line.partition("\t")
+        if status.startswith("A"):
+            changes.added.append(path)
+        elif status.startswith("D"):
+            changes.deleted.append(path)
+        else:
+            changes.modified.append(path)
+    return changes
+
+
+def fetch_latest(checkout):
+    """Fetch the tip of the tracked branch at depth 1 and move the checkout to it."""
+    branch = _git(checkout, ["rev-parse", "--abbrev-ref", "HEAD"]).strip()
+    _git(checkout, ["fetch", "--depth", "1", "origin", branch])
+    _git(checkout, ["reset", "--keep", "FETCH_HEAD"])
+
+
+def update_repository(checkout, cache=None):
+    """Pull new commits into `checkout` and invalidate only what the changed files touch.
+
+    The repository, symbol and search indexes and the license map are carried over from the old commit with
+    only changed files re-read. Agent answers are carried over for agents none of whose
+    inputs changed. File summaries need nothing: they are keyed by content hash, so only
+    changed files miss.
+    """
+    checkout = Path(checkout)
+    old_sha = head_sha(checkout)
+    if old_sha is None:
+        raise UpdateError(f"{checkout} is not a git checkout")
+    fetch_latest(checkout)
+    new_sha = head_sha(checkout)
+    report = UpdateReport(repo=checkout.name, old_sha=old_sha, new_sha=new_sha)
+    if new_sha == old_sha:
+        return report
+
+    changes = diff_commits(checkout, old_sha, new_sha)
+    report.changed_files = len(changes.paths)
+
+    previous = cached_index(old_sha)
+    if previous is not None:
+        index = update_index(checkout, previous, changes.paths, sha=new_sha)
+        save_index(index)
+        report.tracked_files = index["file_count"]
+        report.symbols_reindexed = update_symbol_index(checkout, old_sha, changes.paths) is not None
+        report.search_reindexed = update_search_index(checkout, old_sha, changes.paths) is not None
+        old_licenses = cached_license_map(old_sha)
+        licenses = update_license_map(checkout, old_sha, changes.paths)
+        report.licenses_rescanned = licenses is not None
+
+    for agent_id, is_affected in AGENT_INPUTS.items():
+        (report.affected_agents if is_affected(changes) else report.reused_agents).append(agent_id)
+    # The compliance agent also reports license headers, which any source file can change
+    if (
+        report.licenses_rescanned
+        and "compliance_agent" in report.reused_agents
+        and any(old_licenses[key] != licenses[key] for key in ("files", "declared", "third_party"))
+    ):
+        report.reused_agents.remove("compliance_agent")
+        report.affected_agents.append("compliance_agent")
+    if cache is not None:
+        report.reused_answers = cache.carry_forward(old_sha, new_sha, report.reused_agents)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pull new commits into a cloned repository and refresh only what changed.")
+    parser.add_argument("repo", help="Name of the cloned repository inside the repo directory")
+    parser.add_argument("--rerun", action="store_true", help="Re-run the analysis flow afterwards")
+    args = parser.parse_args()
+
+    from agent_cache import AgentResultCache
+
+    report = update_repository(REPO_DIR / args.repo, cache=AgentResultCache(db_file=DB_FILE))
+    print(json.dumps(asdict(report), indent=2))
+
+    if args.rerun and report.old_sha != report.new_sha:
+        # Unaffected agents are answered from the carried-over cache entries
+        from flow_runner import print_report, run_full_analysis
+        from main_latest1 import repo_chatbot_team
+
+        print_report(run_full_analysis(repo_chatbot_team, args.repo))
@@ -0,0 +1,250 @@
+import codecs
+import fnmatch
+import os
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Bump when the rules below change, so indexes built with the old rules are rebuilt
+WALKER_VERSION = 3
+
+MAX_FILE_BYTES = 1024 * 1024
+SNIFF_BYTES = 8192
+
+# Directories that never say anything about the project itself
+SKIP_DIRS = {
+    ".git", "node_modules", "vendor", "dist", "build", "__pycache__",
+    "target", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache",
+}
+
+# Defaults in the spirit of GitHub Linguist; `.gitattributes` can override them either way.
+# Patterns without a slash match the file name, the others the whole path.
+VENDORED_PATTERNS = [
+    "third_party/*", "third-party/*", "bower_components/*", "jspm_packages/*", "*/third_party/*",
+    "*.min.js", "*.min.css", "*-min.js", "*.bundle.js", "jquery*.js", "bootstrap*.css",
+]
+GENERATED_PATTERNS = [
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum",
+    "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.cc", "*.pb.h", "*.designer.cs",
+    "*.generated.*", "*.g.dart",
+]
+
+# Known binary formats are not worth a read to find out
+BINARY_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tiff", ".psd",
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar", ".war", ".whl", ".egg",
+    ".exe", ".dll", ".so", ".dylib", ".o", ".a", ".lib", ".class", ".pyc", ".pyo", ".wasm",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".wav", ".ogg", ".mov", ".avi", ".webm",
+    ".sqlite", ".db", ".pkl", ".npy", ".npz", ".parquet", ".h5", ".onnx", ".pt", ".bin",
+}
+
+# Why a path was left out, in the order they are checked
+SKIP_REASONS = ("ignored", "excluded_dir", "vendored", "generated", "symlink", "binary", "too_large")
+
+
+@dataclass
+class WalkResult:
+    files: list = field(default_factory=list)
+    # reason -> relative paths; directories end with "/" and stand for everything below them
+    skipped: dict = field(default_factory=dict)
+
+    def skip(self, reason, path):
+        self.skipped.setdefault(reason, []).append(path)
+
+
+# -----------------------------
+# Rules
+# -----------------------------
+def _matches(rel_path, patterns):
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel_path if "/" in p else name, p) for p in patterns)
+
+
+def excluded_dir(rel_path):
+    """The first directory of `rel_path` in SKIP_DIRS, as "a/node_modules/", or None."""
+    parts = rel_path.split("/")[:-1]
+    for i, part in enumerate(parts):
+        if part in SKIP_DIRS:
+            return "/".join(parts[: i + 1]) + "/"
+    return None
+
+
+def is_binary(path):
+    """Sniff the first bytes: a NUL byte, invalid UTF-8 that is mostly control bytes, or a known binary suffix."""
+    if Path(path).suffix.lower() in BINARY_SUFFIXES:
+        return True
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return False
+    if b"\0" in head:
+        return True
+    try:
+        # Incremental, so a character cut off at the end of the sample is not an error
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return False
+    except UnicodeDecodeError:
+        # Latin-1 and similar encodings are still text
+        control = sum(1 for b in head if b < 32 and b not in (9, 10, 12, 13))
+        return control > len(head) * 0.1
+
+
+def _git(checkout, args, stdin=None):
+    result = subprocess.run(
+        ["git", "-C", str(checkout), *args], input=stdin, capture_output=True
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def _linguist_attributes(checkout, rel_paths):
+    """{path: {"linguist-vendored": value, "linguist-generated": value}} from .gitattributes."""
+    output = _git(
+        checkout,
+        ["check-attr", "-z", "--stdin", "linguist-vendored", "linguist-generated"],
+        stdin="\0".join(rel_paths).encode() + b"\0",
+    )
+    attributes = {}
+    if not output:
+        return attributes
+    fields = output.decode("utf-8", errors="replace").split("\0")
+    for path, attribute, value in zip(fields[0::3], fields[1::3], fields[2::3]):
+        if value != "unspecified":
+            attributes.setdefault(path, {})[attribute] = value
+    return attributes
+
+
+def _attribute_rule(values, attribute):
+    # True for "set"/"true", False for "unset"/"false", None when .gitattributes says nothing
+    value = values.get(attribute)
+    if value is None:
+        return None
+    return value not in ("unset", "false")
+
+
+def _has_gitattributes(checkout, rel_paths):
+    return (Path(checkout) / ".git" / "info" / "attributes").exists() or any(
+        p.rsplit("/", 1)[-1] == ".gitattributes" for p in rel_paths
+    )
+
+
+# -----------------------------
+# Walking
+# -----------------------------
+def filter_paths(checkout, rel_paths, max_file_bytes=MAX_FILE_BYTES, check_ignored=True):
+    """Sort `rel_paths` into kept files and skipped ones. Missing paths and directories are dropped."""
+    checkout = Path(checkout)
+    result = WalkResult()
+    rel_paths = sorted(set(rel_paths))
+
+    if check_ignored and rel_paths:
+        output = _git(checkout, ["check-ignore", "-z", "--stdin"], stdin="\0".join(rel_paths).encode() + b"\0")
+        ignored = set(output.decode("utf-8", errors="replace").split("\0")) - {""} if output else set()
+    else:
+        ignored = set()
+    attributes = _linguist_attributes(checkout, rel_paths) if _has_gitattributes(checkout, rel_paths) else {}
+    excluded_dirs = set()
+
+    for rel_path in rel_paths:
+        if rel_path in ignored:
+            result.skip("ignored", rel_path)
+            continue
+        directory = excluded_dir(rel_path)
+        if directory is not None:
+            # One entry per directory, not one per file in it
+            if directory not in excluded_dirs:
+                excluded_dirs.add(directory)
+                result.skip("excluded_dir", directory)
+            continue
+
+        values = attributes.get(rel_path, {})
+        vendored = _attribute_rule(values, "linguist-vendored")
+        if vendored or (vendored is None and _matches(rel_path, VENDORED_PATTERNS)):
+            result.skip("vendored", rel_path)
+            continue
+        generated = _attribute_rule(values, "linguist-generated")
+        if generated or (generated is None and _matches(rel_path, GENERATED_PATTERNS)):
+            result.skip("generated", rel_path)
+            continue
+
+        path = checkout / rel_path
+        if path.is_symlink():
+            result.skip("symlink", rel_path)
+            continue
+        if not path.is_file():
+            continue
+        size = path.stat().st_size
+        # Binary first: a big binary must not pass for a big text file that ranged reads may serve
+        if is_binary(path):
+            result.skip("binary", rel_path)
+        elif size > max_file_bytes:
+            result.skip("too_large", rel_path)
+        else:
+            result.files.append((rel_path, size))
+    return result
+
+
+def _walk_filesystem(checkout):
+    # Only for directories that are not git checkouts: no .gitignore support
+    paths = []
+    for root, dirs, names in os.walk(checkout):
+        rel_root = Path(root).relative_to(checkout)
+        # Skipped directories are not entered; "node_modules/" stands for all of it
+        paths += [(rel_root / d).as_posix() + "/" for d in dirs if d in SKIP_DIRS and d != ".git"]
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        paths += [(rel_root / name).as_posix() for name in names]
+    return paths
+
+
+def walk_repository(checkout, max_file_bytes=MAX_FILE_BYTES):
+    """List the files of `checkout` worth analyzing, and what was skipped and why.
+
+    Git decides what is ignored (every .gitignore, .git/info/exclude and the global
+    excludes file), so the rules match what `git status` shows.
+    """
+    checkout = Path(checkout)
+    output = _git(checkout, ["ls-files", "-z", "--cached", "--others", "--exclude-standard"])
+    if output is None:
+        return filter_paths(checkout, _walk_filesystem(checkout), max_file_bytes, check_ignored=False)
+
+    rel_paths = [p for p in output.decode("utf-8", errors="replace").split("\0") if p]
+    result = filter_paths(checkout, rel_paths, max_file_bytes, check_ignored=False)
+    # Ignored files are not listed at all; --directory folds them into their top directory
+    ignored = _git(checkout, ["ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"])
+    for rel_path in sorted(p for p in (ignored or b"").decode("utf-8", errors="replace").split("\0") if p):
+        result.skip("ignored", rel_path)
+    return result
+
+
+def files_under(checkout, directories):
+    """Files below `directories` ("vendor/", ...) that git would list, never those of a .git directory.
+
+    For scans that must see what the walk leaves out, such as the licenses of vendored code.
+    """
+    checkout = Path(checkout)
+    if not directories:
+        return []
+    output = _git(checkout, ["ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", *directories])
+    if output is not None:
+        paths = [p for p in output.decode("utf-8", errors="replace").split("\0") if p]
+    else:
+        paths = []
+        for directory in directories:
+            for root, dirs, names in os.walk(checkout / directory):
+                dirs[:] = [d for d in dirs if d != ".git"]
+                rel_root = Path(root).relative_to(checkout)
+                paths += [(rel_root / name).as_posix() for name in names]
+    return sorted(p for p in set(paths) if ".git" not in p.split("/")[:-1])
+
+
+def skipped_summary(skipped, examples=10):
+    """Counts and a few example paths per reason, for reports and agent answers."""
+    return {
+        reason: {"count": len(skipped[reason]), "examples": skipped[reason][:examples]}
+        for reason in SKIP_REASONS
+        if skipped.get(reason)
+    }
@@ -0,0 +1,341 @@
+import fnmatch
+import heapq
+import json
+import math
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from uuid import uuid4
+
+from agno.tools import Toolkit
+
+from config import CACHE_DIR, REPO_DIR
+from repo_index import find_checkout, load_index
+from repo_walker import WALKER_VERSION
+
+
+SEARCH_DIR = CACHE_DIR / "search"
+
+# Chunks are windows of lines; the overlap keeps a match near a boundary in one chunk
+CHUNK_LINES = 40
+CHUNK_STEP = 30
+
+MAX_FILE_BYTES = 512 * 1024
+PARALLEL_THRESHOLD = 200
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+IDENTIFIER_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+STOP_WORDS = {
+    "the", "and", "for", "from", "with", "this", "that", "are", "was", "not", "but", "you", "your",
+    "import", "return", "self", "def", "var", "let", "const", "function", "class", "new", "none", "null",
+    "true", "false", "where", "what", "which", "how", "does", "is", "in", "of", "to", "it", "if", "or", "an",
+}
+
+
+# -----------------------------
+# Tokenization
+# -----------------------------
+def _stem(term):
+    # Just enough to match "retry", "retries" and "retrying"
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("es", ""), ("s", "")):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[: -len(suffix)] + replacement
+    return term
+
+
+def tokenize(text):
+    """Lowercased terms of `text`; identifiers also contribute their camelCase and snake_case parts."""
+    terms = []
+    for word in WORD_PATTERN.findall(text):
+        parts = [p for piece in word.split("_") for p in IDENTIFIER_PART.findall(piece)]
+        candidates = [word.lower()] + ([p.lower() for p in parts] if len(parts) > 1 else [])
+        for term in candidates:
+            if len(term) > 1 and term not in STOP_WORDS:
+                terms.append(_stem(term))
+    return terms
+
+
+def _read_text(path):
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    # A NUL byte early on means a binary file
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def chunk_file(item):
+    """Split one file into line windows; returns [(start_line, end_line, {term: count})]."""
+    checkout, path = item
+    text = _read_text(Path(checkout) / path)
+    if not text:
+        return []
+    lines = text.splitlines()
+    # The path itself is searchable, e.g. "retry" finds utils/retry.py
+    path_terms = tokenize(path.replace("/", " ").replace(".", " "))
+    chunks = []
+    for start in range(0, max(len(lines), 1), CHUNK_STEP):
+        window = lines[start:start + CHUNK_LINES]
+        terms = Counter(tokenize("\n".join(window)))
+        terms.update(path_terms)
+        if terms:
+            chunks.append((start + 1, start + len(window), dict(terms)))
+        if start + CHUNK_LINES >= len(lines):
+            break
+    return chunks
+
+
+# -----------------------------
+# Index
+# -----------------------------
+def index_paths(sha, directory=SEARCH_DIR):
+    # Built from the repository index's file list, so the walker's rules are part of the key
+    name = f"{sha}.v{WALKER_VERSION}"
+    return directory / f"{name}.json", directory / f"{name}.postings"
+
+
+class SearchIndex:
+    """BM25 over line chunks. Postings are two flat arrays (chunk ids and term counts);
+    every term points at its slice of them."""
+
+    def __init__(self, sha, files, chunks, terms, doc_ids, counts):
+        self.sha = sha
+        # Relative paths; chunks refer to them by position
+        self.files = files
+        # Flat array of (file, start_line, end_line, length) per chunk
+        self.chunks = chunks
+        # term -> (offset, document frequency) into doc_ids / counts
+        self.terms = terms
+        self.doc_ids = doc_ids
+        self.counts = counts
+        self.chunk_count = len(chunks) // 4
+        self.avg_length = (sum(chunks[3::4]) / self.chunk_count) if self.chunk_count else 0.0
+
+    @classmethod
+    def from_chunks(cls, sha, file_chunks):
+        """Build from {path: [(start, end, {term: count})]}."""
+        files = sorted(file_chunks)
+        chunks = array("I")
+        postings = {}
+        for file_id, path in enumerate(files):
+            for start, end, terms in file_chunks[path]:
+                chunk_id = len(chunks) // 4
+                chunks.extend((file_id, start, end, sum(terms.values())))
+                for term, count in terms.items():
+                    postings.setdefault(term, []).append((chunk_id, count))
+        terms, doc_ids, counts = {}, array("I"), array("I")
+        for term in sorted(postings):
+            entries = postings[term]
+            terms[term] = (len(doc_ids), len(entries))
+            doc_ids.extend(chunk_id for chunk_id, _ in entries)
+            counts.extend(count for _, count in entries)
+        return cls(sha, files, chunks, terms, doc_ids, counts)
+
+    def file_chunks(self, exclude=()):
+        """Invert the postings back to {path: [(start, end, {term: count})]}, without re-reading files."""
+        per_chunk = {}
+        for term, (offset, df) in self.terms.items():
+            for i in range(offset, offset + df):
+                per_chunk.setdefault(self.doc_ids[i], {})[term] = self.counts[i]
+        result = {}
+        for chunk_id in range(self.chunk_count):
+            file_id, start, end, _ = self.chunks[4 * chunk_id:4 * chunk_id + 4]
+            path = self.files[file_id]
+            if path not in exclude:
+                result.setdefault(path, []).append((start, end, per_chunk.get(chunk_id, {})))
+        return result
+
+    def search(self, query, limit=5, path_filter=None):
+        """Top `limit` chunks as (score, path, start_line, end_line)."""
+        scores = Counter()
+        # Filter before ranking, so matches elsewhere cannot crowd the wanted paths out of the top k
+        allowed = None
+        if path_filter:
+            allowed = {file_id for file_id, path in enumerate(self.files) if path_filter(path)}
+            if not allowed:
+                return []
+        for term in set(tokenize(query)):
+            if term not in self.terms:
+                continue
+            offset, df = self.terms[term]
+            idf = math.log(1 + (self.chunk_count - df + 0.5) / (df + 0.5))
+            for i in range(offset, offset + df):
+                chunk_id = self.doc_ids[i]
+                if allowed is not None and self.chunks[4 * chunk_id] not in allowed:
+                    continue
+                tf = self.counts[i]
+                length = self.chunks[4 * chunk_id + 3]
+                norm = K1 * (1 - B + B * length / self.avg_length)
+                scores[chunk_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        results = []
+        for chunk_id, score in heapq.nlargest(limit * 4, scores.items(), key=lambda kv: kv[1]):
+            file_id, start, end, _ = self.chunks[4 * chunk_id:4 * chunk_id + 4]
+            path = self.files[file_id]
+            # Overlapping windows of one file often both match; keep the better one
+            if any(p == path and s <= end and start <= e for _, p, s, e in results):
+                continue
+            results.append((round(score, 3), path, start, end))
+            if len(results) == limit:
+                break
+        return results
+
+    def save(self, directory=SEARCH_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_file, postings_file = index_paths(self.sha, directory)
+        # Concurrent agents may build the same index, so each writer gets its own temp files
+        suffix = f".{uuid4().hex}.tmp"
+        tmp_postings = postings_file.with_name(postings_file.name + suffix)
+        with open(tmp_postings, "wb") as f:
+            self.chunks.tofile(f)
+            self.doc_ids.tofile(f)
+            self.counts.tofile(f)
+        tmp_meta = meta_file.with_name(meta_file.name + suffix)
+        tmp_meta.write_text(json.dumps({
+            "sha": self.sha,
+            "files": self.files,
+            "chunks": len(self.chunks),
+            "postings": len(self.doc_ids),
+            "terms": self.terms,
+        }))
+        # Postings first: a metadata file is only ever visible next to its postings
+        tmp_postings.replace(postings_file)
+        tmp_meta.replace(meta_file)
+
+    @classmethod
+    def load(cls, sha, directory=SEARCH_DIR):
+        meta_file, postings_file = index_paths(sha, directory)
+        if not meta_file.exists() or not postings_file.exists():
+            return None
+        meta = json.loads(meta_file.read_text())
+        chunks, doc_ids, counts = array("I"), array("I"), array("I")
+        with open(postings_file, "rb") as f:
+            chunks.fromfile(f, meta["chunks"])
+            doc_ids.fromfile(f, meta["postings"])
+            counts.fromfile(f, meta["postings"])
+        terms = {term: tuple(entry) for term, entry in meta["terms"].items()}
+        return cls(meta["sha"], meta["files"], chunks, terms, doc_ids, counts)
+
+
+def _searchable(index):
+    # Vendored, generated and binary files are already left out of the repository index
+    return [path for path, size in index["files"] if size <= MAX_FILE_BYTES]
+
+
+def chunk_files(checkout, files, max_workers=None):
+    items = [(str(checkout), path) for path in files]
+    if len(items) < PARALLEL_THRESHOLD:
+        results = map(chunk_file, items)
+        return {path: chunks for (_, path), chunks in zip(items, results) if chunks}
+    # Spawned: a fork of the threaded server could inherit a lock held by another thread
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        results = pool.map(chunk_file, items, chunksize=32)
+        return {path: chunks for (_, path), chunks in zip(items, results) if chunks}
+
+
+# In-process copies of the last few commits, so repeated searches do not reload the postings
+MAX_LOADED_COMMITS = 4
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def _cached(sha):
+    with _loaded_lock:
+        search_index = _loaded.get(sha)
+        if search_index is not None:
+            _loaded.move_to_end(sha)
+        return search_index
+
+
+def _remember(search_index):
+    with _loaded_lock:
+        _loaded[search_index.sha] = search_index
+        _loaded.move_to_end(search_index.sha)
+        while len(_loaded) > MAX_LOADED_COMMITS:
+            _loaded.popitem(last=False)
+    return search_index
+
+
+def load_search_index(checkout, rebuild=False):
+    """Return the search index for `checkout`, built once per commit."""
+    index = load_index(checkout)
+    sha = index["sha"]
+    if sha and not rebuild:
+        search_index = _cached(sha) or SearchIndex.load(sha)
+        if search_index is not None:
+            return _remember(search_index)
+
+    search_index = SearchIndex.from_chunks(sha, chunk_files(checkout, _searchable(index)))
+    if sha:
+        search_index.save()
+        _remember(search_index)
+    return search_index
+
+
+def update_search_index(checkout, old_sha, changed_paths):
+    """Carry the chunks of unchanged files over from `old_sha`; re-read only changed files.
+
+    Returns None when there is no index for `old_sha` to start from.
+    """
+    previous = _cached(old_sha) or SearchIndex.load(old_sha)
+    if previous is None:
+        return None
+    index = load_index(checkout)
+    changed = set(changed_paths)
+    file_chunks = previous.file_chunks(exclude=changed)
+    file_chunks.update(chunk_files(checkout, [path for path in _searchable(index) if path in changed]))
+    search_index = SearchIndex.from_chunks(index["sha"], file_chunks)
+    search_index.save()
+    return _remember(search_index)
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class SearchIndexTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, max_snippet_lines=CHUNK_LINES, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        self.max_snippet_lines = max_snippet_lines
+        super().__init__(
+            name="search_index_tools",
+            tools=[self.search_repo],
+            **kwargs,
+        )
+
+    def search_repo(self, query: str, limit: int = 5, path: str | None = None) -> str:
+        """Full-text search over the cloned repository, ranked by relevance (BM25).
+        Returns the best matching snippets with file and line range, so you can answer
+        questions like "where is the retry logic?" without opening whole files.
+
+        Args:
+            query (str): Words to look for, e.g. "retry backoff" or "database connection".
+            limit (int): Number of snippets to return.
+            path (str | None): Optional glob pattern restricting the files, e.g. "src/*".
+
+        Returns:
+            str: JSON list of matches with file, line range, score and snippet.
+        """
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return "No cloned repository found."
+        search_index = load_search_index(checkout)
+        path_filter = (lambda p: fnmatch.fnmatch(p, path)) if path else None
+        matches = []
+        for score, file, start, end in search_index.search(query, limit=limit, path_filter=path_filter):
+            text = _read_text(checkout / file) or ""
+            lines = text.splitlines()[start - 1:min(end, start - 1 + self.max_snippet_lines)]
+            matches.append({"file": file, "lines": f"{start}-{end}", "score": score, "snippet": "\n".join(lines)})
+        if not matches:
+            return json.dumps({"matches": [], "hint": "No match; try other words or find_files."})
+        return json.dumps({"matches": matches}, indent=2)
@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+from config import DB_FILE
+
+
+BUSY_TIMEOUT_SECONDS = 30
+# Connections the agno session store keeps open; more concurrent runs wait for one
+POOL_SIZE = 8
+POOL_OVERFLOW = 8
+
+# Applied to every new connection. WAL lets readers run next to the writer, and
+# NORMAL only syncs at checkpoints, which WAL keeps safe against corruption.
+PRAGMAS = (
+    # Only takes effect on a new, empty database; older files switch on their first VACUUM
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}",
+    "PRAGMA temp_store = MEMORY",
+)
+
+SESSION_TABLE = "session_table"
+
+# Lookups agno and the UI make besides the session_id primary key, plus the
+# column pruning scans. agno creates the table on first use, so these are
+# added by `ensure_indexes` once it exists.
+SESSION_INDEXES = {
+    "idx_session_table_agent": "(agent_id, updated_at)",
+    "idx_session_table_team": "(team_id, updated_at)",
+    "idx_session_table_user": "(user_id, updated_at)",
+    "idx_session_table_updated": "(updated_at)",
+}
+
+# Rows recorded for one conversation: (table, time column or None). They are
+# dropped together once the conversation is stale.
+SESSION_SCOPED_TABLES = (
+    ("memory_turns", "created_at"),
+    ("memory_summaries", None),
+    ("memory_pins", "created_at"),
+    ("readme_sections", "updated_at"),
+    ("readme_edits", "created_at"),
+    ("jobs", "created_at"),
+)
+
+# Rows that belong to a row of another table: (table, column, parent table, parent column)
+CHILD_TABLES = (
+    ("job_events", "job_id", "jobs", "id"),
+)
+
+# Append-only logs and caches that are cheap to rebuild: (table, time column, policy field)
+AGED_TABLES = (
+    ("agent_metrics", "started_at", "log_days"),
+    ("routing_log", "created_at", "log_days"),
+    ("agent_cache", "last_used_at", "cache_days"),
+    ("summary_cache", "created_at", "cache_days"),
+    ("code_metrics", "created_at", "cache_days"),
+)
+
+MAINTENANCE_INTERVAL_SECONDS = 24 * 3600
+# Free pages are returned to the file system once they are this share of the file
+VACUUM_FREE_RATIO = 0.2
+
+
+@dataclass
+class RetentionPolicy:
+    # Conversations untouched for this long go, with everything recorded for them
+    session_days: float = float(os.environ.get("REPOSCRIBE_SESSION_RETENTION_DAYS", 30))
+    # Per-run metrics and routing decisions
+    log_days: float = 90
+    # Result, summary and metrics caches, which are rebuilt on demand
+    cache_days: float = 90
+
+
+# -----------------------------
+# Connections
+# -----------------------------
+def configure(conn):
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_local = threading.local()
+
+
+def connect(db_file=DB_FILE):
+    """A connection to `db_file` for the calling thread, opened and configured once.
+
+    Stores use it as `with connect(...) as conn:`, which commits or rolls back
+    but leaves the connection open for the thread's next call.
+    """
+    key = (os.getpid(), os.path.abspath(db_file))
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = configure(sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_SECONDS))
+    return conn
+
+
+@cache
+def get_engine(db_file=DB_FILE):
+    """Pooled SQLAlchemy engine for agno's SqliteDb, one per database file and process."""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import QueuePool
+
+    engine = create_engine(
+        f"sqlite:///{Path(db_file).resolve()}",
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_OVERFLOW,
+        connect_args={"timeout": BUSY_TIMEOUT_SECONDS, "check_same_thread": False},
+    )
+    event.listen(engine, "connect", lambda dbapi_connection, _: configure(dbapi_connection))
+    return engine
+
+
+def thread_safe(db):
+    """Serialize table lookups of an agno SqliteDb shared by concurrent runs.
+
+    SqliteDb reflects its tables into a shared MetaData on first use; a second
+    thread arriving meanwhile gets the half-built Table and fails on its columns.
+    Creating a table looks up the versions table, hence the reentrant lock.
+    """
+    lock = threading.RLock()
+    lookup = db._get_or_create_table
+
+    def locked(*args, **kwargs):
+        with lock:
+            return lookup(*args, **kwargs)
+
+    db._get_or_create_table = locked
+    return db
+
+
+# -----------------------------
+# Maintenance
+# -----------------------------
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def ensure_indexes(conn):
+    if SESSION_TABLE in _tables(conn):
+        for name, columns in SESSION_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {SESSION_TABLE} {columns}")
+
+
+def prune(conn, policy=None, now=None):
+    """Delete stale conversations and expired log and cache rows; returns rows deleted per table."""
+    policy = policy or RetentionPolicy()
+    now = now or time.time()
+    tables = _tables(conn)
+    deleted = {}
+
+    session_cutoff = now - policy.session_days * 86400
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS stale_sessions (session_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM stale_sessions")
+    live = ""
+    if SESSION_TABLE in tables:
+        # agno stores whole seconds
+        conn.execute(
+            f"INSERT OR IGNORE INTO stale_sessions SELECT session_id FROM {SESSION_TABLE} "
+            "WHERE COALESCE(updated_at, created_at) < ?",
+            (int(session_cutoff),),
+        )
+        live = (
+            f"AND session_id NOT IN (SELECT session_id FROM {SESSION_TABLE} "
+            f"WHERE COALESCE(updated_at, created_at) >= {int(session_cutoff)})"
+        )
+    # Conversations run without an agno session (flows, the benchmark) only have their own
+    # rows, and are stale once the newest of them is
+    activity = [
+        f"SELECT session_id, {column} AS at FROM {table}"
+        for table, column in SESSION_SCOPED_TABLES
+        if table in tables and column
+    ]
+    if activity:
+        conn.execute(
+            "INSERT OR IGNORE INTO stale_sessions SELECT session_id FROM "
+            f"({' UNION ALL '.join(activity)}) WHERE session_id IS NOT NULL {live} "
+            "GROUP BY session_id HAVING MAX(at) < ?",
+            (session_cutoff,),
+        )
+    for table, _ in SESSION_SCOPED_TABLES:
+        if table in tables:
+            deleted[table] = deleted.get(table, 0) + conn.execute(
+                f"DELETE FROM {table} WHERE session_id IN (SELECT session_id FROM stale_sessions)"
+            ).rowcount
+    for table, column, parent, parent_column in CHILD_TABLES:
+        if table in tables and parent in tables:
+            deleted[table] = conn.execute(
+                f"DELETE FROM {table} WHERE {column} NOT IN (SELECT {parent_column} FROM {parent})"
+            ).rowcount
+    if SESSION_TABLE in tables:
+        deleted[SESSION_TABLE] = conn.execute(
+            f"DELETE FROM {SESSION_TABLE} WHERE session_id IN (SELECT session_id FROM stale_sessions)"
+        ).rowcount
+
+    for table, column, field in AGED_TABLES:
+        if table in tables:
+            cutoff = now - getattr(policy, field) * 86400
+            deleted[table] = deleted.get(table, 0) + conn.execute(
+                f"DELETE FROM {table} WHERE {column} < ?", (cutoff,)
+            ).rowcount
+    return {table: count for table, count in deleted.items() if count}
+
+
+def compact(conn):
+    """Move the WAL into the database and give free pages back; returns the bytes released."""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        # Frees one page per step, so it has to be read to the end
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    elif pages and free / pages >= VACUUM_FREE_RATIO:
+        # Rewrites the file once; auto_vacuum (set on connect) applies from then on
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return (pages - conn.execute("PRAGMA page_count").fetchone()[0]) * page_size
+
+
+def maintain(db_file=DB_FILE, policy=None, force=False):
+    """Indexes, pruning and compaction, at most once per MAINTENANCE_INTERVAL_SECONDS unless `force`."""
+    # Autocommit, so VACUUM does not run inside a transaction
+    conn = configure(sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None))
+    try:
+        ensure_indexes(conn)
+        conn.execute("CREATE TABLE IF NOT EXISTS storage_maintenance (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+        row = conn.execute("SELECT value FROM storage_maintenance WHERE name = 'last_run'").fetchone()
+        if not force and row and time.time() - row[0] < MAINTENANCE_INTERVAL_SECONDS:
+            return None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = prune(conn, policy)
+            conn.execute(
+                "INSERT OR REPLACE INTO storage_maintenance (name, value) VALUES ('last_run', ?)", (time.time(),)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        try:
+            released = compact(conn)
+        except sqlite3.OperationalError:
+            # Busy with a long-running reader; the next maintenance retries
+            released = 0
+        return {"deleted": deleted, "released_bytes": released}
+    finally:
+        conn.close()
+
+
+def start_maintenance(db_file=DB_FILE, policy=None):
+    """Run `maintain` in a background thread, so opening the database stays cheap."""
+
+    def run():
+        try:
+            maintain(db_file, policy)
+        except sqlite3.Error:
+            pass
+
+    thread = threading.Thread(target=run, name="storage-maintenance", daemon=True)
+    thread.start()
+    return thread
+
+
+# -----------------------------
+# Micro-benchmark
+# -----------------------------
+# One agno session row: run history as JSON, rewritten on every turn
+SESSION_PAYLOAD = json.dumps({"runs": [{"content": "x" * 400, "messages": ["y" * 200] * 8}] * 4})
+
+
+def _bench_schema(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bench_sessions (session_id TEXT PRIMARY KEY, runs TEXT, updated_at REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bench_turns (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, answer TEXT)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bench_turns_session ON bench_turns (session_id, id)")
+
+
+def _untuned_connect(db_file):
+    # How the stores connected before: a fresh connection per call, rollback journal
+    return sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_SECONDS)
+
+
+def run_storage_benchmark(writers, seconds, tuned, directory):
+    from instrumentation import percentile
+
+    db_file = str(Path(directory) / f"{'tuned' if tuned else 'untuned'}-{writers}.db")
+    open_connection = connect if tuned else _untuned_connect
+    with open_connection(db_file) as conn:
+        _bench_schema(conn)
+    write_latency, read_latency, errors = [], [], []
+    stop = time.perf_counter() + seconds
+
+    def writer(number):
+        session_id = f"session-{number}"
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            try:
+                with open_connection(db_file) as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO bench_sessions (session_id, runs, updated_at) VALUES (?, ?, ?)",
+                        (session_id, SESSION_PAYLOAD, time.time()),
+                    )
+                    conn.execute("INSERT INTO bench_turns (session_id, answer) VALUES (?, ?)", (session_id, "z" * 800))
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            write_latency.append(time.perf_counter() - started)
+
+    def reader():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            try:
+                with open_connection(db_file) as conn:
+                    conn.execute("SELECT runs FROM bench_sessions WHERE session_id = 'session-0'").fetchone()
+                    conn.execute(
+                        "SELECT answer FROM bench_turns WHERE session_id = 'session-0' ORDER BY id DESC LIMIT 3"
+                    ).fetchall()
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            read_latency.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    threads.append(threading.Thread(target=reader))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    def ms(values, q):
+        value = percentile(values, q)
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "storage": "tuned" if tuned else "untuned",
+        "writers": writers,
+        "writes_per_second": round(len(write_latency) / seconds, 1),
+        "write_p50_ms": ms(write_latency, 0.5),
+        "write_p95_ms": ms(write_latency, 0.95),
+        "write_p99_ms": ms(write_latency, 0.99),
+        "reads_per_second": round(len(read_latency) / seconds, 1),
+        "read_p50_ms": ms(read_latency, 0.5),
+        "read_p95_ms": ms(read_latency, 0.95),
+        "errors": len(errors),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain memory.db, or benchmark the storage settings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    maintain_parser = commands.add_parser("maintain", help="Add indexes, prune stale rows and compact now")
+    maintain_parser.add_argument("--session-days", type=float, default=RetentionPolicy.session_days)
+    bench_parser = commands.add_parser("bench", help="Write/read latency under concurrent writers")
+    bench_parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    bench_parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.command == "maintain":
+        print(json.dumps(maintain(policy=RetentionPolicy(session_days=args.session_days), force=True), indent=2))
+    else:
+        directory = tempfile.mkdtemp(prefix="reposcribe-storage-")
+        try:
+            results = [
+                run_storage_benchmark(writers, args.seconds, tuned, directory)
+                for writers in args.writers
+                for tuned in (False, True)
+            ]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        columns = ["storage", "writers", "writes_per_second", "write_p50_ms", "write_p95_ms", "write_p99_ms",
+                   "reads_per_second", "read_p50_ms", "read_p95_ms", "errors"]
+        print("  ".join(columns))
+        for result in results:
+            print("  ".join(f"{str(result[column]):>{len(column)}}" for column in columns))
@@ -0,0 +1,196 @@
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List
+
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+
+
+CHARS_PER_TOKEN = 4
+
+# Tools the stub may call, in order of preference. Anything that reaches the
+# network or runs commands (web search, shell, python) is never called.
+SAFE_TOOLS = [
+    "clone_repository",
+    "get_repo_overview",
+    "get_interface_summary",
+    "list_declared_dependencies",
+    "summarize_repository",
+    "find_files",
+    "query_symbols",
+    "list_files",
+    "edit_readme_section",
+    "render_readme",
+]
+
+URL_PATTERN = re.compile(r"(?:https?|file)://\S+")
+MEMBER_ID_PATTERN = re.compile(r"^\s*-\s*ID:\s*(\S+)\s*$", re.MULTILINE)
+WORD_PATTERN = re.compile(r"[a-z]+")
+SECTION_PATTERN = re.compile(r"\bthe ([\w &]+?) section\b", re.IGNORECASE)
+
+
+# Shared by every copy of the model, since agno copies models between runs
+_stats_lock = threading.Lock()
+STATS = {"model_calls": 0, "tool_calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+
+def reset_stats():
+    with _stats_lock:
+        for key in STATS:
+            STATS[key] = 0
+
+
+def _record(**counts):
+    with _stats_lock:
+        for key, value in counts.items():
+            STATS[key] += value
+
+
+def _tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _text(message):
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, default=str) if content else ""
+
+
+def _stem(word):
+    return word[:4]
+
+
+def pick_member(member_ids, task):
+    """Delegate to the member whose id shares the most word stems with the task."""
+    task_stems = {_stem(w) for w in WORD_PATTERN.findall(task.lower()) if len(w) > 2}
+
+    def score(member_id):
+        words = [w for w in member_id.split("-") if w not in ("agent", "team")]
+        return sum(_stem(w) in task_stems for w in words)
+
+    return max(member_ids, key=score)
+
+
+@dataclass
+class StubModel(Model):
+    """Deterministic offline stand-in for a chat model.
+
+    On a user turn it calls at most one safe tool (or delegates once when it leads
+    a team); once it has a tool result it answers with a digest of the results.
+    Token counts are estimated from message sizes, so runs are reproducible.
+    """
+
+    id: str = "stub-model"
+    name: str = "StubModel"
+    provider: str = "Stub"
+    # Simulated model latency per call, in seconds
+    delay: float = 0.0
+
+    def _respond(self, messages: List[Message], tools=None):
+        if self.delay:
+            time.sleep(self.delay)
+        prompt = "".join(_text(m) for m in messages) + json.dumps(tools or [], default=str)
+        response = ModelResponse(role="assistant")
+
+        last = messages[-1] if messages else None
+        tool_call = None
+        if last is not None and last.role != "tool":
+            tool_call = self._tool_call(messages, tools or [], _text(last))
+
+        if tool_call is not None:
+            response.tool_calls = [tool_call]
+            output = json.dumps(tool_call)
+        else:
+            response.content = self._answer(messages)
+            output = response.content
+
+        input_tokens, output_tokens = _tokens(prompt), _tokens(output)
+        response.response_usage = Metrics(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+        _record(
+            model_calls=1,
+            tool_calls=1 if tool_call else 0,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
+        return response
+
+    def _tool_call(self, messages, tools, request):
+        names = {t.get("function", {}).get("name"): t.get("function", {}) for t in tools}
+        arguments = None
+
+        if "delegate_task_to_member" in names:
+            system = "".join(_text(m) for m in messages if m.role == "system")
+            member_ids = MEMBER_ID_PATTERN.findall(system)
+            if member_ids:
+                name = "delegate_task_to_member"
+                arguments = {"member_id": pick_member(member_ids, request), "task": request}
+
+        if arguments is None:
+            url = URL_PATTERN.search(request)
+            section = SECTION_PATTERN.search(request)
+            values = {"url": url.group(0) if url else None, "pattern": "*", "path": ".", "kind": "route"}
+            if section:
+                values.update(section=section.group(1), instruction=request)
+            for name in SAFE_TOOLS:
+                if name not in names:
+                    continue
+                required = names[name].get("parameters", {}).get("required", [])
+                if all(values.get(param) for param in required):
+                    arguments = {param: values[param] for param in required}
+                    break
+
+        if arguments is None:
+            return None
+        return {
+            "id": f"call_{len(messages)}_{name}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+
+    def _answer(self, messages):
+        results = [_text(m) for m in messages if m.role == "tool"][-3:]
+        request = next((_text(m) for m in reversed(messages) if m.role == "user"), "")
+        body = "\n\n".join(result[:1500] for result in results) or request[:500]
+        return f"## Findings\n\n{body}\n"
+
+    def invoke(self, messages: List[Message], assistant_message: Message, tools=None, **kwargs) -> ModelResponse:
+        assistant_message.metrics.start_timer()
+        response = self._respond(messages, tools)
+        assistant_message.metrics.stop_timer()
+        return response
+
+    async def ainvoke(self, messages: List[Message], assistant_message: Message, tools=None, **kwargs) -> ModelResponse:
+        return self.invoke(messages, assistant_message, tools=tools, **kwargs)
+
+    def invoke_stream(
+        self, messages: List[Message], assistant_message: Message, tools=None, **kwargs
+    ) -> Iterator[ModelResponse]:
+        response = self.invoke(messages, assistant_message, tools=tools, **kwargs)
+        if response.tool_calls or not response.content:
+            yield response
+            return
+        # Stream answers a line at a time, with usage on the last delta
+        lines = response.content.splitlines(keepends=True)
+        for line in lines[:-1]:
+            yield ModelResponse(role="assistant", content=line)
+        yield ModelResponse(role="assistant", content=lines[-1], response_usage=response.response_usage)
+
+    async def ainvoke_stream(
+        self, messages: List[Message], assistant_message: Message, tools=None, **kwargs
+    ) -> AsyncIterator[ModelResponse]:
+        for response in self.invoke_stream(messages, assistant_message, tools=tools, **kwargs):
+            yield response
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
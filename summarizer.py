@@ -0,0 +1,405 @@
+import difflib
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from agno.agent import Agent
+from agno.run.base import RunStatus
+from agno.tools import Toolkit
+
+from config import DB_FILE, REPO_DIR
+from repo_index import LANGUAGES, find_checkout, load_index
+from storage import connect
+
+
+# Rough budget per model call; ~4 characters per token for source code
+CHUNK_TOKENS = 6000
+CHARS_PER_TOKEN = 4
+MAX_WORKERS = 4
+# Reduce rounds before the remaining summaries are cut to fit one prompt
+MAX_REDUCE_ROUNDS = 4
+
+# Files above this size are almost always generated, bundled or data
+MAX_FILE_BYTES = 512 * 1024
+
+FILE_HEADER = re.compile(r"^=== (.+?) ===\s*$", re.MULTILINE)
+
+SUMMARIZER_INSTRUCTIONS = [
+    "You summarize source code for documentation writers.",
+    "Describe what the code does, its public functions, classes, routes, CLI commands and "
+    "environment variables, based strictly on the code shown.",
+    "Do not speculate about behavior that is not visible in the code.",
+    "Keep every summary under 120 words.",
+]
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+# -----------------------------
+# Summary cache
+# -----------------------------
+class SummaryCache:
+    """Summaries keyed by the hash of whatever was summarized, stored in SQLite."""
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = str(db_file)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    hash TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_created ON summary_cache (created_at)")
+
+    def _connect(self):
+        return connect(self.db_file)
+
+    def get_many(self, hashes):
+        hashes = list(hashes)
+        found = {}
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT hash, summary FROM summary_cache WHERE hash IN ({placeholders})", batch
+                )
+                found.update(rows.fetchall())
+        return found
+
+    def put_many(self, kind, summaries):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO summary_cache (hash, kind, summary, created_at) VALUES (?, ?, ?, ?)",
+                [(digest, kind, summary, now) for digest, summary in summaries.items()],
+            )
+
+
+# -----------------------------
+# Map step: files -> chunks -> file summaries
+# -----------------------------
+def _split_large(path, text, budget_chars):
+    parts, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if size + len(line) > budget_chars and current:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line[:budget_chars])
+        size += len(current[-1])
+    if current:
+        parts.append("".join(current))
+    return [(f"{path} (part {i + 1}/{len(parts)})", part) for i, part in enumerate(parts)]
+
+
+def build_chunks(files, budget_tokens=CHUNK_TOKENS):
+    """Pack (path, text) pairs into chunks that each fit in `budget_tokens`.
+
+    Small files share a chunk; files larger than the budget are split by lines
+    and each part gets a chunk of its own.
+    """
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for path, text in files:
+        if len(text) > budget_chars:
+            chunks.extend([[part] for part in _split_large(path, text, budget_chars)])
+            continue
+        if size + len(text) > budget_chars and current:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((path, text))
+        size += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _part_number(label):
+    return int(label.rsplit("(part ", 1)[1].split("/", 1)[0])
+
+
+def _part_count(label):
+    return int(label.rsplit("/", 1)[1].rstrip(")"))
+
+
+def _chunk_prompt(chunk):
+    body = "\n\n".join(f"=== {path} ===\n{text}" for path, text in chunk)
+    return (
+        "Summarize each file below. Answer with one section per file, starting every section "
+        "with the exact header line '=== <path> ===' used in the input.\n\n" + body
+    )
+
+
+def parse_chunk_summary(response, chunk):
+    """Split a chunk response back into {label: summary} using the file headers."""
+    labels = {label for label, _ in chunk}
+    if len(chunk) == 1:
+        label = chunk[0][0]
+        return {label: FILE_HEADER.sub("", response).strip()}
+    sections = {}
+    matches = list(FILE_HEADER.finditer(response))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        label = match.group(1).strip()
+        if label in labels:
+            sections[label] = response[match.end():end].strip()
+    return sections
+
+
+# -----------------------------
+# Reduce step: file summaries -> directory summaries -> repo summary
+# -----------------------------
+def _reduce_prompt(name, entries):
+    body = "\n\n".join(f"- {label}: {summary}" for label, summary in entries)
+    return (
+        f"Combine these summaries of the contents of '{name}' into a single summary of at most "
+        "200 words. Keep public interfaces, entry points and configuration; drop detail.\n\n" + body
+    )
+
+
+class RepoSummarizer:
+    def __init__(self, summarize, cache=None, budget_tokens=CHUNK_TOKENS, max_workers=MAX_WORKERS):
+        # `summarize` takes a prompt and returns the model's text
+        self.summarize = summarize
+        self.cache = cache or SummaryCache()
+        self.budget_tokens = budget_tokens
+        self.max_workers = max_workers
+        self.stats = {}
+
+    def _parallel(self, prompts):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(self.summarize, prompts))
+
+    def _summarize_chunks(self, chunks):
+        parts = {}
+        for chunk, response in zip(chunks, self._parallel([_chunk_prompt(chunk) for chunk in chunks])):
+            parts.update({label: summary for label, summary in parse_chunk_summary(response or "", chunk).items() if summary})
+        return parts
+
+    def summarize_files(self, files):
+        """Return {path: summary} for `files` ({path: text}), paying only for cache misses."""
+        hashes = {path: content_hash(text) for path, text in files.items()}
+        cached = self.cache.get_many(set(hashes.values()))
+        summaries = {path: cached[digest] for path, digest in hashes.items() if digest in cached}
+        missing = sorted(path for path in files if path not in summaries)
+
+        chunks = build_chunks([(path, files[path]) for path in missing], self.budget_tokens)
+        parts = self._summarize_chunks(chunks)
+        # The model sometimes leaves a file out of a shared chunk; those are asked for once more, one per chunk
+        retries = [[item] for chunk in chunks for item in chunk if item[0] not in parts]
+        if retries:
+            parts.update(self._summarize_chunks(retries))
+
+        fresh, complete = {}, set()
+        for path in missing:
+            if path in parts:
+                fresh[path] = parts[path]
+                complete.add(path)
+                continue
+            # Large files come back as numbered parts
+            pieces = sorted(
+                (_part_number(label), _part_count(label), summary)
+                for label, summary in parts.items()
+                if label.startswith(f"{path} (part ")
+            )
+            if not pieces:
+                continue
+            summary = self._reduce(path, [(f"part {number}", piece) for number, _, piece in pieces])
+            if summary:
+                fresh[path] = summary
+                # A summary of some of the parts is better than none, but is not kept
+                if len(pieces) == pieces[0][1]:
+                    complete.add(path)
+
+        self.cache.put_many("file", {hashes[path]: fresh[path] for path in complete})
+        summaries.update(fresh)
+        self.stats = {
+            "files": len(files),
+            "cached": len(files) - len(missing),
+            "summarized": len(fresh),
+            "chunks": len(chunks),
+            "retried": len(retries),
+            "unsummarized": len(missing) - len(fresh),
+        }
+        return summaries
+
+    def _reduce_once(self, name, entries, budget_chars):
+        prompt = _reduce_prompt(name, entries)
+        digest = content_hash(prompt)
+        cached = self.cache.get_many([digest])
+        if digest in cached:
+            return cached[digest]
+        summary = self.summarize(prompt[:budget_chars])
+        # Empty or failed answers are asked for again next time instead of being kept for good
+        if summary:
+            self.cache.put_many("reduce", {digest: summary})
+        return summary or ""
+
+    def _reduce(self, name, entries):
+        """Reduce `entries` to one summary, in rounds when they exceed the budget."""
+        budget_chars = self.budget_tokens * CHARS_PER_TOKEN
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if len(_reduce_prompt(name, entries)) <= budget_chars or len(entries) == 1:
+                return self._reduce_once(name, entries, budget_chars)
+            groups, current, size = [], [], 0
+            for entry in entries:
+                if size + len(entry[1]) > budget_chars // 2 and current:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(entry)
+                size += len(entry[1])
+            groups.append(current)
+            if len(groups) == len(entries):
+                # Every summary fills half the budget alone (the model ignored the word limit),
+                # so grouping by size would never shrink them: merge them in pairs instead
+                groups = [entries[i:i + 2] for i in range(0, len(entries), 2)]
+            reduced = self._parallel([_reduce_prompt(name, group)[:budget_chars] for group in groups])
+            entries = [(f"group {i + 1}", summary) for i, summary in enumerate(reduced) if summary]
+            if not entries:
+                return ""
+        # Still too long after every round: cut each summary to its share of one prompt
+        share = budget_chars // (len(entries) + 1)
+        return self._reduce_once(name, [(label, summary[:share]) for label, summary in entries], budget_chars)
+
+    def summarize_tree(self, files):
+        """Summarize files, then every directory bottom-up, then the repository."""
+        file_summaries = self.summarize_files(files)
+
+        children = {}
+        for path, summary in file_summaries.items():
+            parent = str(PurePosixPath(path).parent)
+            children.setdefault(parent, []).append((PurePosixPath(path).name, summary))
+
+        directories = set(children)
+        for directory in list(directories):
+            for parent in PurePosixPath(directory).parents:
+                directories.add(str(parent))
+
+        dir_summaries = {}
+        # Deepest directories first so parents can reuse their children's summaries
+        for directory in sorted(directories, key=lambda d: (-len(PurePosixPath(d).parts), d)):
+            if directory == ".":
+                continue
+            entries = list(children.get(directory, []))
+            entries += [
+                (f"{PurePosixPath(d).name}/", s)
+                for d, s in dir_summaries.items()
+                if str(PurePosixPath(d).parent) == directory
+            ]
+            if entries:
+                dir_summaries[directory] = self._reduce(directory, sorted(entries))
+
+        top = list(children.get(".", []))
+        top += [(f"{d}/", s) for d, s in dir_summaries.items() if "/" not in d]
+        repo_summary = self._reduce("the repository", sorted(top)) if top else ""
+        return {"repository": repo_summary, "directories": dir_summaries, "files": file_summaries}
+
+
+def collect_source_files(checkout, max_file_bytes=MAX_FILE_BYTES):
+    index = load_index(checkout)
+    files = {}
+    for path, size in index["files"]:
+        if Path(path).suffix.lower() not in LANGUAGES or size > max_file_bytes:
+            continue
+        try:
+            files[path] = (Path(checkout) / path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+    return files
+
+
+def model_summarizer(model):
+    def summarize(prompt):
+        # A fresh agent per call keeps concurrent map calls independent
+        agent = Agent(model=model, instructions=SUMMARIZER_INSTRUCTIONS, telemetry=False)
+        output = agent.run(prompt)
+        # A failed run's content is the error message, not a summary
+        if output.status == RunStatus.error or not isinstance(output.content, str):
+            return None
+        return output.content.strip() or None
+
+    return summarize
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class SummaryTools(Toolkit):
+    def __init__(self, model, repo_dir=REPO_DIR, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        self.summarizer = RepoSummarizer(model_summarizer(model))
+        self._tree = None
+        self._tree_sha = None
+        self._lock = threading.Lock()
+        super().__init__(
+            name="summary_tools",
+            tools=[self.summarize_repository, self.summarize_path],
+            **kwargs,
+        )
+
+    def _summaries(self):
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return None
+        index = load_index(checkout)
+        with self._lock:
+            if self._tree is None or self._tree_sha != index["sha"]:
+                self._tree = self.summarizer.summarize_tree(collect_source_files(checkout))
+                self._tree_sha = index["sha"]
+            return self._tree
+
+    def summarize_repository(self) -> str:
+        """Get a hierarchical summary of all source code in the cloned repository:
+        one summary for the repository and one per directory. Works for repositories
+        too large to read file by file.
+
+        Returns:
+            str: JSON with the repository summary and directory summaries.
+        """
+        tree = self._summaries()
+        if tree is None:
+            return "No cloned repository found."
+        return json.dumps(
+            {"repository": tree["repository"], "directories": tree["directories"], "stats": self.summarizer.stats},
+            indent=2,
+        )
+
+    def summarize_path(self, path: str) -> str:
+        """Get the summaries of a directory or file of the cloned repository.
+
+        Args:
+            path (str): Directory or file path relative to the repository root.
+
+        Returns:
+            str: JSON with the summaries of the path and of the files below it.
+        """
+        tree = self._summaries()
+        if tree is None:
+            return "No cloned repository found."
+        path = path.strip("/") or "."
+        prefix = "" if path == "." else f"{path}/"
+        files = {p: s for p, s in tree["files"].items() if p == path or p.startswith(prefix)}
+        if path == ".":
+            summary = tree["repository"]
+        elif not files:
+            # Never stand in the repository summary for a path that does not exist
+            known = [*tree["directories"], *tree["files"]]
+            matches = difflib.get_close_matches(path, known, n=5, cutoff=0.6)
+            hint = f" Close matches: {', '.join(matches)}." if matches else ""
+            return f"Unknown path {path}: not a directory or source file of the repository.{hint}"
+        else:
+            summary = tree["directories"].get(path) or tree["files"].get(path)
+        result = {"path": path, "summary": summary, "files": files}
+        return json.dumps(result, indent=2)
@@ -0,0 +1,363 @@
+import ast
+import fnmatch
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from uuid import uuid4
+
+from agno.tools import Toolkit
+
+from config import CACHE_DIR, REPO_DIR
+from repo_index import find_checkout, load_index
+from repo_walker import WALKER_VERSION
+
+
+SYMBOL_DIR = CACHE_DIR / "symbols"
+
+PYTHON_SUFFIXES = {".py", ".pyi"}
+JS_SUFFIXES = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"}
+
+MAX_FILE_BYTES = 1024 * 1024
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 200
+
+HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "route", "api_route", "websocket", "all"}
+
+SYMBOL_KINDS = ["function", "class", "route", "main", "cli_command", "cli_option", "env_var"]
+
+
+def _symbol(kind, name, path, line, detail=""):
+    return {"kind": kind, "name": name, "file": path, "line": line, "detail": detail}
+
+
+# -----------------------------
+# Python (ast)
+# -----------------------------
+def _dotted(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else node.attr
+    if isinstance(node, ast.Call):
+        return _dotted(node.func)
+    return ""
+
+
+def _first_str(call):
+    if isinstance(call, ast.Call) and call.args and isinstance(call.args[0], ast.Constant):
+        if isinstance(call.args[0].value, str):
+            return call.args[0].value
+    return None
+
+
+def _str_args(call):
+    return [a.value for a in call.args if isinstance(a, ast.Constant) and isinstance(a.value, str)]
+
+
+def _is_env_call(dotted):
+    if dotted in ("os.getenv", "getenv"):
+        return True
+    owner, _, attr = dotted.rpartition(".")
+    return owner.endswith("environ") and attr in ("get", "pop", "setdefault")
+
+
+class PythonSymbolVisitor(ast.NodeVisitor):
+    def __init__(self, path):
+        self.path = path
+        self.symbols = []
+
+    def add(self, kind, name, node, detail=""):
+        self.symbols.append(_symbol(kind, name, self.path, node.lineno, detail))
+
+    def _decorators(self, node):
+        names = []
+        for decorator in node.decorator_list:
+            dotted = _dotted(decorator)
+            names.append(dotted)
+            attr = dotted.rsplit(".", 1)[-1]
+            if attr in HTTP_METHODS and isinstance(decorator, ast.Call):
+                route = _first_str(decorator)
+                if route is not None:
+                    methods = attr.upper() if attr not in ("route", "api_route") else "ROUTE"
+                    self.add("route", route, decorator, f"{methods} -> {node.name}")
+            elif attr in ("command", "group") and "." in dotted:
+                name = _first_str(decorator) or node.name
+                self.add("cli_command", name, decorator, f"{dotted} -> {node.name}")
+            elif attr in ("option", "argument") and dotted.startswith("click."):
+                self.add("cli_option", " ".join(_str_args(decorator)) or node.name, decorator, f"{dotted} on {node.name}")
+        return names
+
+    def visit_FunctionDef(self, node):
+        decorators = self._decorators(node)
+        detail = f"decorators: {', '.join(decorators)}" if decorators else ""
+        self.add("function", node.name, node, detail)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._decorators(node)
+        bases = ", ".join(_dotted(b) for b in node.bases)
+        self.add("class", node.name, node, f"bases: {bases}" if bases else "")
+        self.generic_visit(node)
+
+    def visit_If(self, node):
+        test = node.test
+        if (
+            isinstance(test, ast.Compare)
+            and isinstance(test.left, ast.Name)
+            and test.left.id == "__name__"
+            and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in test.comparators)
+        ):
+            self.add("main", "__main__", node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        dotted = _dotted(node.func)
+        attr = dotted.rsplit(".", 1)[-1]
+        if _is_env_call(dotted):
+            name = _first_str(node)
+            if name:
+                default = "with default" if len(node.args) > 1 or node.keywords else "no default"
+                self.add("env_var", name, node, f"{dotted}, {default}")
+        elif attr == "ArgumentParser":
+            self.add("cli_command", "argparse", node, dotted)
+        elif attr == "add_parser":
+            self.add("cli_command", _first_str(node) or "?", node, "argparse subcommand")
+        elif attr == "add_argument":
+            self.add("cli_option", " ".join(_str_args(node)) or "?", node, "argparse")
+        elif attr in ("add_url_rule", "add_api_route", "add_route"):
+            route = _first_str(node)
+            if route is not None:
+                self.add("route", route, node, dotted)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        if _dotted(node.value).endswith("environ"):
+            key = node.slice
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                self.add("env_var", key.value, node, "os.environ[...], required")
+        self.generic_visit(node)
+
+
+def python_symbols(path, text):
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    visitor = PythonSymbolVisitor(path)
+    visitor.visit(tree)
+    return visitor.symbols
+
+
+# -----------------------------
+# JavaScript / TypeScript (lightweight tokenizer)
+# -----------------------------
+def blank_js_comments(text):
+    """Replace comments with spaces, keeping strings and line numbers intact."""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        nxt = text[i + 1] if i + 1 < n else ""
+        if ch == "/" and nxt == "/":
+            end = text.find("\n", i)
+            end = n if end == -1 else end
+            out.append(" " * (end - i))
+            i = end
+        elif ch == "/" and nxt == "*":
+            end = text.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(re.sub(r"[^\n]", " ", text[i:end]))
+            i = end
+        elif ch in "'\"`":
+            j = i + 1
+            while j < n and text[j] != ch:
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+JS_PATTERNS = [
+    ("function", re.compile(r"\b(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"\b(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s+)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>")),
+    ("class", re.compile(r"\b(?:export\s+(?:default\s+)?)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)")),
+    ("route", re.compile(r"\b(?:app|router|server|api|fastify)\.(get|post|put|patch|delete|all|use|route)\(\s*['\"`]([^'\"`]+)['\"`]")),
+    ("route", re.compile(r"@(Get|Post|Put|Patch|Delete|All)\(\s*['\"`]?([^'\"`)]*)")),
+    ("env_var", re.compile(r"\b(?:process\.env|import\.meta\.env)\.([A-Z_][A-Z0-9_]*)")),
+    ("env_var", re.compile(r"\b(?:process\.env|import\.meta\.env)\[\s*['\"`]([^'\"`]+)['\"`]\s*\]")),
+    ("cli_command", re.compile(r"\.command\(\s*['\"`]([^'\"`]+)['\"`]")),
+    ("cli_option", re.compile(r"\.option\(\s*['\"`]([^'\"`]+)['\"`]")),
+]
+
+
+def js_symbols(path, text):
+    code = blank_js_comments(text)
+    symbols = []
+    if text.startswith("#!"):
+        symbols.append(_symbol("main", "shebang", path, 1, text.splitlines()[0]))
+    for kind, pattern in JS_PATTERNS:
+        for match in pattern.finditer(code):
+            line = code.count("\n", 0, match.start()) + 1
+            if kind == "route":
+                method, route = match.groups()
+                symbols.append(_symbol("route", route or "/", path, line, method.upper()))
+            else:
+                symbols.append(_symbol(kind, match.group(1), path, line))
+    if re.search(r"\brequire\.main\s*===\s*module\b", code):
+        line = code.count("\n", 0, code.index("require.main")) + 1
+        symbols.append(_symbol("main", "require.main", path, line))
+    return sorted(symbols, key=lambda s: (s["line"], s["kind"]))
+
+
+# -----------------------------
+# Index construction
+# -----------------------------
+def extract_symbols(item):
+    checkout, path = item
+    suffix = Path(path).suffix.lower()
+    try:
+        text = (Path(checkout) / path).read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return []
+    if suffix in PYTHON_SUFFIXES:
+        return python_symbols(path, text)
+    return js_symbols(path, text)
+
+
+def _symbol_order(symbol):
+    return symbol["file"], symbol["line"], symbol["kind"]
+
+
+def build_symbol_index(checkout, files, max_workers=None):
+    items = [(str(checkout), path) for path in files]
+    if len(items) < PARALLEL_THRESHOLD:
+        symbols = [symbol for result in map(extract_symbols, items) for symbol in result]
+    else:
+        # The UI and job threads may hold locks at fork time, so workers start from a fresh interpreter
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+            results = pool.map(extract_symbols, items, chunksize=32)
+            symbols = [symbol for result in results for symbol in result]
+    return sorted(symbols, key=_symbol_order)
+
+
+def _indexable(index):
+    return [
+        path for path, size in index["files"]
+        if Path(path).suffix.lower() in PYTHON_SUFFIXES | JS_SUFFIXES and size <= MAX_FILE_BYTES
+    ]
+
+
+def symbol_path(sha):
+    # Built from the index's file list, so the walker's rules are part of the key
+    return SYMBOL_DIR / f"{sha}.v{WALKER_VERSION}.json"
+
+
+def _save_symbols(sha, symbols):
+    SYMBOL_DIR.mkdir(parents=True, exist_ok=True)
+    symbol_file = symbol_path(sha)
+    # Concurrent agents may build the same symbol index, so each writer gets its own temp file
+    tmp_file = symbol_file.with_name(f"{symbol_file.name}.{uuid4().hex}.tmp")
+    tmp_file.write_text(json.dumps(symbols))
+    tmp_file.replace(symbol_file)
+
+
+def load_symbol_index(checkout, rebuild=False):
+    """Return the symbol list for `checkout`, built once per commit."""
+    index = load_index(checkout)
+    sha = index["sha"]
+    symbol_file = symbol_path(sha) if sha else None
+    if symbol_file and symbol_file.exists() and not rebuild:
+        return json.loads(symbol_file.read_text())
+
+    symbols = build_symbol_index(checkout, _indexable(index))
+    if sha:
+        _save_symbols(sha, symbols)
+    return symbols
+
+
+def update_symbol_index(checkout, old_sha, changed_paths):
+    """Carry the symbols of unchanged files over from `old_sha`; re-extract only changed files.
+
+    Returns None when there is no index for `old_sha` to start from.
+    """
+    old_file = symbol_path(old_sha)
+    if not old_file.exists():
+        return None
+    index = load_index(checkout)
+    changed = set(changed_paths)
+    symbols = [s for s in json.loads(old_file.read_text()) if s["file"] not in changed]
+    symbols += build_symbol_index(checkout, [path for path in _indexable(index) if path in changed])
+    symbols.sort(key=_symbol_order)
+    _save_symbols(index["sha"], symbols)
+    return symbols
+
+
+# -----------------------------
+# Agent tools
+# -----------------------------
+class SymbolIndexTools(Toolkit):
+    def __init__(self, repo_dir=REPO_DIR, **kwargs):
+        self.repo_dir = Path(repo_dir)
+        super().__init__(
+            name="symbol_index_tools",
+            tools=[self.get_interface_summary, self.query_symbols],
+            **kwargs,
+        )
+
+    def _symbols(self):
+        checkout = find_checkout(self.repo_dir)
+        if checkout is None:
+            return None
+        return load_symbol_index(checkout)
+
+    def get_interface_summary(self) -> str:
+        """Get the statically detected interfaces of the cloned repository: HTTP routes,
+        __main__ blocks and shebang scripts, CLI commands and options (argparse, click,
+        typer, commander) and environment variable reads, each with file:line.
+
+        Returns:
+            str: JSON grouped by kind.
+        """
+        symbols = self._symbols()
+        if symbols is None:
+            return "No cloned repository found."
+        summary = {}
+        for kind in ("route", "main", "cli_command", "cli_option", "env_var"):
+            entries = [s for s in symbols if s["kind"] == kind]
+            summary[kind] = [f"{s['name']} ({s['file']}:{s['line']}) {s['detail']}".strip() for s in entries[:100]]
+            if len(entries) > 100:
+                summary[kind].append(f"... {len(entries) - 100} more, use query_symbols")
+        summary["counts"] = {kind: sum(1 for s in symbols if s["kind"] == kind) for kind in SYMBOL_KINDS}
+        return json.dumps(summary, indent=2)
+
+    def query_symbols(self, kind: str | None = None, name: str | None = None, path: str | None = None, limit: int = 100) -> str:
+        """Search the symbol index of the cloned repository.
+
+        Args:
+            kind (str | None): One of function, class, route, main, cli_command, cli_option, env_var.
+            name (str | None): Glob pattern for the symbol name, e.g. "*user*" or "DATABASE_*".
+            path (str | None): Glob pattern for the file path, e.g. "src/api/*".
+            limit (int): Maximum number of symbols to return.
+
+        Returns:
+            str: JSON list of matching symbols with file and line.
+        """
+        symbols = self._symbols()
+        if symbols is None:
+            return "No cloned repository found."
+        matches = [
+            s for s in symbols
+            if (kind is None or s["kind"] == kind)
+            and (name is None or fnmatch.fnmatch(s["name"], name))
+            and (path is None or fnmatch.fnmatch(s["file"], path))
+        ]
+        return json.dumps({"total_matches": len(matches), "symbols": matches[:limit]}, indent=2)
@@ -1,21 +1,50 @@
+import re
 import streamlit as st
-from pathlib import Path
-import shutil
-from main_original import readme_generation_team  # import your Team
+from uuid import uuid4
+from config import DB_FILE
+from instrumentation import MetricsStore
+from jobs import FINISHED, JobQueue, JobStore
+from workspaces import MAX_WORKSPACES, WorkspaceManager
 
-BASE_DIR = Path(__file__).parent
-REPO_DIR = BASE_DIR / "repo"
 
-def reset_repo():
-    if REPO_DIR.exists():
-        shutil.rmtree(REPO_DIR)
-    REPO_DIR.mkdir(parents=True, exist_ok=True)
+@st.cache_resource
+def get_workspace_manager():
+    # One pool per server process, shared by all sessions; it never evicts a
+    # workspace while a job of its session is queued or running
+    return WorkspaceManager(job_store=get_job_queue().store)
 
-# Run cleanup ONLY once per session
+
+@st.cache_resource
+def get_metrics_store():
+    return MetricsStore(db_file=DB_FILE)
+
+
+@st.cache_resource
+def get_job_queue():
+    # Team runs happen here, outside the script run, so reruns, reloads and
+    # disconnects neither block nor kill them
+    return JobQueue(JobStore(db_file=DB_FILE))
+
+
+@st.cache_resource(max_entries=MAX_WORKSPACES)
+def get_team(workspace):
+    # The agents, the model client and agno itself are only loaded once the first
+    # question is asked; teams are kept per workspace across reruns and reloads.
+    from main_original import make_readme_generation_team
+
+    return make_readme_generation_team(workspace)
+
+
+# Every session clones into its own workspace with a team bound to it
 if "initialized" not in st.session_state:
-    reset_repo()
+    # Kept in the URL, so a reloaded or reconnected page finds its jobs again
+    session_id = st.query_params.get("session", "")
+    st.session_state.session_id = session_id if re.fullmatch(r"[0-9a-f]{32}", session_id) else uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    st.session_state.workspace = str(get_workspace_manager().acquire(st.session_state.session_id))
     st.session_state.initialized = True
-    st.session_state.messages = []
+else:
+    get_workspace_manager().touch(st.session_state.session_id)
 
 
 st.set_page_config(
@@ -27,43 +56,86 @@ st.set_page_config(
 st.title("📘 RepoScribe")
 st.caption("Chat with your README generation agents")
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+def render_metrics(metrics):
+    with st.expander("Latency"):
+        ttft = metrics["time_to_first_token"]
+        st.markdown(f"- Time to first token: **{ttft:.2f}s**" if ttft is not None else "- Time to first token: n/a")
+        st.markdown(f"- Total latency: **{metrics['total_latency']:.2f}s**")
+        for agent_name, seconds in metrics["members"].items():
+            st.markdown(f"- {agent_name}: first output after {seconds:.2f}s")
+
+
+@st.fragment(run_every=1.0)
+def render_job_progress(job_id):
+    """Progress of a queued or running job, polled once a second without rerunning the page."""
+    store = get_job_queue().store
+    job = store.job(job_id)
+    if job["status"] in FINISHED:
+        # The full rerun renders the answer as part of the history
+        st.rerun()
+
+    events = store.events(job_id)
+    working = [e["agent"] for e in events if e["kind"] == "started"]
+    done = {e["agent"] for e in events if e["kind"] == "completed"}
+    busy = [agent for agent in working if agent not in done]
+    label = "Queued..." if job["status"] == "queued" else f"{busy[-1]} is working..." if busy else "Thinking..."
+    with st.status(label, expanded=False):
+        for event in events:
+            if event["kind"] == "tool":
+                st.write(f"{event['agent']}: calling `{event['detail']}`")
+            elif event["kind"] == "completed":
+                st.markdown(f"**{event['agent']}**")
+                st.markdown(event["detail"] or "")
+    if job["content"]:
+        st.markdown(job["content"] + "▌")
+    if st.button("Cancel", key=f"cancel-{job_id}"):
+        get_job_queue().cancel(job_id)
+        st.rerun()
 
-# Display chat history
-for msg in st.session_state.messages:
-    with st.chat_message(msg["role"]):
-        st.markdown(msg["content"])
+
+def render_job(job):
+    with st.chat_message("user"):
+        st.markdown(job["request"])
+    with st.chat_message("assistant"):
+        if job["status"] not in FINISHED:
+            render_job_progress(job["id"])
+            return
+        if job["content"]:
+            st.markdown(job["content"])
+        if job["status"] == "failed":
+            st.error(job["error"] or "The run failed.")
+        elif job["status"] == "cancelled":
+            st.caption("Cancelled.")
+        if job["metrics"]:
+            render_metrics(job["metrics"])
+
+
+def render_agent_metrics():
+    """Sidebar summary of where time and tokens go, per agent and per tool."""
+    with st.sidebar:
+        st.subheader("Agent metrics")
+        this_session = st.toggle("This session only", value=True)
+        summary = get_metrics_store().summary(session_id=st.session_state.session_id if this_session else None)
+        if not summary["agents"]:
+            st.caption("No runs recorded yet.")
+            return
+        st.dataframe(summary["agents"], hide_index=True)
+        if summary["tools"]:
+            st.markdown("**Tool calls**")
+            st.dataframe(summary["tools"], hide_index=True)
+
+
+# Display chat history; answers of finished jobs come from the job store
+for job in get_job_queue().store.jobs(st.session_state.session_id):
+    render_job(job)
 
 # Chat input
 user_input = st.chat_input("Ask something (e.g. Paste GitHub repo URL)")
 
 if user_input:
-    # Show user message
-    st.session_state.messages.append(
-        {"role": "user", "content": user_input}
-    )
-    with st.chat_message("user"):
-        st.markdown(user_input)
+    # Queue the team run and return; the history shows its progress
+    get_job_queue().submit(get_team(st.session_state.workspace), user_input, st.session_state.session_id)
+    st.rerun()
 
-    # Run team
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = readme_generation_team.run(
-                user_input,
-                stream=False  # set True if you want streaming
-            )
-
-            # Extract text safely
-            if hasattr(response, "content"):
-                assistant_text = response.content
-            else:
-                assistant_text = str(response)
-
-            st.markdown(assistant_text)
-
-    # Save assistant message
-    st.session_state.messages.append(
-        {"role": "assistant", "content": assistant_text}
-    )
+
+render_agent_metrics()
@@ -0,0 +1,150 @@
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from config import BASE_DIR
+
+
+WORKSPACES_DIR = BASE_DIR / "workspaces"
+
+# Pool bounds: idle sessions beyond these are evicted least recently used first
+MAX_WORKSPACES = 20
+WORKSPACE_QUOTA_BYTES = 2 * 1024**3
+TOTAL_QUOTA_BYTES = 20 * 1024**3
+# A workspace used this recently likely belongs to an open page and is never evicted
+MIN_IDLE_SECONDS = 15 * 60
+
+LAST_USED_MARKER = ".last_used"
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+def directory_size(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class WorkspaceManager:
+    """Gives every session its own checkout directory inside a bounded pool."""
+
+    def __init__(
+        self,
+        root=WORKSPACES_DIR,
+        max_workspaces=MAX_WORKSPACES,
+        quota_bytes=WORKSPACE_QUOTA_BYTES,
+        total_quota_bytes=TOTAL_QUOTA_BYTES,
+        min_idle_seconds=MIN_IDLE_SECONDS,
+        job_store=None,
+    ):
+        self.root = Path(root)
+        self.max_workspaces = max_workspaces
+        self.quota_bytes = quota_bytes
+        self.total_quota_bytes = total_quota_bytes
+        self.min_idle_seconds = min_idle_seconds
+        # Sessions with queued or running jobs keep their workspace whatever its age
+        self.job_store = job_store
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, session_id):
+        # Session ids come from the client, so keep them to a safe directory name
+        name = re.sub(r"[^A-Za-z0-9_-]", "_", str(session_id))[:64]
+        if not name:
+            raise ValueError("session_id must not be empty")
+        return self.root / name
+
+    def _last_used(self, workspace):
+        try:
+            return (workspace / LAST_USED_MARKER).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _workspaces(self):
+        return sorted(
+            (p for p in self.root.iterdir() if p.is_dir()),
+            key=self._last_used,
+        )
+
+    def touch(self, session_id):
+        """Mark the workspace as used without running eviction; recreates it if it was evicted."""
+        workspace = self.path(session_id)
+        workspace.mkdir(parents=True, exist_ok=True)
+        (workspace / LAST_USED_MARKER).touch()
+        return workspace
+
+    def acquire(self, session_id):
+        """Return the workspace of `session_id`, creating it and evicting idle ones as needed."""
+        workspace = self.path(session_id)
+        with self._lock:
+            workspace.mkdir(parents=True, exist_ok=True)
+            (workspace / LAST_USED_MARKER).touch()
+            self._evict(keep=workspace)
+        return workspace
+
+    def release(self, session_id):
+        with self._lock:
+            shutil.rmtree(self.path(session_id), ignore_errors=True)
+
+    def usage(self, session_id=None):
+        if session_id is not None:
+            workspace = self.path(session_id)
+            return directory_size(workspace) if workspace.exists() else 0
+        return {p.name: directory_size(p) for p in self._workspaces()}
+
+    def check_quota(self, session_id):
+        """Raise QuotaExceeded if the workspace of `session_id` is over its quota."""
+        used = self.usage(session_id)
+        if used > self.quota_bytes:
+            raise QuotaExceeded(
+                f"workspace uses {used / 1024**2:.0f} MB, quota is {self.quota_bytes / 1024**2:.0f} MB"
+            )
+        return used
+
+    def _in_use(self):
+        if self.job_store is None:
+            return set()
+        return {self.path(session_id) for session_id in self.job_store.active_sessions()}
+
+    def _evict(self, keep=None):
+        workspaces = self._workspaces()
+        in_use = self._in_use()
+        cutoff = time.time() - self.min_idle_seconds
+        # Only idle workspaces can go; while the others are busy the pool may stay over its bounds
+        idle = [p for p in workspaces if p != keep and p not in in_use and self._last_used(p) < cutoff]
+        # Oldest first, until the pool is back within both the count and the total size bound
+        excess = len(workspaces) - self.max_workspaces
+        for workspace in idle[:max(excess, 0)]:
+            shutil.rmtree(workspace, ignore_errors=True)
+        removed = set(idle[:max(excess, 0)])
+        idle = idle[max(excess, 0):]
+
+        sizes = {p: directory_size(p) for p in workspaces if p not in removed}
+        total = sum(sizes.values())
+        for workspace in idle:
+            if total <= self.total_quota_bytes:
+                break
+            shutil.rmtree(workspace, ignore_errors=True)
+            total -= sizes[workspace]
+
+    def cleanup(self, max_idle_seconds):
+        """Remove workspaces not used for `max_idle_seconds`; returns how many were removed."""
+        cutoff = time.time() - max_idle_seconds
+        removed = 0
+        with self._lock:
+            in_use = self._in_use()
+            for workspace in self._workspaces():
+                if self._last_used(workspace) < cutoff and workspace not in in_use:
+                    shutil.rmtree(workspace, ignore_errors=True)
+                    removed += 1
+        return removed